@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django import forms
-from .models import Project, ProjectFile, RelationSettings
+from .models import FileDeletion, Project, ProjectFile, RelationSettings, Tag, Technology
+from .search import search_project_ids
+from .terms import term_facets
 
 class RelationSettingsForm(forms.ModelForm):
     """Custom form for RelationSettings with better field handling"""
@@ -21,24 +23,18 @@ class RelationSettingsForm(forms.ModelForm):
     
     class Meta:
         model = RelationSettings
-        fields = ['available_tags', 'available_technologies']
+        fields = ['available_tags', 'available_technologies', 'tag_weight', 'technology_weight', 'score_normalization']
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Get all unique tags and technologies from projects
-        all_tags = set()
-        all_technologies = set()
-        
-        for project in Project.objects.all():
-            if project.tags:
-                all_tags.update(project.tags)
-            if project.technologies:
-                all_technologies.update(project.technologies)
-        
-        # Set choices for the fields
-        self.fields['available_tags'].choices = [(tag, tag) for tag in sorted(all_tags)]
-        self.fields['available_technologies'].choices = [(tech, tech) for tech in sorted(all_technologies)]
+        # Set choices for the fields from the maintained tag and technology counts
+        self.fields['available_tags'].choices = [
+            (facet['name'], f"{facet['name']} ({facet['count']})") for facet in term_facets(Tag, ordering=['name'])
+        ]
+        self.fields['available_technologies'].choices = [
+            (facet['name'], f"{facet['name']} ({facet['count']})") for facet in term_facets(Technology, ordering=['name'])
+        ]
         
         # Set initial values if instance exists
         if self.instance and self.instance.pk:
@@ -76,6 +72,27 @@ class ProjectAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     filter_horizontal = ['attached_files']
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains scans over name and description
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=search_project_ids(search_term)), False
+
 @admin.register(ProjectFile)
 class ProjectFileAdmin(admin.ModelAdmin):
     list_display = ['id', 'file']
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
+@admin.register(Technology)
+class TechnologyAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
+@admin.register(FileDeletion)
+class FileDeletionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'created_at', 'attempts', 'retry_at']
+    readonly_fields = ['name', 'variants', 'created_at', 'attempts', 'retry_at', 'last_error']
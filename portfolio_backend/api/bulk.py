@@ -0,0 +1,236 @@
+import io
+import json
+import posixpath
+import zipfile
+from itertools import islice
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from .cache import bump_catalog_version
+from .models import Project, ProjectFile
+from .related import rebuild_related_projects
+from .search import index_new_projects
+from .storage import BLOB_NAME, select_project_file_storage
+from .terms import link_new_project_terms
+
+# Project columns carried by an export line; ids are not, imports always add new projects
+EXPORT_FIELDS = ['name', 'description', 'technologies', 'tags', 'links', 'created_at', 'is_starred']
+
+# Projects per bulk_create, and per database round trip while exporting
+BATCH_SIZE = 500
+
+# Bytes moved per read while copying media in and out of a bundle
+BLOCK_SIZE = 64 * 1024
+
+BUNDLE_PROJECTS = 'projects.ndjson'
+BUNDLE_FILES = 'files'
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def export_records():
+    """One dict per project, oldest first, read from the database in batches"""
+    projects = (
+        Project.objects.only('id', *EXPORT_FIELDS)
+        .prefetch_related('attached_files')
+        .order_by('id')
+    )
+    for project in projects.iterator(chunk_size=BATCH_SIZE):
+        record = {field: getattr(project, field) for field in EXPORT_FIELDS}
+        record['attached_files'] = [
+            {'name': project_file.name, 'file': project_file.file.name}
+            for project_file in project.attached_files.all()
+        ]
+        yield record
+
+
+def export_ndjson():
+    """The catalog as NDJSON text, one line per project"""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for record in export_records():
+        yield encoder.encode(record) + '\n'
+
+
+class _ChunkWriter:
+    """Write-only file that hands what was written to a generator, so zips can be streamed"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b''.join(chunks)
+
+
+def export_bundle():
+    """
+    The catalog as a zip: ``projects.ndjson`` plus every attached blob under ``files/``.
+    Yields the archive piece by piece; media is stored uncompressed, it mostly is compressed already.
+    """
+    storage = select_project_file_storage()
+    output = _ChunkWriter()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        with bundle.open(BUNDLE_PROJECTS, 'w', force_zip64=True) as projects:
+            for line in export_ndjson():
+                projects.write(line.encode())
+                yield output.drain()
+
+        blobs = (
+            ProjectFile.objects.filter(project__isnull=False)
+            .values_list('file', flat=True).distinct().order_by('file')
+        )
+        for blob in blobs.iterator(chunk_size=BATCH_SIZE):
+            if not storage.exists(blob):
+                continue
+            info = zipfile.ZipInfo(posixpath.join(BUNDLE_FILES, blob))
+            info.compress_type = zipfile.ZIP_STORED
+            with storage.open(blob, 'rb') as source, bundle.open(info, 'w', force_zip64=True) as target:
+                for block in iter(lambda: source.read(BLOCK_SIZE), b''):
+                    target.write(block)
+                    yield output.drain()
+    yield output.drain()
+
+
+def _is_text(value, max_length=None):
+    return isinstance(value, str) and (max_length is None or len(value) <= max_length)
+
+
+def _is_text_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+# Check and description of every nullable export field, in the shape the API serves it
+FIELD_CHECKS = {
+    'name': (lambda value: _is_text(value, 255), 'a string of at most 255 characters'),
+    'description': (_is_text, 'a string'),
+    'technologies': (_is_text_list, 'a list of strings'),
+    'tags': (_is_text_list, 'a list of strings'),
+    'links': (_is_text_list, 'a list of strings'),
+    'created_at': (lambda value: _is_text(value) and parse_datetime(value) is not None, 'an ISO 8601 datetime'),
+    'is_starred': (lambda value: isinstance(value, bool), 'true or false'),
+}
+
+
+def _is_file_entry(entry):
+    return (
+        isinstance(entry, dict) and _is_text(entry.get('file'))
+        and (entry.get('name') is None or _is_text(entry['name'], 255))
+    )
+
+
+def _parse_line(number, line):
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise BulkImportError(f'Line {number}: {e}')
+    if not isinstance(record, dict):
+        raise BulkImportError(f'Line {number}: expected a JSON object')
+
+    for field, (check, expected) in FIELD_CHECKS.items():
+        if record.get(field) is not None and not check(record[field]):
+            raise BulkImportError(f'Line {number}: {field} must be {expected}')
+
+    project = Project(**{field: record.get(field) for field in EXPORT_FIELDS if field != 'is_starred'})
+    project.is_starred = bool(record.get('is_starred'))
+    if project.created_at is not None:
+        project.created_at = parse_datetime(project.created_at)
+
+    files = record.get('attached_files') or []
+    if not isinstance(files, list) or not all(_is_file_entry(entry) for entry in files):
+        raise BulkImportError(f'Line {number}: attached_files must be a list of {{name, file}} objects')
+    return number, project, files
+
+
+class _BlobResolver:
+    """
+    Map exported blob names to stored ones, copying bundled media into storage once per blob.
+    Names that are not bundled must be content-addressed blobs already in storage; anything
+    else, such as staged uploads or paths outside the media root, is refused.
+    """
+
+    def __init__(self, bundle=None):
+        self.storage = select_project_file_storage()
+        self.bundle = bundle
+        self.bundled = set(bundle.namelist()) if bundle is not None else set()
+        self.resolved = {}
+
+    def __call__(self, number, blob):
+        if blob not in self.resolved:
+            member = posixpath.join(BUNDLE_FILES, blob)
+            if member in self.bundled:
+                with self.bundle.open(member) as content:
+                    # Content-addressed: media that is already stored is hashed, not written again
+                    self.resolved[blob] = self.storage.save(f'projects/{posixpath.basename(blob)}', File(content))
+            elif BLOB_NAME.fullmatch(blob) and self.storage.exists(blob):
+                self.resolved[blob] = blob
+            else:
+                raise BulkImportError(f'Line {number}: file {blob} is neither bundled nor a stored blob')
+        return self.resolved[blob]
+
+
+def _import_batch(batch, resolve):
+    projects = Project.objects.bulk_create([project for _, project, _ in batch])
+
+    project_files = []
+    for number, project, files in batch:
+        for entry in files:
+            project_file = ProjectFile(file=resolve(number, entry['file']), name=entry.get('name') or '')
+            project_files.append((project, project_file))
+    ProjectFile.objects.bulk_create([project_file for _, project_file in project_files])
+    Project.attached_files.through.objects.bulk_create([
+        Project.attached_files.through(project_id=project.id, projectfile_id=project_file.id)
+        for project, project_file in project_files
+    ])
+
+    link_new_project_terms(projects)
+    index_new_projects(projects)
+    return len(projects), len(project_files)
+
+
+def import_ndjson(lines, bundle=None):
+    """
+    Add one project per NDJSON line, ``BATCH_SIZE`` at a time with ``bulk_create``, in a
+    single transaction. The save signals do not run for bulk writes, so the term counters,
+    search documents and related-projects index are brought up to date here instead.
+    Image variants are generated lazily, the first time a new file is served.
+    Returns (projects, files) imported.
+    """
+    resolve = _BlobResolver(bundle)
+    records = (
+        _parse_line(number, line)
+        for number, line in enumerate(lines, start=1) if line.strip()
+    )
+    project_count = file_count = 0
+    with transaction.atomic():
+        while batch := list(islice(records, BATCH_SIZE)):
+            projects, files = _import_batch(batch, resolve)
+            project_count += projects
+            file_count += files
+        if project_count:
+            rebuild_related_projects()
+            bump_catalog_version()
+            transaction.on_commit(bump_catalog_version)
+    return project_count, file_count
+
+
+def import_bundle(file):
+    """Import a zip made by export_bundle; ``file`` must be seekable"""
+    try:
+        bundle = zipfile.ZipFile(file)
+    except zipfile.BadZipFile as e:
+        raise BulkImportError(str(e))
+    with bundle:
+        if BUNDLE_PROJECTS not in bundle.namelist():
+            raise BulkImportError(f'Bundle has no {BUNDLE_PROJECTS}')
+        with bundle.open(BUNDLE_PROJECTS) as projects:
+            return import_ndjson(io.TextIOWrapper(projects, encoding='utf-8'), bundle)
@@ -0,0 +1,202 @@
+import hashlib
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+from urllib.parse import urlencode
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+from .models import RelationSettings
+from .routers import reads_may_lag
+
+CATALOG_VERSION_KEY = 'api:catalog-version'
+RELATION_SETTINGS_VERSION_KEY = 'api:relation-settings-version'
+
+CatalogVersion = namedtuple('CatalogVersion', ['token', 'modified'])
+
+RelationSettingsSnapshot = namedtuple('RelationSettingsSnapshot', [
+    'excluded_tags', 'excluded_technologies', 'tag_weight', 'technology_weight', 'score_normalization',
+])
+
+# Sent whenever the catalog version moves on, i.e. the public API output may have changed
+catalog_changed = Signal()
+
+# (version, snapshot) of the relation settings as last loaded by this process
+_relation_settings = (None, None)
+
+
+def _new_catalog_version():
+    # A fresh token rather than incr(): the file-based backend has no atomic
+    # increment, and two racing writers must never end up on the same version.
+    return CatalogVersion(uuid.uuid4().hex, int(time.time()))
+
+
+def get_catalog_state():
+    """
+    Current catalog version: an opaque token that changes on every content write,
+    plus the time of that write. It lives in the cache itself, so every worker
+    sharing the cache sees the same value.
+    """
+    state = cache.get(CATALOG_VERSION_KEY)
+    if state is None:
+        cache.add(CATALOG_VERSION_KEY, tuple(_new_catalog_version()), timeout=None)
+        state = cache.get(CATALOG_VERSION_KEY)
+    return CatalogVersion(*state)
+
+
+def get_catalog_version():
+    return get_catalog_state().token
+
+
+async def aget_catalog_state():
+    """get_catalog_state() for async views, without blocking the event loop on the cache"""
+    state = await cache.aget(CATALOG_VERSION_KEY)
+    if state is None:
+        await cache.aadd(CATALOG_VERSION_KEY, tuple(_new_catalog_version()), timeout=None)
+        state = await cache.aget(CATALOG_VERSION_KEY)
+    return CatalogVersion(*state)
+
+
+def bump_catalog_version():
+    """Invalidate every cached read response at once"""
+    cache.set(CATALOG_VERSION_KEY, tuple(_new_catalog_version()), timeout=None)
+    catalog_changed.send(sender=None)
+
+
+def get_relation_settings():
+    """
+    Read-only snapshot of RelationSettings with the excluded lists as frozensets.
+
+    The snapshot is kept in process memory and reloaded only when the shared
+    version key changes, so steady-state reads cost one cache lookup and no query.
+    """
+    global _relation_settings
+
+    version = cache.get(RELATION_SETTINGS_VERSION_KEY)
+    if version is None:
+        cache.add(RELATION_SETTINGS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(RELATION_SETTINGS_VERSION_KEY)
+
+    local_version, snapshot = _relation_settings
+    if version != local_version:
+        settings = RelationSettings.get_current_settings()
+        snapshot = RelationSettingsSnapshot(
+            excluded_tags=frozenset(settings.excluded_tags or []),
+            excluded_technologies=frozenset(settings.excluded_technologies or []),
+            tag_weight=settings.tag_weight,
+            technology_weight=settings.technology_weight,
+            score_normalization=settings.score_normalization,
+        )
+        _relation_settings = (version, snapshot)
+    return snapshot
+
+
+def invalidate_relation_settings():
+    """Make every worker reload the relation settings on next use"""
+    cache.set(RELATION_SETTINGS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def catalog_etag(request, *args, **kwargs):
+    # The renderer is part of the representation, so it is part of the validator
+    return f'{get_catalog_version()}-{request.accepted_renderer.format}'
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(get_catalog_state().modified, tz=timezone.utc)
+
+
+def conditional_catalog_response(view_method):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before any cache or database work.
+    Responses carry ``Cache-Control: no-cache`` so browsers keep the body but revalidate it.
+    Responses read from a lagging replica get no validators, see api.routers.reads_may_lag.
+    """
+    if iscoroutinefunction(view_method):
+        @wraps(view_method)
+        async def async_wrapper(self, request, *args, **kwargs):
+            if reads_may_lag():
+                response = await view_method(self, request, *args, **kwargs)
+                patch_cache_control(response, no_cache=True)
+                return response
+            state = await aget_catalog_state()
+            etag = quote_etag(f'{state.token}-{request.accepted_renderer.format}')
+            response = get_conditional_response(request, etag=etag, last_modified=state.modified)
+            if response is None:
+                response = await view_method(self, request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(state.modified)
+                response.headers.setdefault('ETag', etag)
+            patch_cache_control(response, no_cache=True)
+            return response
+        return async_wrapper
+
+    conditional = method_decorator(
+        condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
+    )(view_method)
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if reads_may_lag():
+            response = view_method(self, request, *args, **kwargs)
+        else:
+            response = conditional(self, request, *args, **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
+    return wrapper
+
+
+def response_cache_key(request, version):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    raw = f'{request.path}?{params}|{request.accepted_renderer.format}'
+    return f'api:response:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cache_catalog_response(view_method):
+    """
+    Cache the rendered response of a read-only APIView method under the catalog version.
+    Only complete 200 responses are stored; streaming responses, and responses read from
+    a lagging replica, pass straight through.
+    """
+    def store_when_rendered(response, key):
+        if isinstance(response, Response) and response.status_code == 200:
+            def store(rendered):
+                cache.set(key, (rendered.content, rendered['Content-Type']), settings.API_CACHE_TIMEOUT)
+            response.add_post_render_callback(store)
+        return response
+
+    if iscoroutinefunction(view_method):
+        @wraps(view_method)
+        async def async_wrapper(self, request, *args, **kwargs):
+            if reads_may_lag():
+                return await view_method(self, request, *args, **kwargs)
+            key = response_cache_key(request, (await aget_catalog_state()).token)
+            cached = await cache.aget(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            # Rendering, and so storing, happens in a worker thread once the view returns
+            return store_when_rendered(await view_method(self, request, *args, **kwargs), key)
+        return async_wrapper
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if reads_may_lag():
+            return view_method(self, request, *args, **kwargs)
+        key = response_cache_key(request, get_catalog_version())
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        return store_when_rendered(view_method(self, request, *args, **kwargs), key)
+    return wrapper
@@ -0,0 +1,63 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from django.core.files.base import ContentFile
+from .bulk import import_ndjson
+from .storage import select_project_file_storage
+
+# Distinct attachment blobs shared by the generated projects
+BLOB_POOL_SIZE = 50
+
+# Vocabulary of the generated descriptions
+DESCRIPTION_WORDS = (
+    'api', 'build', 'cache', 'client', 'data', 'deploy', 'design', 'dashboard', 'engine', 'fast',
+    'feature', 'frontend', 'game', 'index', 'layout', 'library', 'mobile', 'model', 'portfolio',
+    'query', 'render', 'search', 'server', 'service', 'stream', 'tool', 'user', 'web', 'with', 'and',
+)
+
+
+def zipf_terms(rng, prefix, vocabulary_size, count):
+    """Pick ``count`` distinct terms with Zipf-like (1/rank) popularity"""
+    weights = [1 / rank for rank in range(1, vocabulary_size + 1)]
+    terms = set()
+    while len(terms) < min(count, vocabulary_size):
+        terms.update(rng.choices(range(vocabulary_size), weights=weights, k=count - len(terms)))
+    return [f'{prefix}{term}' for term in terms]
+
+
+def synthetic_records(rng, count, tags, technologies, attachments, starred, blobs):
+    """Export-format records of ``count`` made-up projects, see api.bulk"""
+    newest = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for number in range(count):
+        yield {
+            'name': f'Project {rng.getrandbits(32):08x}',
+            'description': ' '.join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(20, 80))),
+            'technologies': zipf_terms(rng, 'tech-', technologies, rng.randint(1, 5)),
+            'tags': zipf_terms(rng, 'tag-', tags, rng.randint(1, 6)),
+            'links': [f'https://github.com/example/project-{number}'],
+            'created_at': (newest - timedelta(hours=rng.randint(0, 24 * 365 * 5))).isoformat(),
+            'is_starred': rng.random() < starred,
+            'attached_files': [
+                {'name': f'attachment-{index}.pdf', 'file': rng.choice(blobs)}
+                for index in range(attachments)
+            ],
+        }
+
+
+def generate_catalog(count, tags=500, technologies=200, attachments=2, starred=0.1, seed=0):
+    """
+    Add ``count`` synthetic projects through the bulk import path. Tag and technology
+    popularity follows a Zipf distribution over vocabularies of the given sizes.
+    Attachments are small non-image blobs, so serving them never renders image variants.
+    Returns (projects, files) added.
+    """
+    rng = random.Random(seed)
+    blobs = []
+    if attachments:
+        storage = select_project_file_storage()
+        for index in range(BLOB_POOL_SIZE):
+            content = ContentFile(f'%PDF-1.4\n% synthetic attachment {index}\n'.encode(), name='synthetic.pdf')
+            blobs.append(storage.save('projects/synthetic.pdf', content))
+    records = synthetic_records(rng, count, tags, technologies, attachments, starred, blobs)
+    return import_ndjson(json.dumps(record) for record in records)
+
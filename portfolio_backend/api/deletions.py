@@ -0,0 +1,132 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import FileDeletion, ProjectFile
+from .storage import select_project_file_storage
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Attachments deleted inside batched_file_deletions(), queued together when it exits
+_batch = ContextVar('file_deletion_batch', default=None)
+
+
+def _queue(project_files):
+    FileDeletion.objects.bulk_create([
+        FileDeletion(name=project_file.file.name, variants=[
+            variant['name'] for variant in project_file.variants or []
+        ])
+        for project_file in project_files
+    ])
+    transaction.on_commit(wake_deletion_worker)
+
+
+def queue_file_deletion(project_file):
+    """
+    Record a blob whose attachment row is being deleted; the row goes with the current
+    transaction, so a rollback also forgets the deletion. Storage is never touched here.
+    """
+    batch = _batch.get()
+    if batch is not None:
+        batch.append(project_file)
+    else:
+        _queue([project_file])
+
+
+@contextmanager
+def batched_file_deletions():
+    """Queue the blobs of every attachment deleted inside the block with a single INSERT"""
+    batch = []
+    token = _batch.set(batch)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    if batch:
+        _queue(batch)
+
+
+def _delete_files(deletion):
+    select_project_file_storage().delete(deletion.name)
+    for name in deletion.variants:
+        default_storage.delete(name)
+
+
+def process_file_deletions(batch_size=None):
+    """
+    Work off every due deletion, one batch per round trip. Blobs that got referenced
+    again meanwhile (a new upload of the same content) are kept. Failures are retried
+    with exponential backoff up to FILE_DELETION_MAX_ATTEMPTS. Returns the number of blobs deleted.
+    """
+    batch_size = batch_size or settings.FILE_DELETION_BATCH_SIZE
+    deleted = 0
+    seen = 0
+    while True:
+        batch = list(
+            FileDeletion.objects
+            .filter(retry_at__lte=timezone.now(), attempts__lt=settings.FILE_DELETION_MAX_ATTEMPTS, id__gt=seen)
+            .order_by('id')[:batch_size]
+        )
+        if not batch:
+            return deleted
+        seen = batch[-1].id
+
+        # Under the write lock, so no upload can reference a blob between the check and the unlink
+        with transaction.atomic():
+            FileDeletion.lock_blobs()
+            referenced = set(
+                ProjectFile.objects.filter(file__in={deletion.name for deletion in batch})
+                .values_list('file', flat=True)
+            )
+            done, failed = [], []
+            for deletion in batch:
+                if deletion.name not in referenced:
+                    try:
+                        _delete_files(deletion)
+                    except Exception as error:
+                        logger.warning("Deleting %s failed: %s", deletion.name, error)
+                        deletion.attempts += 1
+                        deletion.retry_at = timezone.now() + timedelta(minutes=2 ** deletion.attempts)
+                        deletion.last_error = str(error)
+                        failed.append(deletion)
+                        continue
+                    deleted += 1
+                done.append(deletion.id)
+
+            FileDeletion.objects.filter(id__in=done).delete()
+            FileDeletion.objects.bulk_update(failed, ['attempts', 'retry_at', 'last_error'])
+
+
+def _run():
+    try:
+        process_file_deletions()
+    except Exception:
+        logger.exception("Processing file deletions failed")
+    finally:
+        close_old_connections()
+
+
+def wake_deletion_worker():
+    """
+    Have the background worker go through the queue. A single worker thread serializes
+    the runs, so wakes during a run just queue one more pass.
+    With ``FILE_DELETION_WORKER = False`` the queue is processed inline instead.
+    """
+    global _executor
+
+    if not settings.FILE_DELETION_WORKER:
+        process_file_deletions()
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-deletions')
+    _executor.submit(_run)
@@ -0,0 +1,163 @@
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+from .cache import bump_catalog_version
+from .models import ProjectFile
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# Pillow plugin name and MIME type of each derivative format, best compression first
+VARIANT_FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+# ids of the files this process has already queued, so lazy requests don't pile up
+_pending = set()
+
+
+def is_image(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def variant_formats():
+    """Configured derivative formats this Pillow build can actually encode"""
+    return [fmt for fmt in settings.IMAGE_VARIANT_FORMATS if fmt in VARIANT_FORMATS and features.check(fmt)]
+
+
+def variant_name(project_file, width, fmt):
+    """Derivatives belong to the stored blob, which attachments with identical content share"""
+    blob = posixpath.relpath(project_file.file.name, 'projects')
+    return f'projects/variants/{blob}/{width}w.{fmt}'
+
+
+def variant_widths(original_width):
+    """
+    Configured widths below the original; an original narrower than the largest
+    bucket also gets a same-size variant, larger ones stop at the largest bucket.
+    """
+    widths = [width for width in sorted(settings.IMAGE_VARIANT_WIDTHS) if width < original_width]
+    if original_width <= max(settings.IMAGE_VARIANT_WIDTHS):
+        widths.append(original_width)
+    return widths
+
+
+def generate_variants(project_file):
+    """
+    Write every size/format derivative of an image attachment and record them on every
+    row sharing its blob; rows of an already processed blob just reuse its variants.
+    Non-images and unreadable files are recorded with no variants, so they are not retried.
+    """
+    storage = project_file.file.storage
+    width = height = None
+    variants = []
+    processed = (
+        ProjectFile.objects.filter(file=project_file.file.name, variants__isnull=False)
+        .exclude(pk=project_file.pk).values_list('width', 'height', 'variants').first()
+    )
+
+    if processed is not None:
+        width, height, variants = processed
+    elif is_image(project_file.file.name):
+        try:
+            with storage.open(project_file.file.name, 'rb') as original:
+                image = ImageOps.exif_transpose(Image.open(original))
+                image.load()
+        except (OSError, Image.DecompressionBombError) as error:
+            logger.warning("Cannot read image %s: %s", project_file.file.name, error)
+        else:
+            width, height = image.size
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+            for target_width in variant_widths(width):
+                resized = image
+                if target_width != width:
+                    resized = image.resize((target_width, round(height * target_width / width)), Image.LANCZOS)
+                for fmt in variant_formats():
+                    buffer = io.BytesIO()
+                    resized.save(buffer, VARIANT_FORMATS[fmt][0], quality=settings.IMAGE_VARIANT_QUALITY)
+                    name = variant_name(project_file, target_width, fmt)
+                    if default_storage.exists(name):
+                        default_storage.delete(name)
+                    variants.append({'width': target_width, 'format': fmt,
+                                     'name': default_storage.save(name, ContentFile(buffer.getvalue()))})
+
+    # update() rather than save(): the rows are not re-uploaded, only annotated
+    ProjectFile.objects.filter(file=project_file.file.name).update(width=width, height=height, variants=variants)
+    project_file.width, project_file.height, project_file.variants = width, height, variants
+    bump_catalog_version()
+    return variants
+
+
+def _run(project_file_id):
+    try:
+        project_file = ProjectFile.objects.filter(pk=project_file_id).first()
+        if project_file is not None:
+            generate_variants(project_file)
+    except Exception:
+        logger.exception("Generating variants of file %s failed", project_file_id)
+    finally:
+        _pending.discard(project_file_id)
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS, thread_name_prefix='image-variants'
+            )
+        return _executor
+
+
+def schedule_variants(project_file):
+    """
+    Generate an attachment's derivatives in the worker pool once the current transaction
+    commits, so uploads return without waiting on image encoding.
+    With ``IMAGE_VARIANT_WORKERS = 0`` they are generated inline instead.
+    """
+    if project_file.id in _pending:
+        return
+    if not settings.IMAGE_VARIANT_WORKERS:
+        generate_variants(project_file)
+        return
+    _pending.add(project_file.id)
+    transaction.on_commit(lambda: _get_executor().submit(_run, project_file.id))
+
+
+def image_sources(project_file):
+    """
+    ``<picture>``-ready sources of an attachment: one ``{type, srcset}`` per format, best first.
+    Images whose derivatives were never generated are queued and get no sources yet.
+    """
+    if project_file.variants is None and is_image(project_file.file.name):
+        schedule_variants(project_file)
+    return variant_sources(project_file.variants)
+
+
+def variant_sources(variants):
+    """The ``{type, srcset}`` sources of a ProjectFile.variants list"""
+    if not variants:
+        return []
+
+    sources = []
+    for fmt, (_, mime_type) in VARIANT_FORMATS.items():
+        srcset = ', '.join(
+            f"{default_storage.url(variant['name'])} {variant['width']}w"
+            for variant in variants if variant['format'] == fmt
+        )
+        if srcset:
+            sources.append({'type': mime_type, 'srcset': srcset})
+    return sources
@@ -0,0 +1,185 @@
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlencode
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from api.cache import get_relation_settings
+from api.catalog import generate_catalog
+from api.models import Project
+
+# Endpoints measured at every catalog size; ``detail`` requests a different project each time
+ENDPOINTS = ['list', 'list-page', 'detail', 'technologies']
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions of ``results`` against ``baseline`` (both lists of result rows), as messages.
+    p95 latency and peak memory may grow by ``tolerance`` (0.25 = 25 %), the query count not at all;
+    endpoints and sizes missing from either side are skipped.
+    """
+    reference = {(row['endpoint'], row['projects']): row for row in baseline}
+    regressions = []
+    for row in results:
+        base = reference.get((row['endpoint'], row['projects']))
+        if base is None:
+            continue
+        label = f"{row['endpoint']} @ {row['projects']}"
+        if row['queries'] > base['queries']:
+            regressions.append(f"{label}: {row['queries']} queries, baseline {base['queries']}")
+        for field, unit in [('p95_ms', 'ms'), ('peak_kib', 'KiB')]:
+            if row[field] > base[field] * (1 + tolerance):
+                regressions.append(f"{label}: {field} {row[field]:.1f} {unit}, baseline {base[field]:.1f} {unit}")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency, query count and peak memory of the read API on synthetic catalogs of "
+        "growing size, write the results as JSON and compare them against a baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=20, help="Timed requests per endpoint and size")
+        parser.add_argument('--tags', type=int, default=500, help="Tag vocabulary size")
+        parser.add_argument('--technologies', type=int, default=200, help="Technology vocabulary size")
+        parser.add_argument('--attachments', type=int, default=2, help="Attached files per project")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Fail when the results regress against this JSON file")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed growth of p95 latency and peak memory over the baseline")
+        parser.add_argument('--current-database', action='store_true',
+                            help="Add the catalogs to the configured database instead of a throwaway one")
+
+    def endpoint_path(self, endpoint, rng, project_ids):
+        if endpoint == 'list':
+            return reverse('project-list')
+        if endpoint == 'list-page':
+            return reverse('project-list') + '?' + urlencode({'page_size': 20})
+        if endpoint == 'detail':
+            return reverse('project-detail', kwargs={'id': rng.choice(project_ids)})
+        return reverse('technologies-list')
+
+    def request(self, factory, path):
+        """Serve ``path`` from an empty response cache; returns the number of SQL queries"""
+        cache.clear()
+        match = resolve(path.split('?')[0])
+        view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        with CaptureQueriesContext(connection) as queries:
+            response = view(factory.get(path), *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} returned {response.status_code}")
+        return len(queries)
+
+    def measure(self, endpoint, size, options, rng, project_ids):
+        factory = RequestFactory()
+        # One traced request first: it warms up the view and tracemalloc would skew the timings
+        tracemalloc.start()
+        try:
+            queries = self.request(factory, self.endpoint_path(endpoint, rng, project_ids))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        timings = []
+        for _ in range(options['repeat']):
+            path = self.endpoint_path(endpoint, rng, project_ids)
+            start = time.perf_counter()
+            queries = max(queries, self.request(factory, path))
+            timings.append((time.perf_counter() - start) * 1000)
+        return {
+            'endpoint': endpoint,
+            'projects': size,
+            'mean_ms': statistics.mean(timings),
+            'p50_ms': percentile(timings, 0.5),
+            'p95_ms': percentile(timings, 0.95),
+            'queries': queries,
+            'peak_kib': peak / 1024,
+        }
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        columns = ['endpoint', 'projects', 'mean ms', 'p50 ms', 'p95 ms', 'queries', 'peak KiB']
+        self.stdout.write(' '.join(f'{column:>12}' for column in columns))
+
+        results = []
+        for step, size in enumerate(sorted(set(options['sizes']))):
+            # Each size grows the previous catalog rather than starting over
+            missing = size - Project.objects.count()
+            if missing > 0:
+                generate_catalog(missing, tags=options['tags'], technologies=options['technologies'],
+                                 attachments=options['attachments'], seed=options['seed'] + step)
+            project_ids = list(Project.objects.values_list('id', flat=True))
+
+            for endpoint in ENDPOINTS:
+                row = self.measure(endpoint, size, options, rng, project_ids)
+                results.append(row)
+                self.stdout.write(' '.join(
+                    f'{value:>12.2f}' if isinstance(value, float) else f'{value:>12}' for value in row.values()
+                ))
+        return results
+
+    def handle(self, *args, **options):
+        if min(options['sizes']) < 1 or options['repeat'] < 1:
+            raise CommandError("Sizes and --repeat must be positive")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)['results']
+
+        # A private response cache, cleared before every request, and no side effects on
+        # the snapshot directory; the RequestFactory host must be allowed for pagination links.
+        # Reads stay on default, the database the catalogs are generated in and queries counted on.
+        private_cache = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmark-api',
+        }}
+        overrides = {'CACHES': private_cache, 'ALLOWED_HOSTS': ['testserver'], 'API_SNAPSHOT_ROOT': '',
+                     'DATABASE_READ_ALIAS': ''}
+        media_root = None
+        if not options['current_database']:
+            media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+            overrides['MEDIA_ROOT'] = media_root
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(**overrides):
+                get_relation_settings()
+                results = self.run(options)
+        finally:
+            if media_root is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                shutil.rmtree(media_root, ignore_errors=True)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'settings': {key: options[key] for key in
+                                 ['sizes', 'repeat', 'tags', 'technologies', 'attachments', 'seed']},
+                    'results': results,
+                }, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError("Regressed against the baseline:\n" + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
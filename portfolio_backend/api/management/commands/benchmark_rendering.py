@@ -0,0 +1,55 @@
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from api.models import Project
+from api.renderers import FastJSONRenderer
+from api.serializers import ProjectSerializer, project_columns, project_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the project list body through ProjectSerializer and JSONRenderer against the values() "
+        "rows and FastJSONRenderer on the projects in the database, and check both are byte-identical"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--limit', type=int, help="Only the newest N projects")
+
+    def timed(self, func):
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            content = func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return content, statistics.mean(timings), min(timings)
+
+    def serializer_path(self):
+        projects = Project.objects.prefetch_related('attached_files')[:self.limit]
+        return JSONRenderer().render(ProjectSerializer(projects, many=True).data)
+
+    def rows_path(self):
+        rows = Project.objects.values(*project_columns())[:self.limit]
+        return FastJSONRenderer().render(project_rows(rows))
+
+    def handle(self, *args, **options):
+        self.repeat, self.limit = options['repeat'], options['limit']
+        count = Project.objects.count() if self.limit is None else min(self.limit, Project.objects.count())
+        if not count:
+            raise CommandError("No projects to render; fill the database with generate_catalog first")
+
+        self.stdout.write(f"{count} projects, {self.repeat} runs, {settings.API_JSON_ENCODER} encoder")
+        self.stdout.write(' '.join(f'{column:>12}' for column in ['path', 'mean ms', 'best ms', 'KiB']))
+        results = {}
+        for label, func in [('serializer', self.serializer_path), ('rows', self.rows_path)]:
+            content, mean, best = self.timed(func)
+            results[label] = (content, mean)
+            self.stdout.write(f'{label:>12} {mean:>12.1f} {best:>12.1f} {len(content) / 1024:>12.1f}')
+
+        if results['serializer'][0] != results['rows'][0]:
+            raise CommandError("The two paths rendered different bytes")
+        self.stdout.write(self.style.SUCCESS(
+            f"Identical output, {results['serializer'][1] / results['rows'][1]:.1f}x faster"
+        ))
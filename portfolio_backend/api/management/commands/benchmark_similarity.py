@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from api.catalog import zipf_terms
+from api.similarity import NORMALIZATION_CHOICES, NORMALIZATION_NONE, SimilarityEngine
+
+
+def legacy_scores(project, projects):
+    """The original per-pair set intersection, as ProjectDetailView used to run it"""
+    tags, technologies = set(project[1]), set(project[2])
+    scores = {}
+    for other in projects:
+        if other[0] == project[0]:
+            continue
+        score = len(tags & set(other[1])) + len(technologies & set(other[2]))
+        if score > 0:
+            scores[other[0]] = score
+    return scores
+
+
+class Command(BaseCommand):
+    help = "Measure related-projects scoring latency on synthetic in-memory catalogs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--queries', type=int, default=50, help="Scored projects per catalog size")
+        parser.add_argument('--tags', type=int, default=500, help="Tag vocabulary size")
+        parser.add_argument('--technologies', type=int, default=200, help="Technology vocabulary size")
+        parser.add_argument('--normalization', choices=[choice for choice, _ in NORMALIZATION_CHOICES],
+                            default=NORMALIZATION_NONE)
+        parser.add_argument('--skip-legacy', action='store_true', help="Do not time the set-based scorer")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def timed(self, func, inputs):
+        timings = []
+        for value in inputs:
+            start = time.perf_counter()
+            func(value)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return statistics.mean(timings), timings[int(len(timings) * 0.95) - 1]
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        columns = ['projects', 'build ms', 'batched mean', 'batched p95', 'all-scores mean', 'all-scores p95',
+                   'legacy mean', 'legacy p95']
+        self.stdout.write(' '.join(f'{column:>15}' for column in columns))
+
+        for size in options['sizes']:
+            projects = [
+                (project_id,
+                 zipf_terms(rng, 'tag', options['tags'], rng.randint(1, 6)),
+                 zipf_terms(rng, 'tech', options['technologies'], rng.randint(1, 5)))
+                for project_id in range(1, size + 1)
+            ]
+
+            start = time.perf_counter()
+            engine = SimilarityEngine(normalization=options['normalization'])
+            for project_id, tags, technologies in projects:
+                engine.add(project_id, tags, technologies)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            queries = rng.sample(projects, min(options['queries'], size))
+            # Warm the per-term bit sets, as a long-lived engine would have them
+            for project in queries:
+                engine.scores(project[0])
+
+            row = [size, build_ms]
+            # Shared-term counts for the whole catalog, grouped into masks
+            row += self.timed(lambda project: list(engine.shared_groups(engine.positions[project[0]])), queries)
+            # Every positive score materialized as {id: score}
+            row += self.timed(lambda project: engine.scores(project[0]), queries)
+            if options['skip_legacy']:
+                row += ['-', '-']
+            else:
+                row += self.timed(lambda project: legacy_scores(project, projects), queries)
+
+            self.stdout.write(' '.join(
+                f'{value:>15}' if isinstance(value, (int, str)) else f'{value:>15.2f}' for value in row
+            ))
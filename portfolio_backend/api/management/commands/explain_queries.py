@@ -0,0 +1,99 @@
+from urllib.parse import urlencode
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from api.cache import get_relation_settings
+from api.models import Project
+from api.search import fts5_enabled
+
+
+def full_scans(plan):
+    """
+    Plan steps that walk every row (``SCAN table`` without an index) or sort them
+    (``USE TEMP B-TREE``). Full-text queries are exempt from the sort check, since
+    relevance ranking cannot come out of an index.
+    """
+    ranked = any('VIRTUAL TABLE' in detail for detail in plan)
+    return [
+        detail for detail in plan
+        if (detail.startswith('SCAN ') and ' USING ' not in detail and 'VIRTUAL TABLE' not in detail)
+        or ('USE TEMP B-TREE' in detail and not ranked)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Run every read API request once and print the query plan of each SQL query it issues"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true',
+                            help="Exit with an error when a plan contains a full scan or a sort")
+
+    def api_requests(self):
+        """Paths of the read endpoints, with the query strings the frontend uses"""
+        project = Project.objects.only('id', 'name').first()
+        requests = [
+            reverse('project-list'),
+            reverse('project-list') + '?' + urlencode({'is_starred': 'true'}),
+            reverse('project-list') + '?' + urlencode({'page_size': 20}),
+            reverse('project-list') + '?' + urlencode({'is_starred': 'true', 'page_size': 20}),
+            reverse('technologies-list'),
+            reverse('facets'),
+        ]
+        if project is not None:
+            requests.append(reverse('project-detail', kwargs={'id': project.id}))
+            words = (project.name or '').split() or ['a']
+            requests.append(reverse('project-search') + '?' + urlencode({'q': words[0]}))
+        return requests
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        scan_count = 0
+
+        # A private, empty cache so every request reaches the database, the RequestFactory
+        # host allowed for absolute pagination links, and reads kept on the connection
+        # captured below; the read-only alias would plan them the same way
+        private_cache = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'explain-queries',
+        }}
+        with override_settings(CACHES=private_cache, ALLOWED_HOSTS=['testserver'], DATABASE_READ_ALIAS=''):
+            # Load the process-local state up front so only per-request queries show up
+            get_relation_settings()
+            fts5_enabled()
+
+            for path in self.api_requests():
+                match = resolve(path.split('?')[0])
+                view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+                with CaptureQueriesContext(connection) as queries:
+                    response = view(factory.get(path), *match.args, **match.kwargs)
+                    if hasattr(response, 'render'):
+                        response.render()
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f"GET {path}"))
+                for query in queries.captured_queries:
+                    sql = query['sql']
+                    if not sql.lstrip().upper().startswith('SELECT'):
+                        continue
+                    self.stdout.write(f"  {sql}")
+                    plan = self.explain(sql)
+                    scans = full_scans(plan)
+                    scan_count += len(scans)
+                    for detail in plan:
+                        style = self.style.WARNING if detail in scans else str
+                        self.stdout.write(style(f"    {detail}"))
+
+        if scan_count:
+            message = f"{scan_count} plan step(s) scan or sort without an index"
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("Every query is served from an index"))
@@ -0,0 +1,26 @@
+import sys
+from django.core.management.base import BaseCommand
+from api.bulk import export_bundle, export_ndjson
+
+
+class Command(BaseCommand):
+    help = "Write every project as NDJSON, or as a zip bundle with its media when the output ends in .zip"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, - for NDJSON on stdout")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if output == '-':
+            for line in export_ndjson():
+                sys.stdout.write(line)
+            return
+
+        if output.lower().endswith('.zip'):
+            with open(output, 'wb') as file:
+                for chunk in export_bundle():
+                    file.write(chunk)
+        else:
+            with open(output, 'w', encoding='utf-8') as file:
+                file.writelines(export_ndjson())
+        self.stderr.write(self.style.SUCCESS(f"Exported projects to {output}"))
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api.catalog import generate_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Add a synthetic catalog of projects with Zipf-distributed tags and technologies, "
+        "for benchmarks and load tests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=500, help="Tag vocabulary size")
+        parser.add_argument('--technologies', type=int, default=200, help="Technology vocabulary size")
+        parser.add_argument('--attachments', type=int, default=2, help="Attached files per project")
+        parser.add_argument('--starred', type=float, default=0.1, help="Share of starred projects")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if min(options['projects'], options['tags'], options['technologies']) < 1 or options['attachments'] < 0:
+            raise CommandError("Project and vocabulary counts must be positive")
+
+        start = time.perf_counter()
+        projects, files = generate_catalog(
+            options['projects'], tags=options['tags'], technologies=options['technologies'],
+            attachments=options['attachments'], starred=options['starred'], seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {projects} projects with {files} files in {time.perf_counter() - start:.1f} s"
+        ))
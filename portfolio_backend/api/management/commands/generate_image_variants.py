@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.images import generate_variants, is_image
+from api.models import ProjectFile
+
+
+class Command(BaseCommand):
+    help = "Generate resized AVIF/WebP variants for image attachments that have none yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate variants of every image")
+        parser.add_argument('--workers', type=int, default=max(settings.IMAGE_VARIANT_WORKERS, 1),
+                            help="Images encoded in parallel")
+
+    def generate(self, project_file):
+        return project_file, len(generate_variants(project_file))
+
+    def generate_in_thread(self, project_file):
+        try:
+            return self.generate(project_file)
+        finally:
+            close_old_connections()
+
+    def handle(self, *args, **options):
+        files = ProjectFile.objects.order_by('id')
+        if not options['force']:
+            files = files.filter(variants__isnull=True)
+        files = [project_file for project_file in files if is_image(project_file.file.name)]
+
+        if options['workers'] > 1:
+            # Pillow releases the GIL while resizing and encoding, so threads scale
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                results = list(executor.map(self.generate_in_thread, files))
+        else:
+            results = map(self.generate, files)
+        for project_file, count in results:
+            self.stdout.write(f"{project_file.file.name}: {count} variants")
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(files)} images"))
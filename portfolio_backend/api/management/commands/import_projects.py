@@ -0,0 +1,25 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from api.bulk import BulkImportError, import_bundle, import_ndjson
+
+
+class Command(BaseCommand):
+    help = "Add the projects of an NDJSON export, or of a zip bundle with media, in one transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File made by export_projects, - for NDJSON on stdin")
+
+    def handle(self, *args, **options):
+        path = options['input']
+        try:
+            if path == '-':
+                projects, files = import_ndjson(sys.stdin)
+            elif path.lower().endswith('.zip'):
+                with open(path, 'rb') as file:
+                    projects, files = import_bundle(file)
+            else:
+                with open(path, encoding='utf-8') as file:
+                    projects, files = import_ndjson(file)
+        except BulkImportError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Imported {projects} projects with {files} files"))
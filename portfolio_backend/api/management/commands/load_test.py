@@ -0,0 +1,166 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# gunicorn arguments and environment of each deployment mode, see DEPLOYMENT.md;
+# wsgi-async is sync workers driving the async handlers, to show what they cost there
+SERVERS = {
+    'sync': (['portfolio_backend.wsgi:application'], {}),
+    'async': (['--worker-class', 'uvicorn_worker.UvicornWorker', 'portfolio_backend.asgi:application'],
+              {'API_ASYNC_VIEWS': 'True', 'DJANGO_CONN_MAX_AGE': '0'}),
+    'wsgi-async': (['portfolio_backend.wsgi:application'], {'API_ASYNC_VIEWS': 'True'}),
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, keep the connection)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed')
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+async def client(url, deadline, timeout, latencies, errors):
+    """One virtual user: request after request on a keep-alive connection until the deadline"""
+    parts = urlsplit(url)
+    target = parts.path + (f'?{parts.query}' if parts.query else '')
+    request = f'GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: keep-alive\r\n\r\n'.encode()
+    connection = None
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(
+                    asyncio.open_connection(parts.hostname, parts.port or 80), timeout
+                )
+            reader, writer = connection
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+            if status != 200:
+                errors.append(status)
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+            if not keep_alive:
+                writer.close()
+                connection = None
+        except (OSError, asyncio.TimeoutError, ValueError, asyncio.IncompleteReadError) as e:
+            errors.append(type(e).__name__)
+            if connection is not None:
+                connection[1].close()
+                connection = None
+            await asyncio.sleep(0.05)
+    if connection is not None:
+        connection[1].close()
+
+
+async def run_level(url, concurrency, duration, timeout):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(url, deadline, timeout, latencies, errors) for _ in range(concurrency)))
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold N concurrent keep-alive clients against a read endpoint and report throughput and "
+        "p99 latency per level; --servers starts gunicorn in sync and/or async mode to compare them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/projects/',
+                            help="Endpoint of an already running server")
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS),
+                            help="Start these modes on a free local port instead of using --url")
+        parser.add_argument('--path', default='/api/projects/', help="Endpoint requested with --servers")
+        parser.add_argument('--workers', type=int, default=3, help="gunicorn workers with --servers")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 100, 200, 400])
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per concurrency level")
+        parser.add_argument('--timeout', type=float, default=5, help="Seconds before a request counts as failed")
+        parser.add_argument('--max-p99', type=float, default=1000,
+                            help="p99 in ms a level must stay under, error free, to count as sustained")
+
+    def start_server(self, mode, workers):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        arguments, environment = SERVERS[mode]
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+             *arguments],
+            cwd=settings.BASE_DIR, env={**os.environ, **environment},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base = f'http://127.0.0.1:{port}'
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f'{base}/api/health/', timeout=1).close()
+                return process, base
+            except OSError:
+                if process.poll() is not None:
+                    break
+                time.sleep(0.1)
+        process.terminate()
+        raise CommandError(f"gunicorn did not start in {mode} mode; is its worker class installed?")
+
+    def measure(self, label, url, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{label}: GET {url}"))
+        columns = ['clients', 'requests', 'req/s', 'p50 ms', 'p99 ms', 'errors']
+        self.stdout.write(' '.join(f'{column:>10}' for column in columns))
+
+        sustained = 0
+        for concurrency in options['concurrency']:
+            latencies, errors = asyncio.run(run_level(url, concurrency, options['duration'], options['timeout']))
+            p99 = percentile(latencies, 0.99)
+            row = [concurrency, len(latencies), len(latencies) / options['duration'],
+                   percentile(latencies, 0.5), p99, len(errors)]
+            self.stdout.write(' '.join(
+                f'{value:>10.1f}' if isinstance(value, float) else f'{value:>10}' for value in row
+            ))
+            if not errors and p99 < options['max_p99']:
+                sustained = concurrency
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: {sustained} concurrent clients sustained with p99 under {options['max_p99']:.0f} ms"
+        ))
+
+    def handle(self, *args, **options):
+        if not options['servers']:
+            self.measure('server', options['url'], options)
+            return
+
+        for mode in options['servers']:
+            process, base = self.start_server(mode, options['workers'])
+            try:
+                self.measure(mode, base + options['path'], options)
+            finally:
+                process.terminate()
+                process.wait()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from api.cache import bump_catalog_version
+from api.models import Project
+from api.related import rebuild_related_projects
+from api.search import rebuild_search_index
+from api.terms import recount_terms, sync_project_terms
+
+
+class Command(BaseCommand):
+    help = "Rebuild the tag/technology tables, their counters, the related-projects and the search index from Project rows"
+
+    def handle(self, *args, **options):
+        projects = Project.objects.only('id', 'tags', 'technologies', 'is_starred')
+        count = 0
+        for project in projects.iterator(chunk_size=500):
+            sync_project_terms(project)
+            count += 1
+        self.stdout.write(f"Synced terms of {count} projects")
+
+        recount_terms()
+        self.stdout.write("Recounted tag and technology facets")
+
+        rebuild_related_projects()
+        self.stdout.write("Rebuilt related-projects index")
+
+        rebuild_search_index()
+        self.stdout.write("Rebuilt search index")
+
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS("Indexes rebuilt"))
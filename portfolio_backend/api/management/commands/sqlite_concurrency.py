@@ -0,0 +1,162 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from api.models import Project
+from api.serializers import project_columns
+
+# The alias settings each profile adds to the configured primary: none, or the ones
+# settings.py applies when SQLITE_PRODUCTION_PROFILE is on
+PROFILES = {
+    'baseline': {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'production': settings.SQLITE_PROFILE,
+}
+
+
+def add_database(alias, path, profile):
+    """
+    Register ``alias`` for the SQLite file at ``path``: the primary's settings with the
+    profile's in place of its own, so connections open with the profile's options and
+    are kept or closed after each request according to its CONN_MAX_AGE
+    """
+    primary = connections.settings['default']
+    connections.settings[alias] = {
+        **primary,
+        'NAME': path,
+        'OPTIONS': {'timeout': primary['OPTIONS']['timeout'], **PROFILES[profile]['OPTIONS']},
+        'CONN_MAX_AGE': PROFILES[profile]['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': PROFILES[profile]['CONN_HEALTH_CHECKS'],
+    }
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+def create_catalog(alias, size):
+    """The schema, migrated into the alias's file, and ``size`` projects"""
+    call_command('migrate', database=alias, verbosity=0)
+    Project.objects.using(alias).bulk_create(
+        (Project(name=f'Project {number}', description='lorem ipsum ' * 40, technologies=['Django'], tags=['web'])
+         for number in range(size)),
+        batch_size=500,
+    )
+
+
+def serve(alias, handler):
+    """One request to ``handler`` on this thread's connection, opened and closed the way Django's request cycle does"""
+    connection = connections[alias]
+    connection.close_if_unusable_or_obsolete()
+    try:
+        handler()
+    finally:
+        connection.close_if_unusable_or_obsolete()
+
+
+def read(alias, deadline, counts, errors):
+    """One public worker: the newest page of the list view, request after request until the deadline"""
+    def newest_page():
+        list(Project.objects.using(alias).values(*project_columns())[:20])
+
+    while time.perf_counter() < deadline:
+        try:
+            serve(alias, newest_page)
+            counts.append(1)
+        except OperationalError as e:
+            errors.append(str(e))
+    connections[alias].close()
+
+
+def write(alias, deadline, size, hold, counts, errors):
+    """
+    An admin editing projects: a transaction that rewrites a batch of rows and stays open
+    for ``hold`` seconds, as the index and search updates of a real save do
+    """
+    rng = random.Random(0)
+    projects = Project.objects.using(alias)
+    ids = list(projects.values_list('id', flat=True))
+
+    def edit_batch():
+        with transaction.atomic(using=alias):
+            for project_id in rng.sample(ids, min(50, size)):
+                projects.filter(id=project_id).update(description=f'edited {time.time()} ' * 20)
+            time.sleep(hold)
+
+    while time.perf_counter() < deadline:
+        try:
+            serve(alias, edit_batch)
+            counts.append(1)
+        except OperationalError as e:
+            errors.append(str(e))
+    connections[alias].close()
+
+
+def measure(alias, readers, duration, size, hold):
+    """Reads, writes and errors of ``readers`` threads reading next to one writer"""
+    reads, writes, errors = [], [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=write, args=(alias, deadline, size, hold, writes, errors))]
+    threads += [threading.Thread(target=read, args=(alias, deadline, reads, errors)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(reads), len(writes), errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Run parallel readers next to an admin writer on a scratch copy of the api schema, once per "
+        "connection profile, and report read throughput and 'database is locked' errors"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+        parser.add_argument('--readers', type=int, default=6)
+        parser.add_argument('--duration', type=float, default=5, help="Seconds per profile")
+        parser.add_argument('--projects', type=int, default=5000)
+        parser.add_argument('--hold', type=float, default=0.02, help="Seconds each write transaction stays open")
+        parser.add_argument('--strict', action='store_true',
+                            help="Exit with an error when the production profile hit a locked database")
+
+    def handle(self, *args, **options):
+        if connections.settings['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("The default database is not SQLite")
+        columns = ['profile', 'reads/s', 'writes/s', 'errors']
+        self.stdout.write(' '.join(f'{column:>12}' for column in columns))
+
+        locked = 0
+        directory = tempfile.mkdtemp(prefix='sqlite-concurrency-')
+        try:
+            for profile in options['profiles']:
+                alias = f'sqlite_concurrency_{profile}'
+                add_database(alias, os.path.join(directory, f'{profile}.sqlite3'), profile)
+                try:
+                    create_catalog(alias, options['projects'])
+                    connections[alias].close()
+                    reads, writes, errors = measure(
+                        alias, options['readers'], options['duration'], options['projects'], options['hold']
+                    )
+                finally:
+                    remove_database(alias)
+                self.stdout.write(
+                    f"{profile:>12} {reads / options['duration']:>12.0f} {writes / options['duration']:>12.1f} "
+                    f"{len(errors):>12}"
+                )
+                for error in sorted(set(errors)):
+                    self.stdout.write(self.style.WARNING(f"  {error}"))
+                if profile == 'production':
+                    locked += sum('locked' in error for error in errors)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if locked and options['strict']:
+            raise CommandError(f"The production profile hit {locked} 'database is locked' errors")
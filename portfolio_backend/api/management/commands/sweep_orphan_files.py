@@ -0,0 +1,75 @@
+import posixpath
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.deletions import process_file_deletions
+from django.conf import settings
+from api.models import ChunkedUpload, FileDeletion, ProjectFile
+from api.storage import select_project_file_storage
+
+VARIANTS_DIRECTORY = 'projects/variants'
+
+
+def walk(storage, directory):
+    """Every file name below ``directory``, recursively"""
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = "Queue stored files that no attachment references for deletion, then work off the deletion queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Leave younger files alone, they may belong to an upload still in flight")
+        parser.add_argument('--dry-run', action='store_true', help="Only list the orphans")
+
+    def is_old(self, storage, name, cutoff):
+        return storage.get_modified_time(name) < cutoff
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        blob_storage = select_project_file_storage()
+        referenced = set(ProjectFile.objects.values_list('file', flat=True))
+        queued = set(FileDeletion.objects.values_list('name', flat=True))
+
+        # Chunked uploads nobody touched for days are abandoned, their staging files go too
+        expired = ChunkedUpload.objects.filter(
+            updated_at__lt=timezone.now() - timedelta(days=settings.CHUNKED_UPLOAD_EXPIRY_DAYS)
+        )
+        staged = {upload.part_name for upload in ChunkedUpload.objects.exclude(pk__in=expired.values('pk'))}
+
+        orphans = [
+            FileDeletion(name=name)
+            for name in walk(blob_storage, 'projects')
+            if not name.startswith(VARIANTS_DIRECTORY + '/') and name not in staged
+            and name not in referenced and name not in queued and self.is_old(blob_storage, name, cutoff)
+        ]
+
+        # Variants live in projects/variants/<blob path>/<width>w.<format>
+        orphaned_variants = {}
+        for name in walk(default_storage, VARIANTS_DIRECTORY):
+            blob = 'projects/' + posixpath.dirname(posixpath.relpath(name, VARIANTS_DIRECTORY))
+            if blob not in referenced and blob not in queued and self.is_old(default_storage, name, cutoff):
+                orphaned_variants.setdefault(blob, []).append(name)
+        for orphan in orphans:
+            orphan.variants = orphaned_variants.pop(orphan.name, [])
+        # Variants whose blob is already gone are queued under the blob name, which deletes as a no-op
+        orphans.extend(FileDeletion(name=blob, variants=names) for blob, names in orphaned_variants.items())
+
+        for orphan in orphans:
+            self.stdout.write(f"{orphan.name} ({len(orphan.variants)} variants)")
+        if options['dry_run']:
+            self.stdout.write(f"{len(orphans)} orphans found")
+            return
+
+        FileDeletion.objects.bulk_create(orphans)
+        expired.delete()
+        deleted = process_file_deletions()
+        self.stdout.write(self.style.SUCCESS(f"Queued {len(orphans)} orphans, deleted {deleted} files"))
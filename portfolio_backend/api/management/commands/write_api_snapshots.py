@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.snapshots import write_snapshots
+
+
+class Command(BaseCommand):
+    help = "Pre-render the public read API as static, precompressed JSON files for nginx"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', default=settings.API_SNAPSHOT_ROOT,
+                            help="Snapshot directory, API_SNAPSHOT_ROOT by default")
+
+    def handle(self, *args, **options):
+        if not options['root']:
+            raise CommandError("Set API_SNAPSHOT_ROOT or pass --root")
+        count = write_snapshots(options['root'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} API snapshots to {options['root']}"))
@@ -0,0 +1,285 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from hmac import compare_digest
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; one more bucket takes everything above the last
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Recorded per request: name -> (buckets, help text)
+METRICS = {
+    'request_seconds': (SECONDS_BUCKETS, "Time from the request entering Django until the response leaves it"),
+    'sql_seconds': (SECONDS_BUCKETS, "Time spent executing SQL queries"),
+    'serializer_seconds': (SECONDS_BUCKETS, "Time spent in serializers, including the queries they trigger"),
+    'queries': (QUERY_BUCKETS, "Number of SQL queries"),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
+# How often a process writes its histograms out for the other workers, in seconds
+FLUSH_INTERVAL = 1
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """What one request spent, filled in by record_query() and serializing()"""
+    __slots__ = ('queries', 'sql_seconds', 'serializer_seconds', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper, installed on every connection by api.signals"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql_seconds += time.perf_counter() - start
+        timings.queries += 1
+
+
+@contextmanager
+def serializing():
+    """Count the block into the request's serializer time; nested serializers count once"""
+    timings = _current.get()
+    if timings is None or timings.serializing:
+        yield
+        return
+    timings.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializer_seconds += time.perf_counter() - start
+        timings.serializing = False
+
+
+class Histograms:
+    """
+    Rolling per-route histograms of this process, one row of bucket counts plus a sum
+    per metric and minute. Rows older than METRICS_WINDOW_MINUTES are dropped.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (metric, route, method) -> {minute: [count per bucket..., sum]}
+        self.series = {}
+        self.flushed_at = 0
+
+    def observe(self, route, method, values):
+        minute = int(time.time() // 60)
+        oldest = minute - settings.METRICS_WINDOW_MINUTES + 1
+        with self.lock:
+            for metric, value in values.items():
+                buckets = METRICS[metric][0]
+                rows = self.series.setdefault((metric, route, method), {})
+                row = rows.setdefault(minute, [0] * (len(buckets) + 2))
+                row[bisect_left(buckets, value)] += 1
+                row[-1] += value
+                for stale in [key for key in rows if key < oldest]:
+                    del rows[stale]
+
+    def dump(self):
+        with self.lock:
+            return [[*key, rows] for key, rows in self.series.items()]
+
+    def flush(self, force=False):
+        """Write this process's histograms to METRICS_DIRECTORY, at most once per FLUSH_INTERVAL"""
+        now = time.monotonic()
+        if not force and now - self.flushed_at < FLUSH_INTERVAL:
+            return
+        self.flushed_at = now
+        directory = settings.METRICS_DIRECTORY
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(self.dump(), file)
+        os.replace(temporary_path, os.path.join(directory, f'{os.getpid()}.json'))
+
+
+registry = Histograms()
+
+
+def collect():
+    """
+    Rows of every worker within the window, summed: {(metric, route, method): row}.
+    Files of workers that stopped writing longer than a window ago are removed.
+    """
+    registry.flush(force=True)
+    directory = settings.METRICS_DIRECTORY
+    window = settings.METRICS_WINDOW_MINUTES
+    oldest = int(time.time() // 60) - window + 1
+    merged = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.endswith('.json'):
+            continue
+        try:
+            if os.path.getmtime(path) < time.time() - window * 60:
+                os.remove(path)
+                continue
+            with open(path) as file:
+                series = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for metric, route, method, rows in series:
+            if metric not in METRICS:
+                continue
+            for minute, row in rows.items():
+                if int(minute) < oldest:
+                    continue
+                total = merged.setdefault((metric, route, method), [0] * len(row))
+                for index, value in enumerate(row):
+                    total[index] += value
+    return merged
+
+
+def quantile(buckets, row, fraction):
+    """Value below which ``fraction`` of the observations fall, interpolated within its bucket"""
+    counts = row[:-1]
+    target = fraction * sum(counts)
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= target:
+            if index == len(buckets):
+                return buckets[-1]
+            lower = buckets[index - 1] if index else 0
+            return lower + (buckets[index] - lower) * (target - cumulative) / count
+        cumulative += count
+    return 0
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(merged):
+    """The merged histograms as Prometheus summaries, in the text exposition format"""
+    window = settings.METRICS_WINDOW_MINUTES
+    lines = []
+    for metric, (buckets, description) in METRICS.items():
+        name = f'api_{metric}'
+        lines.append(f'# HELP {name} {description}, per request over the last {window} minutes')
+        lines.append(f'# TYPE {name} summary')
+        for (series_metric, route, method), row in sorted(merged.items()):
+            if series_metric != metric:
+                continue
+            labels = f'route="{_label(route)}",method="{_label(method)}"'
+            for fraction in QUANTILES:
+                lines.append(f'{name}{{{labels},quantile="{fraction}"}} {quantile(buckets, row, fraction):.6g}')
+            lines.append(f'{name}_sum{{{labels}}} {row[-1]:.6g}')
+            lines.append(f'{name}_count{{{labels}}} {sum(row[:-1])}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """Lets a scraper in with ``Authorization: Bearer <METRICS_TOKEN>``, no user account needed"""
+
+    def authenticate(self, request):
+        token = settings.METRICS_TOKEN
+        header = get_authorization_header(request)
+        if token and compare_digest(header, f'Bearer {token}'.encode()):
+            return AnonymousUser(), token
+        return None
+
+    def authenticate_header(self, request):
+        # First in the view's list, so DRF answers rejected credentials with 401 rather than 403
+        return 'Bearer realm="api"'
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the total, SQL and serializer time and the query count of every request
+    under its URL route. With METRICS_PROFILE_DIRECTORY set, a METRICS_PROFILE_SAMPLE_RATE
+    share of requests runs under cProfile, and those slower than METRICS_PROFILE_THRESHOLD_MS
+    leave their stats there. The profiler sees the request's own thread only.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def start(self):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        profiler = None
+        if settings.METRICS_PROFILE_DIRECTORY and random.random() < settings.METRICS_PROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is already running in this thread
+                profiler = None
+        return timings, token, profiler, time.perf_counter()
+
+    def finish(self, request, timings, token, profiler, start):
+        elapsed = time.perf_counter() - start
+        _current.reset(token)
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+
+        if profiler is not None:
+            profiler.disable()
+            if elapsed * 1000 >= settings.METRICS_PROFILE_THRESHOLD_MS:
+                self.dump_profile(profiler, route, elapsed)
+
+        registry.observe(route, request.method, {
+            'request_seconds': elapsed,
+            'sql_seconds': timings.sql_seconds,
+            'serializer_seconds': timings.serializer_seconds,
+            'queries': timings.queries,
+        })
+        try:
+            registry.flush()
+        except OSError:
+            logger.exception("Writing request metrics failed")
+
+    def dump_profile(self, profiler, route, elapsed):
+        directory = settings.METRICS_PROFILE_DIRECTORY
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^a-z0-9]+', '-', route.lower()).strip('-') or 'root'
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        profiler.dump_stats(os.path.join(directory, f'{stamp}-{slug}-{elapsed * 1000:.0f}ms.prof'))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start()
+        try:
+            return self.get_response(request)
+        finally:
+            self.finish(request, *state)
+
+    async def __acall__(self, request):
+        state = self.start()
+        try:
+            return await self.get_response(request)
+        finally:
+            self.finish(request, *state)
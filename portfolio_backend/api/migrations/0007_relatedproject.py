@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-17 19:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_related_index(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Project = apps.get_model('api', 'Project')
+    RelatedProject = apps.get_model('api', 'RelatedProject')
+    RelationSettings = apps.get_model('api', 'RelationSettings')
+
+    relation_settings = RelationSettings.objects.using(db_alias).filter(pk=1).first()
+    excluded_tags = set(relation_settings.excluded_tags or []) if relation_settings else set()
+    excluded_technologies = set(relation_settings.excluded_technologies or []) if relation_settings else set()
+
+    def terms(values, excluded):
+        return set(values or []) - excluded
+
+    projects = [
+        (p.id, terms(p.tags, excluded_tags), terms(p.technologies, excluded_technologies))
+        for p in Project.objects.using(db_alias).order_by('id')
+    ]
+    entries = []
+    for i, (project_id, tags, techs) in enumerate(projects):
+        for other_id, other_tags, other_techs in projects[i + 1:]:
+            score = len(tags & other_tags) + len(techs & other_techs)
+            if score > 0:
+                entries.append(RelatedProject(project_id=project_id, related_id=other_id, score=score))
+                entries.append(RelatedProject(project_id=other_id, related_id=project_id, score=score))
+    RelatedProject.objects.using(db_alias).bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_relationsettings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_index', to='api.project')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', '-score', 'related'], name='related_project_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'related'), name='unique_related_project')],
+            },
+        ),
+        migrations.RunPython(build_related_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.1.4 on 2026-10-17 19:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_json_terms(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Project = apps.get_model('api', 'Project')
+    links = [
+        (apps.get_model('api', 'Tag'), apps.get_model('api', 'ProjectTag'), 'tag', 'tags'),
+        (apps.get_model('api', 'Technology'), apps.get_model('api', 'ProjectTechnology'), 'technology', 'technologies'),
+    ]
+    projects = list(Project.objects.using(db_alias).only('id', 'tags', 'technologies'))
+
+    for term_model, through, term_field, json_field in links:
+        names_by_project = {
+            project.id: {str(value) for value in getattr(project, json_field) if value is not None}
+            for project in projects
+            if isinstance(getattr(project, json_field), list)
+        }
+        all_names = set().union(*names_by_project.values())
+        term_model.objects.using(db_alias).bulk_create([term_model(name=name) for name in sorted(all_names)], batch_size=1000)
+        term_ids = dict(term_model.objects.using(db_alias).values_list('name', 'id'))
+        through.objects.using(db_alias).bulk_create(
+            [
+                through(project_id=project_id, **{f'{term_field}_id': term_ids[name]})
+                for project_id, names in names_by_project.items()
+                for name in names
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_relatedproject'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectTechnology',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('projects', models.ManyToManyField(related_name='tag_set', through='api.ProjectTag', to='api.project')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='projecttag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.tag'),
+        ),
+        migrations.CreateModel(
+            name='Technology',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('projects', models.ManyToManyField(related_name='technology_set', through='api.ProjectTechnology', to='api.project')),
+            ],
+            options={
+                'verbose_name_plural': 'Technologies',
+            },
+        ),
+        migrations.AddField(
+            model_name='projecttechnology',
+            name='technology',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.technology'),
+        ),
+        migrations.AddIndex(
+            model_name='projecttag',
+            index=models.Index(fields=['tag', 'project'], name='project_tag_lookup_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='projecttag',
+            constraint=models.UniqueConstraint(fields=('project', 'tag'), name='unique_project_tag'),
+        ),
+        migrations.AddIndex(
+            model_name='projecttechnology',
+            index=models.Index(fields=['technology', 'project'], name='project_technology_lookup_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='projecttechnology',
+            constraint=models.UniqueConstraint(fields=('project', 'technology'), name='unique_project_technology'),
+        ),
+        migrations.RunPython(copy_json_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-17 19:56
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_tag_technology'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='relationsettings',
+            name='score_normalization',
+            field=models.CharField(choices=[('none', 'Weighted count of shared terms'), ('jaccard', 'Weighted Jaccard index'), ('cosine', 'Weighted cosine similarity')], default='none', help_text='How the weighted overlap is normalized by project size', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='relationsettings',
+            name='tag_weight',
+            field=models.FloatField(default=1.0, help_text='Weight of a shared tag in the similarity score', validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='relationsettings',
+            name='technology_weight',
+            field=models.FloatField(default=1.0, help_text='Weight of a shared technology in the similarity score', validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='relatedproject',
+            name='score',
+            field=models.FloatField(),
+        ),
+    ]
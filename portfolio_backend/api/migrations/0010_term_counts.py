@@ -0,0 +1,67 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:03
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_terms(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for term_name, through_name, term_field in (('Tag', 'ProjectTag', 'tag'),
+                                                ('Technology', 'ProjectTechnology', 'technology')):
+        term_model = apps.get_model('api', term_name)
+        through = apps.get_model('api', through_name)
+
+        through.objects.using(db_alias).filter(project__is_starred=True).update(is_starred=True)
+        counts = through.objects.using(db_alias).values(f'{term_field}_id').annotate(
+            total=Count('id'),
+            starred=Count('id', filter=Q(is_starred=True)),
+        )
+        term_model.objects.using(db_alias).bulk_update(
+            [
+                term_model(id=row[f'{term_field}_id'], project_count=row['total'], starred_count=row['starred'])
+                for row in counts
+            ],
+            ['project_count', 'starred_count'],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_similarity_weights'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projecttag',
+            name='is_starred',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='projecttechnology',
+            name='is_starred',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='project_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='starred_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='technology',
+            name='project_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='technology',
+            name='starred_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_terms, migrations.RunPython.noop),
+    ]
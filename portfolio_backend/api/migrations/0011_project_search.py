@@ -0,0 +1,59 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:41
+
+from django.db import migrations
+
+SEARCH_TABLE = 'api_project_search'
+
+
+def fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_search_table(apps, schema_editor):
+    """
+    FTS5 index over project name, description, tags and technologies, rowid = project id.
+    Databases without FTS5 get no table and api.search falls back to an in-memory index.
+    """
+    connection = schema_editor.connection
+    if not fts5_supported(connection):
+        return
+    Project = apps.get_model('api', 'Project')
+
+    def joined(values):
+        if not isinstance(values, list):
+            return ''
+        return ' '.join(sorted({str(value) for value in values if value is not None}))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            f"name, description, tags, technologies, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, description, tags, technologies) VALUES (?, ?, ?, ?, ?)',
+            [
+                (p.id, p.name or '', p.description or '', joined(p.tags), joined(p.technologies))
+                for p in Project.objects.using(connection.alias)
+            ]
+        )
+
+
+def drop_search_table(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_term_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
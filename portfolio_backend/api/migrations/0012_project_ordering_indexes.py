@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_project_search'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='project',
+            options={'ordering': [models.OrderBy(models.F('created_at'), descending=True, nulls_last=True), '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-created_at', '-id'], name='project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_starred', True)), fields=['-created_at', '-id'], name='project_starred_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_starred', False)), fields=['-created_at', '-id'], name='project_unstarred_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-project_count', 'name'], name='tag_facet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='technology',
+            index=models.Index(fields=['-project_count', 'name'], name='technology_facet_idx'),
+        ),
+    ]
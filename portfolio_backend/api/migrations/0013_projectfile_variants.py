@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_project_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfile',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectfile',
+            name='variants',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectfile',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
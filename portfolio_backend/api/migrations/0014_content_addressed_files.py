@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:14
+
+import posixpath
+
+import api.storage
+from django.db import migrations, models
+
+
+def fill_names(apps, schema_editor):
+    """Existing uploads still sit under their upload names, which are the best display names there are"""
+    db_alias = schema_editor.connection.alias
+    ProjectFile = apps.get_model('api', 'ProjectFile')
+    files = list(ProjectFile.objects.using(db_alias).all())
+    for project_file in files:
+        project_file.name = posixpath.basename(project_file.file.name)[:255]
+    ProjectFile.objects.using(db_alias).bulk_update(files, ['name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_projectfile_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfile',
+            name='name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='projectfile',
+            name='file',
+            field=models.FileField(db_index=True, storage=api.storage.select_project_file_storage, upload_to='projects/'),
+        ),
+        migrations.RunPython(fill_names, migrations.RunPython.noop),
+    ]
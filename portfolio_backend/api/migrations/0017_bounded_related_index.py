@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:05
+
+from django.db import migrations
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def trim_related_index(apps, schema_editor):
+    """Keep the 50 best neighbours of every project, as api.related.RELATED_INDEX_SIZE does"""
+    db_alias = schema_editor.connection.alias
+    RelatedProject = apps.get_model('api', 'RelatedProject')
+    surplus = list(
+        RelatedProject.objects.using(db_alias).annotate(rank=Window(
+            RowNumber(), partition_by=F('project_id'), order_by=[F('score').desc(), F('related_id').asc()],
+        )).filter(rank__gt=50).values_list('id', flat=True)
+    )
+    for start in range(0, len(surplus), 500):
+        RelatedProject.objects.using(db_alias).filter(id__in=surplus[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_chunked_upload'),
+    ]
+
+    operations = [
+        migrations.RunPython(trim_related_index, migrations.RunPython.noop),
+    ]
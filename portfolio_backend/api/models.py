@@ -1,7 +1,25 @@
-from django.db import models
+import uuid
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
+from .similarity import NORMALIZATION_CHOICES, NORMALIZATION_NONE
+from .storage import select_project_file_storage
 
 class ProjectFile(models.Model):
-    file = models.FileField(upload_to='projects/')
+    # Content-addressed: rows with identical uploads share one blob, see api.storage
+    file = models.FileField(upload_to='projects/', storage=select_project_file_storage, db_index=True)
+    name = models.CharField(max_length=255, blank=True)
+    # Filled in by api.images; variants is None until derivatives were generated
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    variants = models.JSONField(blank=True, null=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        # The storage reuses a blob that exists; keep it from being deleted until this row commits
+        with transaction.atomic():
+            FileDeletion.lock_blobs()
+            super().save(*args, **kwargs)
 
 class Project(models.Model):
     name = models.CharField(max_length=255, blank=True, null=True)
@@ -12,10 +30,153 @@ class Project(models.Model):
     created_at = models.DateTimeField(blank=True, null=True)
     attached_files = models.ManyToManyField(ProjectFile, blank=True)
     is_starred = models.BooleanField(default=False)
+
+    class Meta:
+        # Newest first, undated projects last; the indexes below serve this order
+        # directly, so filtered and paginated lists never sort in a temp b-tree.
+        # Django renders is_starred filters as a bare "WHERE is_starred" / "WHERE NOT
+        # is_starred", which SQLite matches against partial indexes but cannot use as
+        # the equality prefix of an (is_starred, created_at) index.
+        ordering = [models.F('created_at').desc(nulls_last=True), '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='project_created_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_starred=True),
+                         name='project_starred_created_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_starred=False),
+                         name='project_unstarred_created_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
+class Tag(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    projects = models.ManyToManyField(Project, through='ProjectTag', related_name='tag_set')
+    # Maintained incrementally by api.terms, so facets never have to count links
+    project_count = models.PositiveIntegerField(default=0)
+    starred_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Facets list used tags most used first straight from this index
+            models.Index(fields=['-project_count', 'name'], name='tag_facet_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class Technology(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    projects = models.ManyToManyField(Project, through='ProjectTechnology', related_name='technology_set')
+    # Maintained incrementally by api.terms, so facets never have to count links
+    project_count = models.PositiveIntegerField(default=0)
+    starred_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Technologies"
+        indexes = [
+            models.Index(fields=['-project_count', 'name'], name='technology_facet_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class ProjectTag(models.Model):
+    """Normalized copy of Project.tags, kept in sync by api.signals"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    # Project.is_starred as last counted into Tag.starred_count
+    is_starred = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'tag'], name='unique_project_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'project'], name='project_tag_lookup_idx'),
+        ]
+
+class ProjectTechnology(models.Model):
+    """Normalized copy of Project.technologies, kept in sync by api.signals"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    technology = models.ForeignKey(Technology, on_delete=models.CASCADE)
+    # Project.is_starred as last counted into Technology.starred_count
+    is_starred = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'technology'], name='unique_project_technology'),
+        ]
+        indexes = [
+            models.Index(fields=['technology', 'project'], name='project_technology_lookup_idx'),
+        ]
+
+class ChunkedUpload(models.Model):
+    """
+    A resumable upload in progress. Its bytes are staged at ``part_name`` in the
+    project file storage and become a ProjectFile when it completes, see api.uploads.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Expected hex digest of the whole file")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def part_name(self):
+        return f'projects/uploads/{self.id}.part'
+
+    def __str__(self):
+        return self.name
+
+class FileDeletion(models.Model):
+    """
+    A stored blob to delete once nothing references it, with its image variants.
+    Queued in the transaction that dropped the last reference and worked off by api.deletions.
+    """
+    name = models.CharField(max_length=255)
+    variants = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    retry_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['retry_at', 'id'], name='file_deletion_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def lock_blobs(cls):
+        """
+        Take the database write lock for the rest of the current transaction. SQLite
+        locks on a transaction's first write (at BEGIN in transaction_mode IMMEDIATE),
+        so a no-op UPDATE does it in either mode. The deletion worker holds it from its
+        reference check to the unlink, and new attachments from the storage's "blob
+        exists" check to the commit of their row, so neither runs between the other's steps.
+        Transactions that already wrote hold it anyway.
+        """
+        cls.objects.filter(pk=0).update(attempts=models.F('attempts'))
+
+class RelatedProject(models.Model):
+    """Precomputed similarity between two projects, kept in sync by api.signals"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='related_index')
+    related = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'related'], name='unique_related_project'),
+        ]
+        indexes = [
+            models.Index(fields=['project', '-score', 'related'], name='related_project_rank_idx'),
+        ]
+
 class RelationSettings(models.Model):
     """Settings for controlling which tags and technologies are excluded from project relation calculations"""
     excluded_tags = models.JSONField(
@@ -30,6 +191,22 @@ class RelationSettings(models.Model):
         default=list,
         help_text="List of technologies to exclude from similarity calculations"
     )
+    tag_weight = models.FloatField(
+        default=1.0,
+        validators=[MinValueValidator(0)],
+        help_text="Weight of a shared tag in the similarity score"
+    )
+    technology_weight = models.FloatField(
+        default=1.0,
+        validators=[MinValueValidator(0)],
+        help_text="Weight of a shared technology in the similarity score"
+    )
+    score_normalization = models.CharField(
+        max_length=16,
+        choices=NORMALIZATION_CHOICES,
+        default=NORMALIZATION_NONE,
+        help_text="How the weighted overlap is normalized by project size"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -0,0 +1,96 @@
+import base64
+import json
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .models import Project
+
+
+class ProjectCursorPagination(BasePagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Projects without a creation date sort after every dated project. The cursor
+    is the position of the last row on the page, so pages stay stable while
+    projects are added or removed, and every page is a single indexed range query.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    # Same as Project.Meta.ordering, which the (created_at, id) indexes are built for
+    ordering = Project._meta.ordering
+
+    def is_requested(self, request):
+        """Pagination is opt-in, plain requests keep getting the whole list"""
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, row):
+        """Cursor after a ``values()`` row, which must carry ``created_at`` and ``id``"""
+        position = [row['created_at'].isoformat() if row['created_at'] else None, row['id']]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, project_id = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created_at = parse_datetime(created_at) if created_at is not None else None
+            return created_at, int(project_id)
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+
+    def get_page_queryset(self, queryset, request):
+        """The rows of the requested page, plus one to know whether another page follows"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, project_id = position
+            if created_at is None:
+                queryset = queryset.filter(created_at__isnull=True, id__lt=project_id)
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at)
+                    | Q(created_at=created_at, id__lt=project_id)
+                    | Q(created_at__isnull=True)
+                )
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.get_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.get_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,195 @@
+import heapq
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from .cache import get_relation_settings
+from .models import ProjectTag, ProjectTechnology, RelatedProject
+from .similarity import SimilarityEngine
+
+# Neighbours kept per project; the detail view never asks for more
+RELATED_INDEX_SIZE = 50
+
+
+def _terms(through, term_field, excluded, project_ids=None):
+    """Non-excluded term ids per project, optionally restricted to a subquery of project ids"""
+    rows = through.objects.exclude(**{f'{term_field}__name__in': excluded})
+    if project_ids is not None:
+        rows = rows.filter(project_id__in=project_ids)
+    terms = defaultdict(list)
+    for project_id, term_id in rows.values_list('project_id', f'{term_field}_id'):
+        terms[project_id].append(term_id)
+    return terms
+
+
+def _candidate_ids(project_ids, through, term_field, excluded):
+    """Subquery of projects sharing at least one non-excluded term with any of the projects"""
+    term_ids = (
+        through.objects.filter(project_id__in=project_ids)
+        .exclude(**{f'{term_field}__name__in': excluded})
+        .values(f'{term_field}_id')
+    )
+    return through.objects.filter(**{f'{term_field}_id__in': term_ids}).values('project_id')
+
+
+def _candidate_engine(relation_settings, project_ids):
+    # Only projects sharing a term can score above zero, so load just those
+    candidate_ids = (
+        _candidate_ids(project_ids, ProjectTag, 'tag', relation_settings.excluded_tags)
+        .union(_candidate_ids(project_ids, ProjectTechnology, 'technology', relation_settings.excluded_technologies))
+    )
+    return build_engine(relation_settings, project_ids=candidate_ids)
+
+
+def build_engine(relation_settings, project_ids=None):
+    """Load projects' non-excluded terms into an engine configured from a settings snapshot"""
+    excluded_tags = relation_settings.excluded_tags
+    excluded_technologies = relation_settings.excluded_technologies
+    engine = SimilarityEngine(
+        tag_weight=relation_settings.tag_weight,
+        technology_weight=relation_settings.technology_weight,
+        normalization=relation_settings.score_normalization,
+    )
+
+    tags = _terms(ProjectTag, 'tag', excluded_tags, project_ids)
+    technologies = _terms(ProjectTechnology, 'technology', excluded_technologies, project_ids)
+    for project_id in sorted(tags.keys() | technologies.keys()):
+        engine.add(project_id, tags.get(project_id, ()), technologies.get(project_id, ()))
+    return engine
+
+
+def _rank(item):
+    """Index order: best score first, ties by id"""
+    other_id, score = item
+    return -score, other_id
+
+
+def top_related(scores, limit):
+    """The ``limit`` best ``(other id, score)`` pairs of a {other id: score} mapping, in index order"""
+    return heapq.nsmallest(limit, scores.items(), key=_rank)
+
+
+def _index_rows(engine, project_id):
+    scores = engine.scores(project_id) if project_id in engine else {}
+    return [
+        RelatedProject(project_id=project_id, related_id=other_id, score=score)
+        for other_id, score in top_related(scores, RELATED_INDEX_SIZE)
+    ]
+
+
+def refill_related_projects(project_ids):
+    """Recompute the whole neighbour lists of the given projects"""
+    project_ids = list(project_ids)
+    if not project_ids:
+        return
+    engine = _candidate_engine(get_relation_settings(), project_ids)
+    entries = [entry for project_id in project_ids for entry in _index_rows(engine, project_id)]
+    with transaction.atomic():
+        RelatedProject.objects.filter(project_id__in=project_ids).delete()
+        RelatedProject.objects.bulk_create(entries)
+
+
+def full_related_holders(project):
+    """Projects listing ``project`` among full neighbour lists; they need a refill once it is gone"""
+    holders = RelatedProject.objects.filter(related_id=project.id).values('project_id')
+    return list(
+        RelatedProject.objects.filter(project_id__in=holders)
+        .values('project_id').annotate(count=Count('id'))
+        .filter(count__gte=RELATED_INDEX_SIZE)
+        .values_list('project_id', flat=True)
+    )
+
+
+def update_related_projects(project):
+    """
+    Recompute a project's neighbour list, then patch the lists of the projects it
+    enters, leaves or moves in. Each list holds only its ``RELATED_INDEX_SIZE`` best
+    neighbours, so a full list the project drops out of, or sinks to the bottom of,
+    cannot tell what comes next and is recomputed instead.
+    """
+    engine = _candidate_engine(get_relation_settings(), [project.id])
+    own_rows = _index_rows(engine, project.id)
+    scores = engine.scores(project.id) if project.id in engine else {}
+
+    previous = dict(
+        RelatedProject.objects.filter(related_id=project.id).values_list('project_id', 'score')
+    )
+    affected = previous.keys() | scores.keys()
+    # Size and weakest entry of every affected list, the latter through the rank index
+    weakest = RelatedProject.objects.filter(project_id=OuterRef('project_id')).order_by('score', '-related_id')
+    lists = {
+        row['project_id']: row for row in
+        RelatedProject.objects.filter(project_id__in=affected)
+        .values('project_id').annotate(
+            count=Count('id'),
+            weakest_score=Subquery(weakest.values('score')[:1]),
+            weakest_id=Subquery(weakest.values('related_id')[:1]),
+        )
+    }
+
+    removed, added, evicted, refill = [], [], [], []
+    for other_id in affected:
+        score = scores.get(other_id)
+        state = lists.get(other_id)
+        full = state is not None and state['count'] >= RELATED_INDEX_SIZE
+        if full:
+            # Neighbours missing from a full list rank below its weakest entry
+            floor = _rank((state['weakest_id'], state['weakest_score']))
+            fits = score is not None and _rank((project.id, score)) <= floor
+            if other_id in previous and not fits:
+                refill.append(other_id)
+                continue
+            if other_id not in previous:
+                if fits:
+                    added.append(RelatedProject(project_id=other_id, related_id=project.id, score=score))
+                    evicted.append((other_id, state['weakest_id']))
+                continue
+        if other_id in previous:
+            removed.append(other_id)
+        if score is not None:
+            added.append(RelatedProject(project_id=other_id, related_id=project.id, score=score))
+
+    with transaction.atomic():
+        RelatedProject.objects.filter(project_id=project.id).delete()
+        RelatedProject.objects.filter(related_id=project.id, project_id__in=removed).delete()
+        for other_id, related_id in evicted:
+            RelatedProject.objects.filter(project_id=other_id, related_id=related_id).delete()
+        RelatedProject.objects.bulk_create(own_rows + added)
+        refill_related_projects(refill)
+
+
+def rebuild_related_projects():
+    """Recompute the whole index, e.g. after the relation settings changed"""
+    engine = build_engine(get_relation_settings())
+
+    with transaction.atomic():
+        RelatedProject.objects.all().delete()
+        entries = []
+        for project_id in engine.ids:
+            entries.extend(_index_rows(engine, project_id))
+            if len(entries) >= 1000:
+                RelatedProject.objects.bulk_create(entries)
+                entries = []
+        RelatedProject.objects.bulk_create(entries)
+
+
+def _related_projects(project, limit):
+    return (
+        RelatedProject.objects
+        .filter(project_id=project.id)
+        .select_related('related')
+        .only('score', 'related__id', 'related__name')
+        .prefetch_related('related__attached_files')
+        .order_by('-score', 'related_id')[:limit]
+    )
+
+
+def get_related_projects(project, limit):
+    """
+    Read the ``limit`` best precomputed neighbours of a project, ties by id.
+    The (project, -score, related) index serves this as an ordered range read, no sort needed.
+    """
+    return list(_related_projects(project, limit))
+
+
+async def aget_related_projects(project, limit):
+    return [related async for related in _related_projects(project, limit)]
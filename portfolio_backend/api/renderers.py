@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_ENCODERS = ('orjson', 'stdlib')
+
+
+@checks.register()
+def check_json_encoder(app_configs, **kwargs):
+    """Fail loudly instead of quietly rendering with the slower encoder"""
+    if settings.API_JSON_ENCODER not in JSON_ENCODERS:
+        return [checks.Error(
+            f'API_JSON_ENCODER must be one of {", ".join(JSON_ENCODERS)}, not {settings.API_JSON_ENCODER!r}',
+            id='api.E001',
+        )]
+    if settings.API_JSON_ENCODER == 'orjson' and orjson is None:
+        return [checks.Error(
+            'API_JSON_ENCODER is orjson, but orjson is not installed',
+            hint="Install requirements.txt, or set API_JSON_ENCODER=stdlib to render with the json module.",
+            id='api.E002',
+        )]
+    return []
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson, several times faster than the stdlib encoder on
+    large lists, unless ``API_JSON_ENCODER`` is 'stdlib'. The output is the same compact
+    UTF-8 JSON, with U+2028/U+2029 escaped. Indented output, and data orjson refuses
+    (integers beyond 64 bits, non-string keys), go through the stdlib path. Floats of
+    1e16 and more are written as ``1e16`` rather than ``1e+16``, which parses the same.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if settings.API_JSON_ENCODER == 'stdlib' or data is None or indent is not None or self.ensure_ascii \
+                or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if orjson is None:
+            raise ImproperlyConfigured('API_JSON_ENCODER is orjson, but orjson is not installed')
+        try:
+            # Datetimes go through the DRF encoder, which writes UTC as "Z"
+            content = orjson.dumps(data, default=self.encoder_class().default,
+                                   option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,102 @@
+import os
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# State of the read-only request being served, None outside of one. Mutable rather than
+# re-set, so a write inside a sync_to_async thread is seen by the request's later queries.
+_read_request = ContextVar('read_request', default=None)
+
+
+class _ReadRequest:
+    def __init__(self):
+        self.wrote = False
+
+
+def read_alias():
+    """
+    The alias reads go to. One that opens the primary's very database, as a test mirror
+    does, is the primary: a second connection would not see its open transaction.
+    """
+    alias = settings.DATABASE_READ_ALIAS or DEFAULT_DB_ALIAS
+    if connections[alias].settings_dict['NAME'] == connections[DEFAULT_DB_ALIAS].settings_dict['NAME']:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+def _database_file(alias):
+    """Engine and real path of an alias's database, seeing through ``file:...?mode=ro`` URIs"""
+    settings_dict = connections[alias].settings_dict
+    name = str(settings_dict['NAME'])
+    if name.startswith('file:'):
+        name = name[len('file:'):].partition('?')[0]
+    return settings_dict['ENGINE'], os.path.realpath(name)
+
+
+def reads_may_lag():
+    """
+    Whether the current request reads from another database than the primary, i.e. a
+    replica that may lag behind it. The catalog version describes the primary, so such
+    reads must not be cached or tagged with it; a read-only handle on the primary's file is current.
+    """
+    if _read_request.get() is None or read_alias() == DEFAULT_DB_ALIAS:
+        return False
+    return _database_file(read_alias()) != _database_file(DEFAULT_DB_ALIAS)
+
+
+def read_from_replica(view_method):
+    """
+    Send the ORM reads of an APIView method to ``DATABASE_READ_ALIAS``. Rows read by
+    StreamingHttpResponse bodies, which run after the method returned, stay on the primary.
+    Put it above the catalog cache decorators, they check reads_may_lag().
+    """
+    if iscoroutinefunction(view_method):
+        @wraps(view_method)
+        async def async_wrapper(self, request, *args, **kwargs):
+            token = _read_request.set(_ReadRequest())
+            try:
+                return await view_method(self, request, *args, **kwargs)
+            finally:
+                _read_request.reset(token)
+        return async_wrapper
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        token = _read_request.set(_ReadRequest())
+        try:
+            return view_method(self, request, *args, **kwargs)
+        finally:
+            _read_request.reset(token)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """
+    Reads of views marked with read_from_replica go to the read-only alias, everything
+    else to the primary. Once such a view writes, e.g. the relation settings row created
+    on first use, its remaining reads go to the primary too, so it reads its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _read_request.get()
+        if state is None or state.wrote:
+            # Explicit, or rows loaded from the replica would be re-read from it
+            return DEFAULT_DB_ALIAS
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _read_request.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, read_alias()}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica mirrors the primary's schema, it is never migrated itself
+        return db == DEFAULT_DB_ALIAS or db != read_alias()
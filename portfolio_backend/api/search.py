@@ -0,0 +1,249 @@
+import bisect
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router
+from .cache import get_catalog_version
+from .models import Project
+from .terms import normalize_terms
+
+SEARCH_TABLE = 'api_project_search'
+
+# (column, weight) in table order; a hit in the name counts ten description hits
+SEARCH_COLUMNS = [
+    ('name', 10.0),
+    ('description', 1.0),
+    ('tags', 4.0),
+    ('technologies', 4.0),
+]
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Letters and digits only, like the unicode61 tokenizer the FTS5 table is built with
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+# (catalog version, InvertedIndex) of the fallback index as last built by this process
+_python_index = (None, None)
+
+# database name -> whether it has the FTS5 table, looked up once per process
+_fts5_tables = {}
+
+
+def tokenize(text):
+    """Lowercased, accent-free word tokens of ``text``"""
+    if not text:
+        return []
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return TOKEN_RE.findall(stripped)
+
+
+def document_fields(project):
+    """Column values of a project's search document, in SEARCH_COLUMNS order"""
+    return [
+        project.name or '',
+        project.description or '',
+        ' '.join(sorted(normalize_terms(project.tags))),
+        ' '.join(sorted(normalize_terms(project.technologies))),
+    ]
+
+
+def fts5_enabled():
+    """Whether the default database holds the FTS5 table created by migration 0011"""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_tables:
+        _fts5_tables[name] = SEARCH_TABLE in connection.introspection.table_names()
+    return _fts5_tables[name]
+
+
+def index_project(project):
+    """Insert or replace a project's row in the FTS5 table"""
+    if not fts5_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [project.id])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, description, tags, technologies) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            [project.id, *document_fields(project)]
+        )
+
+
+def index_new_projects(projects):
+    """Insert the search documents of freshly bulk-created projects"""
+    if not fts5_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, description, tags, technologies) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            [(project.id, *document_fields(project)) for project in projects]
+        )
+
+
+def unindex_project(project_id):
+    if not fts5_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [project_id])
+
+
+def rebuild_search_index():
+    """Refill the FTS5 table from every project, e.g. after bulk writes that skip signals"""
+    if not fts5_enabled():
+        return
+    rows = [
+        (project.id, *document_fields(project))
+        for project in Project.objects.only('id', 'name', 'description', 'tags', 'technologies').iterator()
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, description, tags, technologies) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            rows
+        )
+
+
+def _filtered_project_ids(tags, technologies):
+    """Subquery of projects carrying every given tag and technology, or None without filters"""
+    if not tags and not technologies:
+        return None
+    projects = Project.objects.all()
+    for tag in tags:
+        projects = projects.filter(tag_set__name=tag)
+    for technology in technologies:
+        projects = projects.filter(technology_set__name=technology)
+    return projects.values('id')
+
+
+def _fts5_search(tokens, tags, technologies, limit):
+    # Quoted tokens cannot carry FTS5 syntax; the trailing * makes each a prefix query
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    weights = ', '.join(str(weight) for _, weight in SEARCH_COLUMNS)
+    sql = f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+    params = [match]
+
+    filtered = _filtered_project_ids(tags, technologies)
+    if filtered is not None:
+        filtered_sql, filtered_params = filtered.query.sql_with_params()
+        sql += f' AND rowid IN ({filtered_sql})'
+        params.extend(filtered_params)
+
+    sql += f' ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid LIMIT %s'
+    params.append(-1 if limit is None else limit)
+    # Raw SQL bypasses the router, so ask it which database reads go to
+    with connections[router.db_for_read(Project)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+class InvertedIndex:
+    """
+    In-memory fallback for databases without FTS5, scoring like the FTS5 table.
+
+    Postings map each token to ``{project id: [hits per column]}``; a sorted
+    vocabulary turns prefix queries into a bisected range of tokens.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.lengths = {}
+        self.tags = {}
+        self.technologies = {}
+        self._vocabulary = None
+
+    def add(self, project_id, fields, tags=(), technologies=()):
+        """Register a project's document; ``fields`` are the SEARCH_COLUMNS values"""
+        length = 0
+        for column, text in enumerate(fields):
+            for token in tokenize(text):
+                hits = self.postings[token].setdefault(project_id, [0] * len(SEARCH_COLUMNS))
+                hits[column] += 1
+                length += 1
+        self.lengths[project_id] = length
+        self.tags[project_id] = frozenset(tags)
+        self.technologies[project_id] = frozenset(technologies)
+        self._vocabulary = None
+
+    def _expand(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = start
+        while end < len(vocabulary) and vocabulary[end].startswith(prefix):
+            end += 1
+        return vocabulary[start:end]
+
+    def _phrase_hits(self, prefix):
+        """{project id: [hits per column]} summed over every token starting with ``prefix``"""
+        hits = {}
+        for token in self._expand(prefix):
+            for project_id, columns in self.postings[token].items():
+                total = hits.setdefault(project_id, [0] * len(SEARCH_COLUMNS))
+                for column, count in enumerate(columns):
+                    total[column] += count
+        return hits
+
+    def search(self, tokens, tags=(), technologies=(), limit=None):
+        """Ids of the projects matching every token as a prefix, best BM25 score first"""
+        phrases = [self._phrase_hits(token) for token in tokens]
+        if not phrases:
+            return []
+        matched = set.intersection(*(set(hits) for hits in phrases))
+        if tags or technologies:
+            tags, technologies = set(tags), set(technologies)
+            matched = {
+                project_id for project_id in matched
+                if tags <= self.tags[project_id] and technologies <= self.technologies[project_id]
+            }
+
+        total = len(self.lengths)
+        average_length = sum(self.lengths.values()) / total if total else 0
+        scores = dict.fromkeys(matched, 0.0)
+        for hits in phrases:
+            idf = max(math.log((total - len(hits) + 0.5) / (len(hits) + 0.5)), 1e-6)
+            for project_id in matched:
+                frequency = sum(weight * count for (_, weight), count in zip(SEARCH_COLUMNS, hits[project_id]))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[project_id] / average_length)
+                scores[project_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        ranked = sorted(matched, key=lambda project_id: (-scores[project_id], project_id))
+        return ranked if limit is None else ranked[:limit]
+
+
+def get_python_index():
+    """The fallback index, rebuilt only when the catalog version moved on"""
+    global _python_index
+
+    version = get_catalog_version()
+    local_version, index = _python_index
+    if version != local_version:
+        index = InvertedIndex()
+        # Kept under the catalog version, so built from the primary rather than a lagging replica
+        projects = Project.objects.using(DEFAULT_DB_ALIAS).only('id', 'name', 'description', 'tags', 'technologies').order_by('id')
+        for project in projects.iterator():
+            index.add(
+                project.id, document_fields(project),
+                normalize_terms(project.tags), normalize_terms(project.technologies)
+            )
+        _python_index = (version, index)
+    return index
+
+
+def search_project_ids(query, tags=(), technologies=(), limit=None):
+    """
+    Ids of the projects matching every word of ``query`` as a prefix, best first.
+    Results can be narrowed to projects carrying all of the given tags and technologies.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    if fts5_enabled():
+        return _fts5_search(tokens, tags, technologies, limit)
+    return get_python_index().search(tokens, tags, technologies, limit)
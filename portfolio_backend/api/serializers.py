@@ -1,14 +1,152 @@
+import re
+from functools import cache
+from django.conf import settings
 from rest_framework import serializers
-from .models import Project, ProjectFile
+from .images import image_sources, is_image, variant_sources
+from .metrics import serializing
+from .models import ChunkedUpload, Project, ProjectFile, RelatedProject
+from .storage import select_project_file_storage
+
+class TimedSerializer(serializers.ModelSerializer):
+    """ModelSerializer whose output time counts into the request metrics, see api.metrics"""
+
+    def to_representation(self, instance):
+        with serializing():
+            return super().to_representation(instance)
+
+class ProjectFileSerializer(TimedSerializer):
+    sources = serializers.SerializerMethodField()
 
-class ProjectFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectFile
-        fields = ["id", "file"]
+        fields = ["id", "file", "name", "width", "height", "sources"]
 
-class ProjectSerializer(serializers.ModelSerializer):
+    def get_sources(self, obj):
+        """Resized AVIF/WebP srcsets for <picture>, ``file`` stays the original"""
+        return image_sources(obj)
+
+class ProjectSerializer(TimedSerializer):
     attached_files = ProjectFileSerializer(many=True, read_only=True)
 
     class Meta:
         model = Project
         fields = "__all__"
+
+    def __init__(self, *args, fields=None, **kwargs):
+        """Accept an optional ``fields`` iterable to serialize only a subset of fields"""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+# ProjectFile columns read by project_rows(), keyed by the project they are attached to
+PROJECT_FILE_COLUMNS = ['project', 'id', 'file', 'name', 'width', 'height', 'variants']
+
+# Renders created_at exactly like ProjectSerializer does
+_created_at_field = serializers.DateTimeField()
+
+@cache
+def project_field_names():
+    """Output fields of ProjectSerializer, in its order"""
+    return list(ProjectSerializer().fields)
+
+def project_columns(fields=None):
+    """
+    Project columns project_rows() needs from ``values()`` for the given fields.
+    ``id`` and ``created_at`` are always included, cursor pagination reads them.
+    """
+    columns = [field.name for field in Project._meta.concrete_fields]
+    return [column for column in columns if fields is None or column in fields or column in ('id', 'created_at')]
+
+def project_file_data(row, storage):
+    """ProjectFileSerializer output for a ProjectFile ``values()`` row"""
+    if row['variants'] is None and is_image(row['file']):
+        # Queues (or generates) the variants, like ProjectFileSerializer does
+        sources = image_sources(ProjectFile(**{column: row[column] for column in PROJECT_FILE_COLUMNS[1:]}))
+    else:
+        sources = variant_sources(row['variants'])
+    return {
+        'id': row['id'],
+        'file': storage.url(row['file']) if row['file'] else None,
+        'name': row['name'],
+        'width': row['width'],
+        'height': row['height'],
+        'sources': sources,
+    }
+
+def project_rows(rows, fields=None):
+    """
+    ``ProjectSerializer(many=True, fields=fields).data`` for Project ``values()`` rows of
+    project_columns(fields), built as plain dicts without a serializer object per field and
+    row. Attached files are read with one ``values()`` query for all rows.
+    """
+    rows = list(rows)
+    names = [name for name in project_field_names() if fields is None or name in fields]
+    with serializing():
+        files = {}
+        if 'attached_files' in names and rows:
+            storage = select_project_file_storage()
+            file_rows = ProjectFile.objects.filter(project__in=[row['id'] for row in rows]).values(
+                *PROJECT_FILE_COLUMNS
+            )
+            for file_row in file_rows:
+                files.setdefault(file_row['project'], []).append(project_file_data(file_row, storage))
+
+        data = []
+        for row in rows:
+            item = {}
+            for name in names:
+                if name == 'attached_files':
+                    item[name] = files.get(row['id'], [])
+                elif name == 'created_at':
+                    item[name] = _created_at_field.to_representation(row[name]) if row[name] else None
+                else:
+                    item[name] = row[name]
+            data.append(item)
+        return data
+
+class RelatedProjectSerializer(TimedSerializer):
+    """Compact card for the related projects of a detail response"""
+    id = serializers.IntegerField(source='related.id')
+    name = serializers.CharField(source='related.name')
+    image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RelatedProject
+        fields = ["id", "name", "score", "image"]
+
+    def get_image(self, obj):
+        """URL of the first attached image, if any"""
+        for project_file in obj.related.attached_files.all():
+            if is_image(project_file.file.name):
+                return project_file.file.url
+        return None
+
+class ChunkedUploadSerializer(TimedSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ["id", "name", "size", "offset", "sha256", "chunk_size", "created_at", "updated_at"]
+        read_only_fields = ["offset"]
+
+    def get_chunk_size(self, obj):
+        """Largest chunk a single append may carry"""
+        return settings.CHUNKED_UPLOAD_CHUNK_SIZE
+
+    def validate_name(self, value):
+        # Only the base name, the client's directories mean nothing here
+        name = value.replace('\\', '/').split('/')[-1]
+        if not name:
+            raise serializers.ValidationError("File name is required")
+        return name
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes")
+        return value
+
+    def validate_sha256(self, value):
+        if value and not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest")
+        return value
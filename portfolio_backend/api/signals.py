@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .cache import bump_catalog_version, catalog_changed, invalidate_relation_settings
+from .deletions import batched_file_deletions, queue_file_deletion
+from .images import schedule_variants
+from .metrics import record_query
+from .models import Project, ProjectFile, RelationSettings
+from .related import full_related_holders, rebuild_related_projects, refill_related_projects, update_related_projects
+from .search import index_project, unindex_project
+from .similarity import NORMALIZATION_NONE
+from .snapshots import schedule_snapshots
+from .terms import release_project_terms, sync_project_terms
+
+
+@receiver(post_save, sender=Project)
+def refresh_project_indexes(sender, instance, raw=False, **kwargs):
+    """
+    Mirror the saved project's tags and technologies into the normalized tables,
+    then refresh its related-projects index rows from them and its search document.
+    Deleted projects drop out of the first two through the cascade.
+    """
+    if raw:
+        return
+    sync_project_terms(instance)
+    update_related_projects(instance)
+    index_project(instance)
+
+
+@receiver(pre_delete, sender=Project)
+def release_project_term_counts(sender, instance, **kwargs):
+    """
+    Decrement the tag and technology counters while the project's links still exist.
+    """
+    release_project_terms(instance)
+
+
+@receiver(post_delete, sender=Project)
+def remove_project_search_document(sender, instance, **kwargs):
+    """
+    The FTS5 table has no foreign key to cascade through, so drop the row by hand.
+    """
+    unindex_project(instance.id)
+
+
+@receiver(pre_delete, sender=Project)
+def remember_related_holders(sender, instance, **kwargs):
+    """
+    Note the full neighbour lists the project is in before the cascade drops its rows.
+    """
+    instance._related_holders = full_related_holders(instance)
+
+
+@receiver(post_delete, sender=Project)
+def refill_related_holders(sender, instance, **kwargs):
+    """
+    Those lists are one short now, and only a recomputation knows their next neighbour.
+    """
+    refill_related_projects(getattr(instance, '_related_holders', ()))
+
+
+@receiver(post_save, sender=ProjectFile)
+def generate_image_variants(sender, instance, created, raw=False, **kwargs):
+    """
+    Queue thumbnails and modern-format variants of a fresh upload.
+    """
+    if created and not raw:
+        schedule_variants(instance)
+
+
+@receiver(post_delete, sender=ProjectFile)
+def release_stored_file(sender, instance, **kwargs):
+    """
+    Queue the blob and its variants for deletion; the worker keeps them if another
+    attachment with identical content still references them.
+    """
+    queue_file_deletion(instance)
+
+
+@receiver(pre_delete, sender=Project)
+def delete_attached_files(sender, instance, **kwargs):
+    """
+    Delete the project's attachments with it, unless another project links them too.
+    Runs before the delete, while the m2m links still exist; one DELETE and one queue
+    INSERT however many files the project has.
+    """
+    shared = Project.attached_files.through.objects.exclude(project_id=instance.id).values('projectfile_id')
+    with batched_file_deletions():
+        ProjectFile.objects.filter(project=instance).exclude(id__in=shared).delete()
+
+
+def created_with_defaults(instance, created):
+    """A freshly created row with default values scores exactly like having no row at all"""
+    return (
+        created and not instance.excluded_tags and not instance.excluded_technologies
+        and instance.tag_weight == 1 and instance.technology_weight == 1
+        and instance.score_normalization == NORMALIZATION_NONE
+    )
+
+
+@receiver(post_save, sender=RelationSettings)
+@receiver(post_delete, sender=RelationSettings)
+def reload_relation_settings(sender, instance, created=False, **kwargs):
+    """
+    Drop every worker's cached settings snapshot; registered before the index
+    rebuild below so that it already scores with the new settings.
+    """
+    if created_with_defaults(instance, created):
+        return
+    invalidate_relation_settings()
+    transaction.on_commit(invalidate_relation_settings)
+
+
+@receiver(post_save, sender=RelationSettings)
+def rebuild_related_projects_on_settings_change(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Exclusions, weights and normalization change every score, so rebuild the whole index.
+    """
+    if raw or created_with_defaults(instance, created):
+        return
+    rebuild_related_projects()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=ProjectFile)
+@receiver(post_delete, sender=ProjectFile)
+@receiver(post_save, sender=RelationSettings)
+@receiver(post_delete, sender=RelationSettings)
+@receiver(m2m_changed, sender=Project.attached_files.through)
+def invalidate_cached_responses(sender, **kwargs):
+    """
+    Bump the catalog version so cached read responses go stale.
+    Bump again after commit, in case a concurrent reader cached pre-commit data meanwhile.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(catalog_changed)
+def refresh_api_snapshots(sender, **kwargs):
+    """
+    Rewrite the pre-rendered API responses nginx serves once the change is committed.
+    """
+    schedule_snapshots()
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    """
+    Time every query of the connection into the request metrics. The wrapper list
+    outlives reconnects of the same connection object, so it is added only once.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
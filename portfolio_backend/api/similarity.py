@@ -0,0 +1,202 @@
+import math
+
+NORMALIZATION_NONE = 'none'
+NORMALIZATION_JACCARD = 'jaccard'
+NORMALIZATION_COSINE = 'cosine'
+
+NORMALIZATION_CHOICES = [
+    (NORMALIZATION_NONE, 'Weighted count of shared terms'),
+    (NORMALIZATION_JACCARD, 'Weighted Jaccard index'),
+    (NORMALIZATION_COSINE, 'Weighted cosine similarity'),
+]
+
+
+def iter_bits(mask):
+    """Positions of the set bits of ``mask``, lowest first"""
+    digits = bin(mask)[:1:-1]
+    position = digits.find('1')
+    while position != -1:
+        yield position
+        position = digits.find('1', position + 1)
+
+
+class SimilarityEngine:
+    """
+    Bit-vector similarity over project tags and technologies.
+
+    Projects are stored as a sparse boolean matrix in both directions: one
+    integer bit vector of term bits per project, and one bit set of project
+    positions per term (the transposed matrix). Scoring a project adds the
+    bit sets of its terms into bit-sliced counters, so the number of shared
+    terms is computed for every other project at once with a handful of
+    whole-catalog AND/XOR operations. Projects with equal counts then come
+    out as a single bit mask, and only those masks are walked in Python.
+
+    The engine knows nothing about the database; callers feed it already
+    filtered terms with :meth:`add`, in ascending id order so that ties
+    come out ordered by id.
+    """
+
+    def __init__(self, tag_weight=1.0, technology_weight=1.0, normalization=NORMALIZATION_NONE):
+        self.tag_weight = tag_weight
+        self.technology_weight = technology_weight
+        self.normalization = normalization
+
+        self.ids = []
+        self.positions = {}
+        self.tag_vectors = []
+        self.technology_vectors = []
+        self.tag_vocabulary = {}
+        self.technology_vocabulary = {}
+        self.tag_postings = []
+        self.technology_postings = []
+        self._bitsets = {}
+
+    def __contains__(self, project_id):
+        return project_id in self.positions
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _encode(self, terms, vocabulary, postings, position):
+        vector = 0
+        for term in terms:
+            bit = vocabulary.get(term)
+            if bit is None:
+                bit = vocabulary[term] = len(postings)
+                postings.append([])
+            if not vector >> bit & 1:
+                vector |= 1 << bit
+                postings[bit].append(position)
+        return vector
+
+    def add(self, project_id, tags=(), technologies=()):
+        """Register a project; call once per project"""
+        position = len(self.ids)
+        self.ids.append(project_id)
+        self.positions[project_id] = position
+        self.tag_vectors.append(self._encode(tags, self.tag_vocabulary, self.tag_postings, position))
+        self.technology_vectors.append(
+            self._encode(technologies, self.technology_vocabulary, self.technology_postings, position)
+        )
+        self._bitsets.clear()
+
+    def _posting_bitset(self, dimension, postings, bit):
+        """Bit set of the positions using a term, built once from its posting list"""
+        key = dimension, bit
+        bitset = self._bitsets.get(key)
+        if bitset is None:
+            packed = bytearray((len(self.ids) >> 3) + 1)
+            for position in postings[bit]:
+                packed[position >> 3] |= 1 << (position & 7)
+            bitset = self._bitsets[key] = int.from_bytes(packed, 'little')
+        return bitset
+
+    def _count_levels(self, dimension, weight, vector, postings, universe):
+        """
+        {shared term count: bit set of positions} for one dimension.
+
+        The term bit sets are summed with a ripple-carry adder over bit planes,
+        plane ``j`` holding bit ``j`` of every position's count.
+        """
+        if not weight or not vector:
+            return {0: universe}
+
+        planes = []
+        terms = 0
+        for bit in iter_bits(vector):
+            carry = self._posting_bitset(dimension, postings, bit)
+            terms += 1
+            for j, plane in enumerate(planes):
+                planes[j] = plane ^ carry
+                carry &= plane
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+
+        any_shared = 0
+        for plane in planes:
+            any_shared |= plane
+        levels = {0: universe & ~any_shared}
+        any_shared &= universe
+        for count in range(1, terms + 1):
+            mask = any_shared
+            for j, plane in enumerate(planes):
+                mask &= plane if count >> j & 1 else ~plane
+                if not mask:
+                    break
+            if mask:
+                levels[count] = mask
+        return levels
+
+    def shared_groups(self, position, above=None):
+        """
+        Yield ``(tag_count, technology_count, mask)`` for every non-zero combination
+        of shared term counts against ``position``; optionally only positions above ``above``.
+        """
+        universe = (1 << len(self.ids)) - 1
+        universe &= ~(1 << position)
+        if above is not None:
+            universe &= ~((1 << (above + 1)) - 1)
+
+        tag_levels = self._count_levels(
+            'tag', self.tag_weight, self.tag_vectors[position], self.tag_postings, universe
+        )
+        technology_levels = self._count_levels(
+            'technology', self.technology_weight, self.technology_vectors[position],
+            self.technology_postings, universe
+        )
+        for tag_count, tag_mask in tag_levels.items():
+            for technology_count, technology_mask in technology_levels.items():
+                if tag_count or technology_count:
+                    mask = tag_mask & technology_mask
+                    if mask:
+                        yield tag_count, technology_count, mask
+
+    def _score_groups(self, position, above=None):
+        """Yield ``(score, positions)``; plain scores come out one value per mask"""
+        tag_weight, technology_weight = self.tag_weight, self.technology_weight
+        tag_vectors, technology_vectors = self.tag_vectors, self.technology_vectors
+        tag_size = tag_vectors[position].bit_count()
+        technology_size = technology_vectors[position].bit_count()
+
+        for tag_count, technology_count, mask in self.shared_groups(position, above):
+            shared = tag_weight * tag_count + technology_weight * technology_count
+            if shared <= 0:
+                continue
+            if self.normalization == NORMALIZATION_JACCARD:
+                for other in iter_bits(mask):
+                    union = (
+                        tag_weight * (tag_size + tag_vectors[other].bit_count() - tag_count)
+                        + technology_weight * (technology_size + technology_vectors[other].bit_count()
+                                               - technology_count)
+                    )
+                    yield shared / union, (other,)
+            elif self.normalization == NORMALIZATION_COSINE:
+                size = tag_weight * tag_size + technology_weight * technology_size
+                for other in iter_bits(mask):
+                    other_size = (
+                        tag_weight * tag_vectors[other].bit_count()
+                        + technology_weight * technology_vectors[other].bit_count()
+                    )
+                    yield shared / math.sqrt(size * other_size), (other,)
+            else:
+                yield shared, iter_bits(mask)
+
+    def scores(self, project_id):
+        """{other project id: score} for every project with a positive score"""
+        ids = self.ids
+        return {
+            ids[other]: score
+            for score, others in self._score_groups(self.positions[project_id])
+            for other in others
+        }
+
+    def pairs(self):
+        """Yield ``(project_id, other_id, score)`` once for every related pair"""
+        ids = self.ids
+        for position in range(len(ids)):
+            for score, others in self._score_groups(position, above=position):
+                for other in others:
+                    yield ids[position], ids[other], score
@@ -0,0 +1,181 @@
+import fcntl
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from .cache import get_catalog_version
+from .models import Project
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Symlink in API_SNAPSHOT_ROOT to the published build, nginx's document root for snapshots
+CURRENT_LINK = 'current'
+BUILD_PREFIX = 'build-'
+# Held while a process renders and publishes, so the workers build one after another
+LOCK_FILE = '.lock'
+
+_executor = None
+_executor_lock = threading.Lock()
+# Whether a rewrite is waiting in the executor, so a burst of changes queues just one
+_queued = False
+# Set while this thread renders snapshots, whose lazy image variants must not queue another rewrite
+_writing = threading.local()
+
+
+def snapshot_requests():
+    """
+    (path, query string, file) of every pre-rendered response. The file is the path plus
+    ``index.json``, or ``starred.json`` for the starred list, matching the map in nginx-portfolio.conf.
+    """
+    projects = reverse('project-list')
+    yield projects, '', f'{projects}index.json'
+    yield projects, 'is_starred=true', f'{projects}starred.json'
+    yield reverse('technologies-list'), '', f"{reverse('technologies-list')}index.json"
+    for project_id in Project.objects.order_by('id').values_list('id', flat=True).iterator():
+        detail = reverse('project-detail', kwargs={'id': project_id})
+        yield detail, '', f'{detail}index.json'
+
+
+def render(path, query):
+    """The body the API answers a plain GET with, or None if that is not a 200"""
+    match = resolve(path)
+    view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+    response = view(RequestFactory().get(path, QUERY_STRING=query), *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response.content if response.status_code == 200 else None
+
+
+def write_file(directory, name, content):
+    path = os.path.join(directory, name.lstrip('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+    # Precompressed once here, so nginx never compresses per request (gzip_static / brotli_static)
+    with open(path + '.gz', 'wb') as file:
+        file.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as file:
+            file.write(brotli.compress(content))
+
+
+def render_build(root):
+    """Render every public read response into a fresh build directory; returns it and the number written"""
+    build = tempfile.mkdtemp(prefix=BUILD_PREFIX, dir=root)
+    count = 0
+    _writing.active = True
+    try:
+        for path, query, name in snapshot_requests():
+            content = render(path, query)
+            if content is not None:
+                write_file(build, name, content)
+                count += 1
+        # mkdtemp creates the directory private to us, nginx has to read it
+        os.chmod(build, 0o755)
+    except BaseException:
+        shutil.rmtree(build, ignore_errors=True)
+        raise
+    finally:
+        _writing.active = False
+    return build, count
+
+
+def publish_build(root, build):
+    """Atomically repoint the ``current`` symlink at ``build``"""
+    link = os.path.join(root, CURRENT_LINK)
+    staged_link = os.path.join(root, f'.{CURRENT_LINK}.tmp')
+    if os.path.lexists(staged_link):
+        os.remove(staged_link)
+    os.symlink(os.path.basename(build), staged_link)
+    os.replace(staged_link, link)
+
+
+def write_snapshots(root=None):
+    """
+    Render every public read response into a fresh build directory, then publish it by
+    atomically repointing the ``current`` symlink, so nginx never sees a half-written
+    tree. A file lock serializes the builds of all worker processes, and a build is
+    only published if the catalog version did not change while it was rendered;
+    otherwise it is rendered again. Builds older than the published one are removed.
+    Returns the number of responses written.
+    """
+    root = root or settings.API_SNAPSHOT_ROOT
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        while True:
+            version = get_catalog_version()
+            build, count = render_build(root)
+            if get_catalog_version() == version:
+                break
+            # A change landed meanwhile and this build may predate it
+            shutil.rmtree(build, ignore_errors=True)
+        try:
+            publish_build(root, build)
+        except BaseException:
+            shutil.rmtree(build, ignore_errors=True)
+            raise
+
+        published = os.stat(build).st_mtime
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.startswith(BUILD_PREFIX) and path != build and os.stat(path).st_mtime < published:
+                shutil.rmtree(path, ignore_errors=True)
+    return count
+
+
+def unpublish_snapshots():
+    """Send every read request back to Django until the next build is published"""
+    link = os.path.join(settings.API_SNAPSHOT_ROOT, CURRENT_LINK)
+    if os.path.lexists(link):
+        os.remove(link)
+
+
+def _run():
+    global _queued
+    _queued = False
+    try:
+        write_snapshots()
+    except Exception:
+        logger.exception("Writing API snapshots failed")
+    finally:
+        close_old_connections()
+
+
+def refresh_snapshots():
+    """
+    Take the published snapshots offline and have the background worker write new ones.
+    With ``API_SNAPSHOT_WORKER = False`` they are written inline instead.
+    """
+    global _executor, _queued
+
+    unpublish_snapshots()
+    if not settings.API_SNAPSHOT_WORKER:
+        write_snapshots()
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='api-snapshots')
+        if not _queued:
+            _queued = True
+            _executor.submit(_run)
+
+
+def schedule_snapshots():
+    """Refresh the snapshots once the current transaction commits, if they are enabled"""
+    if not settings.API_SNAPSHOT_ROOT or getattr(_writing, 'active', False):
+        return
+    transaction.on_commit(refresh_snapshots)
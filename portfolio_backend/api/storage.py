@@ -0,0 +1,108 @@
+import hashlib
+import os
+import re
+import tempfile
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+# What ContentAddressedStorage.blob_name makes of an upload to ``projects/``
+BLOB_NAME = re.compile(r'projects/([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.[^/.]+)?')
+
+
+def select_project_file_storage():
+    return storages['project_files']
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under the SHA-256 of its bytes, e.g. ``projects/3f/3fa2...e1.png``.
+
+    Identical uploads map to one blob, so saving a file whose content already
+    exists writes nothing. The bytes are hashed while they are copied, and uploads
+    that went through the hashing upload handlers below arrive already hashed, so a
+    duplicate is recognized without touching its content at all. Blobs are shared,
+    deleting one is up to the caller once nothing references it any more.
+    """
+
+    def blob_name(self, directory, digest, extension):
+        return os.path.join(directory, digest[:2], f'{digest}{extension.lower()}').replace('\\', '/')
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, see _save
+        return name
+
+    def adopt(self, staged_name, name, digest):
+        """
+        Move a fully written file of this storage to the blob of ``digest``, renaming
+        rather than copying; the extension comes from ``name``. Returns the blob name.
+        """
+        directory = os.path.dirname(name)
+        blob = self.blob_name(directory, digest, os.path.splitext(name)[1])
+        if self.exists(blob):
+            self.delete(staged_name)
+        else:
+            os.makedirs(os.path.dirname(self.path(blob)), exist_ok=True)
+            os.replace(self.path(staged_name), self.path(blob))
+        return blob
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1]
+
+        digest = getattr(content, 'content_hash', None)
+        if digest is not None and self.exists(self.blob_name(directory, digest, extension)):
+            return self.blob_name(directory, digest, extension)
+
+        # Copy into a temporary file next to the blobs, hashing on the way
+        os.makedirs(self.path(directory), exist_ok=True)
+        hasher = hashlib.sha256()
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.path(directory), suffix='.upload')
+        try:
+            with os.fdopen(descriptor, 'wb') as temporary:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    temporary.write(chunk)
+
+            name = self.blob_name(directory, hasher.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temporary_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                # Atomic, so concurrent uploads of the same content cannot tear the blob
+                os.replace(temporary_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return name
+
+
+class ContentHashMixin:
+    """Hash upload chunks as they stream in and attach the digest to the uploaded file"""
+
+    def new_file(self, *args, **kwargs):
+        # Before super(): the memory handler claims the file by raising StopFutureHandlers
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(ContentHashMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(ContentHashMixin, TemporaryFileUploadHandler):
+    pass
@@ -0,0 +1,134 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import ProjectTag, ProjectTechnology, Tag, Technology
+
+# (term model, through model, foreign key name on the through model, Project JSON field)
+TERM_KINDS = [
+    (Tag, ProjectTag, 'tag', 'tags'),
+    (Technology, ProjectTechnology, 'technology', 'technologies'),
+]
+
+
+def normalize_terms(values):
+    """Turn a tags/technologies JSON list into a set of distinct names"""
+    if not isinstance(values, list):
+        return set()
+    return {str(value) for value in values if value is not None}
+
+
+def _get_or_create_terms(model, names):
+    """Return {name: id} for the given names, creating the missing rows in one query"""
+    existing = dict(model.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = [model(name=name) for name in names if name not in existing]
+    if missing:
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        existing = dict(model.objects.filter(name__in=names).values_list('name', 'id'))
+    return existing
+
+
+def _apply_count_deltas(term_model, deltas):
+    """Apply {term id: (project delta, starred delta)} with one UPDATE per distinct delta"""
+    groups = defaultdict(list)
+    for term_id, delta in deltas.items():
+        if delta != (0, 0):
+            groups[delta].append(term_id)
+    for (project_delta, starred_delta), term_ids in groups.items():
+        term_model.objects.filter(id__in=term_ids).update(
+            project_count=F('project_count') + project_delta,
+            starred_count=F('starred_count') + starred_delta,
+        )
+
+
+def _sync_links(project, through, term_model, term_field, names):
+    term_ids = _get_or_create_terms(term_model, names)
+    current = dict(
+        through.objects.filter(project_id=project.id).values_list(f'{term_field}_id', 'is_starred')
+    )
+    wanted = set(term_ids.values())
+    starred = project.is_starred
+
+    removed = current.keys() - wanted
+    added = wanted - current.keys()
+    restarred = {term_id for term_id in wanted & current.keys() if current[term_id] != starred}
+
+    if removed:
+        through.objects.filter(project_id=project.id, **{f'{term_field}_id__in': removed}).delete()
+    if restarred:
+        through.objects.filter(project_id=project.id, **{f'{term_field}_id__in': restarred}) \
+            .update(is_starred=starred)
+    through.objects.bulk_create(
+        through(project_id=project.id, is_starred=starred, **{f'{term_field}_id': term_id})
+        for term_id in added
+    )
+
+    deltas = {term_id: (-1, -int(current[term_id])) for term_id in removed}
+    deltas.update({term_id: (1, int(starred)) for term_id in added})
+    deltas.update({term_id: (0, 1 if starred else -1) for term_id in restarred})
+    _apply_count_deltas(term_model, deltas)
+
+
+def sync_project_terms(project):
+    """Mirror the project's JSON tags and technologies into the normalized tables and counters"""
+    with transaction.atomic():
+        for term_model, through, term_field, json_field in TERM_KINDS:
+            _sync_links(project, through, term_model, term_field, normalize_terms(getattr(project, json_field)))
+
+
+def link_new_project_terms(projects):
+    """
+    Link freshly bulk-created projects to their terms and count them in, a few
+    queries per batch instead of a sync per project. The projects must have no links yet.
+    """
+    with transaction.atomic():
+        for term_model, through, term_field, json_field in TERM_KINDS:
+            names = {project.id: normalize_terms(getattr(project, json_field)) for project in projects}
+            term_ids = _get_or_create_terms(term_model, set().union(*names.values()))
+            links = [
+                through(project_id=project.id, is_starred=project.is_starred, **{f'{term_field}_id': term_ids[name]})
+                for project in projects for name in names[project.id]
+            ]
+            through.objects.bulk_create(links, batch_size=1000)
+
+            deltas = defaultdict(lambda: (0, 0))
+            for link in links:
+                project_delta, starred_delta = deltas[getattr(link, f'{term_field}_id')]
+                deltas[getattr(link, f'{term_field}_id')] = (project_delta + 1, starred_delta + int(link.is_starred))
+            _apply_count_deltas(term_model, deltas)
+
+
+def release_project_terms(project):
+    """Take a project that is about to be deleted out of the counters; its links cascade"""
+    with transaction.atomic():
+        for term_model, through, term_field, _ in TERM_KINDS:
+            links = through.objects.filter(project_id=project.id).values_list(f'{term_field}_id', 'is_starred')
+            _apply_count_deltas(term_model, {term_id: (-1, -int(is_starred)) for term_id, is_starred in links})
+
+
+def recount_terms():
+    """Recompute every counter from the link tables, e.g. after bulk writes that skip signals"""
+    with transaction.atomic():
+        for term_model, through, term_field, _ in TERM_KINDS:
+            links = through.objects.filter(**{f'{term_field}_id': OuterRef('pk')}).values(f'{term_field}_id')
+            term_model.objects.update(
+                project_count=Coalesce(Subquery(links.annotate(total=Count('id')).values('total')), 0),
+                starred_count=Coalesce(
+                    Subquery(links.filter(is_starred=True).annotate(total=Count('id')).values('total')), 0
+                ),
+            )
+
+
+def used_technologies():
+    """Names of technologies attached to at least one project, alphabetically"""
+    return Technology.objects.filter(project_count__gt=0).order_by('name').values_list('name', flat=True)
+
+
+def term_facets(term_model, ordering=('-project_count', 'name')):
+    """[{name, count, starred_count}] of the used terms, most used first by default"""
+    rows = (
+        term_model.objects.filter(project_count__gt=0)
+        .order_by(*ordering)
+        .values_list('name', 'project_count', 'starred_count')
+    )
+    return [{'name': name, 'count': count, 'starred_count': starred} for name, count, starred in rows]
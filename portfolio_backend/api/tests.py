@@ -1,9 +1,56 @@
-from django.urls import reverse
+from asgiref.sync import iscoroutinefunction
+from django.urls import resolve, reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
 from django.contrib.auth.models import User
-from .models import Project
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from . import search, snapshots
+from .cache import CATALOG_VERSION_KEY, bump_catalog_version, get_catalog_version, get_relation_settings
+from .catalog import generate_catalog
+from .deletions import process_file_deletions
+from .management.commands.sqlite_concurrency import add_database, create_catalog, remove_database, serve
+from .metrics import METRICS, Histograms
+from .related import rebuild_related_projects
+from .renderers import FastJSONRenderer, check_json_encoder
+from .routers import read_alias, read_from_replica, reads_may_lag
+from .serializers import ProjectSerializer
+from .similarity import SimilarityEngine
+from .snapshots import write_snapshots
+from .views import ProjectDetailView, ProjectListView, ahealth_check
+from .models import FileDeletion, Project, ProjectFile, RelatedProject, RelationSettings, Tag, Technology
+import fcntl
+import gzip
+import hashlib
 import json
+import os
+import pstats
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
+from unittest import mock
+
+class CatalogAPITestCase(APITestCase):
+    """Start every test with an empty response cache, just like the rolled-back database"""
+    def _pre_setup(self):
+        super()._pre_setup()
+        cache.clear()
+
 
 class SecurityTests(APITestCase):
     def setUp(self):
@@ -121,3 +168,1493 @@ class APIFunctionalTests(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
         resp = self.client.get(reverse('relation-settings'))
         self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ProjectListQueryCountTests(CatalogAPITestCase):
+    def create_catalog(self, size):
+        projects = Project.objects.bulk_create(
+            Project(name=f'Project {i}', tags=['tag'], technologies=['Django']) for i in range(size)
+        )
+        files = ProjectFile.objects.bulk_create(
+            ProjectFile(file=f'projects/screenshot_{i}.png') for i in range(size)
+        )
+        Project.attached_files.through.objects.bulk_create(
+            Project.attached_files.through(project_id=project.id, projectfile_id=file.id)
+            for project, file in zip(projects, files)
+        )
+        # bulk_create skips the signals that normally invalidate cached responses
+        bump_catalog_version()
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    def test_attached_files_are_serialized(self):
+        self.create_catalog(1)
+        _, response = self.count_list_queries()
+        self.assertEqual(
+            response.data[0]['attached_files'],
+            [{'id': ProjectFile.objects.get().id, 'file': '/media/projects/screenshot_0.png', 'name': '',
+              'width': None, 'height': None, 'sources': []}]
+        )
+
+    def test_query_count_does_not_grow_with_catalog(self):
+        self.create_catalog(10)
+        small_count, _ = self.count_list_queries()
+
+        self.create_catalog(9990)
+        large_count, response = self.count_list_queries()
+
+        self.assertEqual(len(response.data), 10000)
+        self.assertEqual(small_count, large_count)
+
+
+class RelatedProjectsIndexTests(CatalogAPITestCase):
+    def related_ids(self, project):
+        response = self.client.get(reverse('project-detail', args=[project.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [related['id'] for related in response.data['related_projects']]
+
+    def test_related_projects_ordered_by_score_then_id(self):
+        base = Project.objects.create(name='Base', tags=['web', 'api'], technologies=['Django', 'React'])
+        one_match = Project.objects.create(name='One', tags=['web'])
+        two_matches = Project.objects.create(name='Two', tags=['api'], technologies=['React'])
+        tie = Project.objects.create(name='Tie', technologies=['Django'])
+        Project.objects.create(name='None', tags=['mobile'])
+
+        self.assertEqual(self.related_ids(base), [two_matches.id, one_match.id, tie.id])
+
+    def test_index_follows_project_updates_and_deletes(self):
+        base = Project.objects.create(name='Base', tags=['web'])
+        other = Project.objects.create(name='Other', tags=['mobile'])
+        self.assertEqual(self.related_ids(base), [])
+
+        other.tags = ['web']
+        other.save()
+        self.assertEqual(self.related_ids(base), [other.id])
+        self.assertEqual(self.related_ids(other), [base.id])
+
+        other.delete()
+        self.assertEqual(self.related_ids(base), [])
+        self.assertFalse(RelatedProject.objects.exists())
+
+    def test_index_rebuilt_when_relation_settings_change(self):
+        base = Project.objects.create(name='Base', tags=['web'], technologies=['Django'])
+        other = Project.objects.create(name='Other', tags=['web'])
+        self.assertEqual(self.related_ids(base), [other.id])
+
+        settings = RelationSettings.get_current_settings()
+        settings.excluded_tags = ['web']
+        settings.save()
+        self.assertEqual(self.related_ids(base), [])
+
+    def index_rows(self):
+        return sorted(RelatedProject.objects.values_list('project_id', 'related_id', 'score'))
+
+    def test_index_keeps_only_the_best_neighbours_through_updates(self):
+        with mock.patch('api.related.RELATED_INDEX_SIZE', 2):
+            base = Project.objects.create(name='Base', tags=['a', 'b', 'c'])
+            projects = [
+                Project.objects.create(name=f'P{number}', tags=tags)
+                for number, tags in enumerate([['a'], ['a', 'b'], ['a', 'b', 'c'], ['b'], ['c']])
+            ]
+            self.assertEqual(self.related_ids(base), [projects[2].id, projects[1].id])
+            self.assertLessEqual(RelatedProject.objects.filter(project=base).count(), 2)
+
+            # Sink, lift and delete list members; each step must match a full rebuild
+            for project, tags in [(projects[2], ['z']), (projects[0], ['a', 'b', 'c']), (projects[1], ['c'])]:
+                project.tags = tags
+                project.save()
+                incremental = self.index_rows()
+                rebuild_related_projects()
+                self.assertEqual(incremental, self.index_rows())
+            projects[0].delete()
+            incremental = self.index_rows()
+            rebuild_related_projects()
+            self.assertEqual(incremental, self.index_rows())
+            self.assertEqual(self.related_ids(base), [projects[1].id, projects[3].id])
+
+
+class NormalizedTermsTests(CatalogAPITestCase):
+    def test_terms_follow_project_json_lists(self):
+        project = Project.objects.create(name='One', tags=['web', 'api'], technologies=['Django'])
+        self.assertEqual(sorted(project.tag_set.values_list('name', flat=True)), ['api', 'web'])
+        self.assertEqual(list(project.technology_set.values_list('name', flat=True)), ['Django'])
+
+        project.tags = ['web']
+        project.technologies = ['Django', 'React']
+        project.save()
+        self.assertEqual(list(project.tag_set.values_list('name', flat=True)), ['web'])
+        self.assertEqual(list(Tag.objects.get(name='web').projects.all()), [project])
+        self.assertEqual(Technology.objects.get(name='React').projects.count(), 1)
+
+    def test_technologies_list_is_sorted_and_skips_unused(self):
+        project = Project.objects.create(name='One', technologies=['React', 'Django'])
+        Project.objects.create(name='Two', technologies=['Django'])
+        project.technologies = ['Django']
+        project.save()
+
+        response = self.client.get(reverse('technologies-list'))
+        self.assertEqual(response.data, ['Django'])
+
+    def test_api_shape_is_unchanged(self):
+        project = Project.objects.create(name='One', tags=['web'], technologies=['Django'])
+        response = self.client.get(reverse('project-detail', args=[project.id]))
+        self.assertEqual(response.data['tags'], ['web'])
+        self.assertEqual(response.data['technologies'], ['Django'])
+        self.assertNotIn('tag_set', response.data)
+
+
+class ProjectListPaginationTests(CatalogAPITestCase):
+    def setUp(self):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.dated = [
+            Project.objects.create(name=f'Dated {i}', created_at=start + timedelta(days=i // 2))
+            for i in range(5)
+        ]
+        self.undated = [Project.objects.create(name=f'Undated {i}') for i in range(2)]
+
+    def test_cursor_pages_walk_catalog_newest_first(self):
+        url = reverse('project-list') + '?page_size=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(project['id'] for project in response.data['results'])
+            url = response.data['next']
+
+        expected = sorted(self.dated, key=lambda p: (p.created_at, p.id), reverse=True)
+        expected += sorted(self.undated, key=lambda p: p.id, reverse=True)
+        self.assertEqual(seen, [project.id for project in expected])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('project-list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unpaginated_list_is_unchanged(self):
+        response = self.client.get(reverse('project-list'))
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(reverse('project-list') + '?fields=name,is_starred')
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'is_starred'})
+
+    def test_ndjson_stream(self):
+        response = self.client.get(reverse('project-list') + '?stream=true&fields=name')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(set(json.loads(lines[0])), {'id', 'name'})
+
+
+class FastRenderingTests(CatalogAPITestCase):
+    def setUp(self):
+        self.project = Project.objects.create(
+            name='Проект \u2028 "quoted"', description='Line\nbreak', technologies=['Django'], tags=['web'],
+            links={'github': 'https://github.com/example', 'stars': 12, 'ratio': 0.5},
+            created_at=datetime(2024, 1, 1, 12, 30, 15, 123456, tzinfo=timezone.utc), is_starred=True,
+        )
+        # bulk_create: the variants are given, nothing should be queued for these files
+        self.project.attached_files.add(*ProjectFile.objects.bulk_create([
+            ProjectFile(file='projects/doc.pdf', name='Doc'),
+            ProjectFile(file='projects/shot.png', name='Shot', width=640, height=320, variants=[
+                {'name': 'projects/variants/shot-320.webp', 'width': 320, 'format': 'webp'},
+            ]),
+        ]))
+        Project.objects.create(name=None, technologies=None)
+
+    def serializer_body(self, **kwargs):
+        projects = Project.objects.prefetch_related('attached_files')
+        return JSONRenderer().render(ProjectSerializer(projects, many=True, **kwargs).data)
+
+    def test_list_matches_serializer_output(self):
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.content, self.serializer_body())
+        self.assertIn(b'\\u2028', response.content)
+
+        response = self.client.get(reverse('project-list') + '?fields=name,created_at,attached_files')
+        self.assertEqual(response.content, self.serializer_body(fields={'id', 'name', 'created_at', 'attached_files'}))
+
+    def test_renderer_falls_back_to_stdlib_encoder(self):
+        for data in [{'big': 2 ** 70}, {1: 'int key'}, {'when': datetime(2024, 1, 1, tzinfo=timezone.utc)}]:
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render({'a': [1]}, 'application/json; indent=2'),
+                         JSONRenderer().render({'a': [1]}, 'application/json; indent=2'))
+
+    def test_encoder_is_an_explicit_setting(self):
+        self.assertEqual(check_json_encoder(None), [])
+        with override_settings(API_JSON_ENCODER='ujson'):
+            self.assertEqual([error.id for error in check_json_encoder(None)], ['api.E001'])
+        with mock.patch('api.renderers.orjson', None):
+            self.assertEqual([error.id for error in check_json_encoder(None)], ['api.E002'])
+            with override_settings(API_JSON_ENCODER='stdlib'):
+                self.assertEqual(check_json_encoder(None), [])
+                response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.content, self.serializer_body())
+
+
+class ResponseCacheTests(CatalogAPITestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name='Cached', tags=['web'], technologies=['Django'])
+
+    def assert_cached_after_first_hit(self, url):
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(first.content, second.content)
+        return second
+
+    def test_read_endpoints_are_served_from_cache(self):
+        self.assert_cached_after_first_hit(reverse('project-list'))
+        self.assert_cached_after_first_hit(reverse('project-list') + '?is_starred=true')
+        self.assert_cached_after_first_hit(reverse('project-detail', args=[self.project.id]))
+        self.assert_cached_after_first_hit(reverse('technologies-list'))
+
+    def test_writes_invalidate_cached_responses(self):
+        url = reverse('project-list')
+        self.assert_cached_after_first_hit(url)
+
+        self.project.name = 'Renamed'
+        self.project.save()
+        self.assertEqual(self.client.get(url).json()[0]['name'], 'Renamed')
+
+        self.project.attached_files.add(ProjectFile.objects.create(file='projects/a.png'))
+        self.assertEqual(len(self.client.get(url).json()[0]['attached_files']), 1)
+
+        self.project.delete()
+        self.assertEqual(self.client.get(url).json(), [])
+
+    def test_missing_project_is_not_cached(self):
+        url = reverse('project-detail', args=[self.project.id + 1])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        Project.objects.create(id=self.project.id + 1, name='Late')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_file_based_cache_is_shared_between_processes(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}
+            with override_settings(CACHES=caches):
+                url = reverse('project-list')
+                self.assert_cached_after_first_hit(url)
+
+                # Another worker opening the same directory sees the same version
+                other_worker = FileBasedCache(location, {})
+                self.assertEqual(other_worker.get(CATALOG_VERSION_KEY)[0], get_catalog_version())
+
+                other_worker.set(CATALOG_VERSION_KEY, ('bumped-elsewhere', 0), timeout=None)
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertGreater(len(queries), 0)
+
+
+class ConditionalGetTests(CatalogAPITestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name='Validated', technologies=['Django'])
+        self.urls = [
+            reverse('project-list'),
+            reverse('project-detail', args=[self.project.id]),
+            reverse('technologies-list'),
+        ]
+
+    def test_matching_etag_returns_304_without_queries(self):
+        for url in self.urls:
+            first = self.client.get(url)
+            etag = first['ETag']
+            self.assertEqual(first['Cache-Control'], 'no-cache')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(len(queries), 0)
+
+    def test_if_modified_since_returns_304(self):
+        last_modified = self.client.get(self.urls[0])['Last-Modified']
+        response = self.client.get(self.urls[0], HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_write(self):
+        etag = self.client.get(self.urls[0])['ETag']
+        self.project.name = 'Changed'
+        self.project.save()
+
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['name'], 'Changed')
+
+
+class SimilarityEngineTests(CatalogAPITestCase):
+    projects = [
+        (1, ['web', 'api'], ['Django', 'React']),
+        (2, ['web'], []),
+        (3, ['api'], ['React']),
+        (4, [], ['Django']),
+        (5, ['mobile'], []),
+    ]
+
+    def engine(self, **kwargs):
+        engine = SimilarityEngine(**kwargs)
+        for project in self.projects:
+            engine.add(*project)
+        return engine
+
+    def test_plain_scores_count_shared_terms(self):
+        self.assertEqual(self.engine().scores(1), {2: 1, 3: 2, 4: 1})
+        self.assertEqual(self.engine().scores(5), {})
+
+    def test_weights_and_normalization(self):
+        self.assertEqual(self.engine(tag_weight=0, technology_weight=2).scores(1), {3: 2, 4: 2})
+        self.assertEqual(self.engine(normalization='jaccard').scores(1), {2: 1 / 4, 3: 2 / 4, 4: 1 / 4})
+        self.assertAlmostEqual(self.engine(normalization='cosine').scores(1)[3], 2 / (4 * 2) ** 0.5)
+
+    def test_pairs_match_scores(self):
+        engine = self.engine()
+        pairs = {(a, b): score for a, b, score in engine.pairs()}
+        self.assertEqual(pairs, {(1, 2): 1, (1, 3): 2, (1, 4): 1})
+
+    def test_relation_settings_weights_reorder_related_projects(self):
+        base = Project.objects.create(name='Base', tags=['web'], technologies=['Django'])
+        by_tag = Project.objects.create(name='Tag', tags=['web'])
+        by_tech = Project.objects.create(name='Tech', technologies=['Django'])
+        url = reverse('project-detail', args=[base.id])
+        self.assertEqual([p['id'] for p in self.client.get(url).data['related_projects']], [by_tag.id, by_tech.id])
+
+        settings = RelationSettings.get_current_settings()
+        settings.technology_weight = 3
+        settings.save()
+        self.assertEqual([p['id'] for p in self.client.get(url).data['related_projects']], [by_tech.id, by_tag.id])
+
+    def test_relation_settings_api_validates_weights(self):
+        user = User.objects.create_user(username='admin', password='pass1234')
+        self.client.force_authenticate(user)
+        response = self.client.put(reverse('relation-settings'), {'score_normalization': 'bogus'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.put(
+            reverse('relation-settings'),
+            {'tag_weight': 0.5, 'score_normalization': 'jaccard'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tag_weight'], 0.5)
+        self.assertEqual(response.data['score_normalization'], 'jaccard')
+
+
+class RelatedProjectsPayloadTests(CatalogAPITestCase):
+    def setUp(self):
+        self.base = Project.objects.create(name='Base', tags=['web', 'api'])
+        self.best = Project.objects.create(name='Best', tags=['web', 'api'])
+        self.best.attached_files.add(
+            ProjectFile.objects.create(file='projects/readme.pdf'),
+            ProjectFile.objects.create(file='projects/shot.PNG'),
+        )
+        self.others = [Project.objects.create(name=f'Other {i}', tags=['web']) for i in range(10)]
+
+    def get_related(self, query=''):
+        response = self.client.get(reverse('project-detail', args=[self.base.id]) + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['related_projects']
+
+    def test_compact_payload_with_first_image(self):
+        best = self.get_related()[0]
+        self.assertEqual(best, {'id': self.best.id, 'name': 'Best', 'score': 2.0, 'image': '/media/projects/shot.PNG'})
+        self.assertIsNone(self.get_related()[1]['image'])
+
+    def test_cards_do_not_load_full_projects(self):
+        Project.objects.filter(id=self.best.id).update(description='long text')
+        with CaptureQueriesContext(connection) as queries:
+            self.get_related()
+        related_query, = [query['sql'] for query in queries if 'FROM "api_relatedproject"' in query['sql']]
+        self.assertIn('"name"', related_query)
+        self.assertNotIn('"description"', related_query)
+        self.assertNotIn('"links"', related_query)
+
+    def test_default_and_requested_limits(self):
+        self.assertEqual(len(self.get_related()), ProjectDetailView.related_limit)
+        self.assertEqual([p['id'] for p in self.get_related('?related_limit=2')], [self.best.id, self.others[0].id])
+        self.assertEqual(len(self.get_related('?related_limit=1000')), 11)
+        self.assertEqual(self.get_related('?related_limit=0'), [])
+
+    def test_query_count_does_not_grow_with_related_projects(self):
+        url = reverse('project-detail', args=[self.base.id])
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        for i in range(20):
+            Project.objects.create(name=f'More {i}', tags=['api'])
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(url)
+        self.assertEqual(len(small), len(large))
+
+
+class RelationSettingsSnapshotTests(CatalogAPITestCase):
+    def settings_queries(self, queries):
+        return [query for query in queries.captured_queries if 'api_relationsettings' in query['sql']]
+
+    def test_snapshot_is_reused_until_settings_change(self):
+        get_relation_settings()
+        with CaptureQueriesContext(connection) as queries:
+            snapshot = get_relation_settings()
+            project = Project.objects.create(name='Write path', tags=['web'])
+            self.client.get(reverse('project-detail', args=[project.id]))
+        self.assertEqual(self.settings_queries(queries), [])
+        self.assertEqual(snapshot.excluded_tags, frozenset())
+
+        settings = RelationSettings.get_current_settings()
+        settings.excluded_tags = ['web', 'web']
+        settings.save()
+        self.assertEqual(get_relation_settings().excluded_tags, frozenset({'web'}))
+
+    def test_api_update_reloads_snapshot(self):
+        get_relation_settings()
+        user = User.objects.create_user(username='admin', password='pass1234')
+        self.client.force_authenticate(user)
+        self.client.put(reverse('relation-settings'), {'excluded_technologies': ['Docker']}, format='json')
+        self.assertEqual(get_relation_settings().excluded_technologies, frozenset({'Docker'}))
+
+
+class FacetCountTests(CatalogAPITestCase):
+    def facets(self):
+        response = self.client.get(reverse('facets'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_counts_follow_create_update_and_delete(self):
+        one = Project.objects.create(name='One', tags=['web'], technologies=['Django', 'React'], is_starred=True)
+        two = Project.objects.create(name='Two', technologies=['Django'])
+        self.assertEqual(self.facets(), {
+            'tags': [{'name': 'web', 'count': 1, 'starred_count': 1}],
+            'technologies': [
+                {'name': 'Django', 'count': 2, 'starred_count': 1},
+                {'name': 'React', 'count': 1, 'starred_count': 1},
+            ],
+        })
+
+        one.is_starred = False
+        one.technologies = ['React']
+        one.save()
+        two.is_starred = True
+        two.save()
+        self.assertEqual(self.facets()['technologies'], [
+            {'name': 'Django', 'count': 1, 'starred_count': 1},
+            {'name': 'React', 'count': 1, 'starred_count': 0},
+        ])
+
+        one.delete()
+        self.assertEqual(self.facets(), {
+            'tags': [],
+            'technologies': [{'name': 'Django', 'count': 1, 'starred_count': 1}],
+        })
+
+    def test_facets_cost_no_project_scan(self):
+        Project.objects.create(name='One', tags=['web'], technologies=['Django'])
+        with CaptureQueriesContext(connection) as queries:
+            self.facets()
+        self.assertFalse(any('"api_project"' in query['sql'] for query in queries.captured_queries))
+
+    def test_rebuild_command_restores_counts_after_bulk_writes(self):
+        Project.objects.bulk_create([Project(name='Bulk', technologies=['Go'], is_starred=True)])
+        call_command('rebuild_indexes', stdout=StringIO())
+        self.assertEqual(Technology.objects.get(name='Go').starred_count, 1)
+        self.assertEqual(self.facets()['technologies'], [{'name': 'Go', 'count': 1, 'starred_count': 1}])
+
+
+class ProjectSearchTests(CatalogAPITestCase):
+    def setUp(self):
+        self.portfolio = Project.objects.create(
+            name='Portfolio site', description='Personal website built with React',
+            tags=['web'], technologies=['React', 'Django']
+        )
+        self.shop = Project.objects.create(
+            name='Shop', description='Online store with a portfolio of products',
+            tags=['web', 'commerce'], technologies=['Django']
+        )
+        self.bot = Project.objects.create(
+            name='Telegram bot', description='Chat bot', tags=['bot'], technologies=['Python']
+        )
+
+    def search(self, **params):
+        response = self.client.get(reverse('project-search'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [project['id'] for project in response.json()]
+
+    def test_prefix_matching_and_ranking(self):
+        # A hit in the name outranks a hit in the description
+        self.assertEqual(self.search(q='portf'), [self.portfolio.id, self.shop.id])
+        self.assertEqual(self.search(q='djan web'), [self.portfolio.id, self.shop.id])
+        self.assertEqual(self.search(q='portfolio commerce'), [self.shop.id])
+        self.assertEqual(self.search(q='kotlin'), [])
+
+    def test_tag_and_technology_filters(self):
+        self.assertEqual(self.search(q='portfolio', tags='commerce'), [self.shop.id])
+        self.assertEqual(self.search(q='portfolio', technologies='React,Django'), [self.portfolio.id])
+        self.assertEqual(self.search(q='portfolio', tags='bot'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.bot.name = 'Portfolio bot'
+        self.bot.save()
+        self.assertEqual(self.search(q='portfolio')[0], self.bot.id)
+
+        self.portfolio.delete()
+        self.assertEqual(self.search(q='portfolio'), [self.bot.id, self.shop.id])
+
+    def test_query_is_required_and_syntax_is_not_interpreted(self):
+        response = self.client.get(reverse('project-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(q='"bot" OR NEAR(*'), [])
+        self.assertEqual(self.search(q='bot*"'), [self.bot.id])
+
+    def test_python_fallback_matches_fts5(self):
+        queries = [
+            ('portf', {}), ('djan web', {}), ('bot', {}), ('web', {'tags': ['commerce']}),
+            ('portfolio', {'technologies': ['React']}),
+        ]
+        expected = [search.search_project_ids(query, **filters) for query, filters in queries]
+        with mock.patch.object(search, 'fts5_enabled', return_value=False):
+            self.assertEqual([search.search_project_ids(query, **filters) for query, filters in queries], expected)
+
+
+class QueryPlanTests(CatalogAPITestCase):
+    def setUp(self):
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.undated = Project.objects.create(name='Undated', tags=['web'], is_starred=True)
+        self.old = Project.objects.create(name='Old', tags=['web'], created_at=base)
+        self.new = Project.objects.create(name='New', technologies=['Django'], created_at=base + timedelta(days=1),
+                                          is_starred=True)
+
+    def test_default_ordering_is_newest_first_with_undated_last(self):
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual([p['id'] for p in response.data], [self.new.id, self.old.id, self.undated.id])
+        response = self.client.get(reverse('project-list'), {'is_starred': 'true'})
+        self.assertEqual([p['id'] for p in response.data], [self.new.id, self.undated.id])
+
+    def test_read_api_queries_use_indexes(self):
+        output = StringIO()
+        call_command('explain_queries', '--strict', stdout=output)
+        self.assertIn('project_starred_created_idx', output.getvalue())
+        self.assertIn('tag_facet_idx', output.getvalue())
+
+
+class ImageVariantTests(CatalogAPITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WORKERS=0,
+                                              IMAGE_VARIANT_WIDTHS=(320, 640), FILE_DELETION_WORKER=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='testuser', password='pass1234')
+        self.client.force_authenticate(self.user)
+
+    def png(self, name='shot.png', size=(800, 400)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def storage_path(self, name):
+        return os.path.join(self.media_root, name)
+
+    def test_upload_exposes_srcsets_per_format(self):
+        response = self.client.post(reverse('project-list'), {
+            'projectData': json.dumps({'name': 'Pictures'}),
+            'attached_files': [self.png()],
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        attachment = self.client.get(reverse('project-list')).json()[0]['attached_files'][0]
+        self.assertEqual((attachment['width'], attachment['height']), (800, 400))
+        self.assertEqual([source['type'] for source in attachment['sources']], ['image/avif', 'image/webp'])
+        blob = ProjectFile.objects.get().file.name.removeprefix('projects/')
+        self.assertEqual(
+            attachment['sources'][1]['srcset'],
+            f'/media/projects/variants/{blob}/320w.webp 320w, /media/projects/variants/{blob}/640w.webp 640w'
+        )
+        self.assertTrue(os.path.exists(self.storage_path(f'projects/variants/{blob}/640w.avif')))
+
+    def test_missing_variants_are_generated_on_first_read(self):
+        name = default_storage.save('projects/old.png', self.png(size=(200, 100)))
+        project_file, = ProjectFile.objects.bulk_create([ProjectFile(file=name)])
+        project = Project.objects.create(name='Old upload')
+        project.attached_files.add(project_file)
+
+        attachment = self.client.get(reverse('project-detail', args=[project.id])).json()['attached_files'][0]
+        # Smaller than every bucket, so only a same-size variant per format
+        self.assertEqual(attachment['sources'][1]['srcset'], '/media/projects/variants/old.png/200w.webp 200w')
+        self.assertEqual(ProjectFile.objects.get().variants[0]['width'], 200)
+
+    def test_non_images_and_broken_images_get_no_variants(self):
+        response = self.client.post(reverse('project-list'), {
+            'projectData': json.dumps({'name': 'Docs'}),
+            'attached_files': [SimpleUploadedFile('readme.pdf', b'%PDF'), SimpleUploadedFile('broken.png', b'nope')],
+        }, format='multipart')
+        self.assertEqual([file['sources'] for file in response.data['attached_files']], [[], []])
+        self.assertEqual(list(ProjectFile.objects.values_list('variants', flat=True)), [[], []])
+
+    def test_deleting_a_file_removes_its_variants(self):
+        project_file = ProjectFile.objects.create(file=self.png())
+        variant = self.storage_path(project_file.variants[0]['name'])
+        self.assertTrue(os.path.exists(variant))
+        with self.captureOnCommitCallbacks(execute=True):
+            project_file.delete()
+        self.assertFalse(os.path.exists(variant))
+
+    def test_backfill_command(self):
+        name = default_storage.save('projects/old.png', self.png())
+        ProjectFile.objects.bulk_create([ProjectFile(file=name), ProjectFile(file='projects/notes.txt')])
+        call_command('generate_image_variants', '--workers', '1', stdout=StringIO())
+        self.assertEqual(
+            sorted((v['width'], v['format']) for v in ProjectFile.objects.get(file=name).variants),
+            [(320, 'avif'), (320, 'webp'), (640, 'avif'), (640, 'webp')]
+        )
+        self.assertIsNone(ProjectFile.objects.get(file='projects/notes.txt').variants)
+
+
+class StoredFilesTestCase(CatalogAPITestCase):
+    """Uploads through the API into a throwaway MEDIA_ROOT, with every background job inline"""
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WORKERS=0,
+                                              FILE_DELETION_WORKER=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='testuser', password='pass1234')
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content):
+        response = self.client.post(reverse('project-list'), {
+            'projectData': json.dumps({'name': name}),
+            'attached_files': [SimpleUploadedFile(name, content)],
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Project.objects.get(id=response.data['id'])
+
+    def blobs(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(os.path.join(self.media_root, 'projects')) for name in names
+        )
+
+
+class ContentAddressedStorageTests(StoredFilesTestCase):
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload('report.pdf', b'same bytes')
+        second = self.upload('copy of report.PDF', b'same bytes')
+        self.upload('other.pdf', b'other bytes')
+
+        digest = hashlib.sha256(b'same bytes').hexdigest()
+        name = f'projects/{digest[:2]}/{digest}.pdf'
+        self.assertEqual(first.attached_files.get().file.name, name)
+        self.assertEqual(second.attached_files.get().file.name, name)
+        self.assertEqual(len(self.blobs()), 2)
+        # Visitors still see what was uploaded
+        self.assertEqual(second.attached_files.get().name, 'copy of report.PDF')
+
+    def test_blob_is_deleted_with_its_last_reference(self):
+        first = self.upload('report.pdf', b'same bytes')
+        second = self.upload('report.pdf', b'same bytes')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('project-detail', args=[first.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertEqual(ProjectFile.objects.count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.blobs(), [])
+
+    def test_duplicate_images_reuse_variants(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200), 'teal').save(buffer, 'PNG')
+        self.upload('a.png', buffer.getvalue())
+        blob_count = len(self.blobs())
+        self.upload('b.png', buffer.getvalue())
+
+        self.assertEqual(len(self.blobs()), blob_count)
+        first, second = ProjectFile.objects.order_by('id')
+        self.assertEqual(first.variants, second.variants)
+
+
+class FileDeletionQueueTests(StoredFilesTestCase):
+    def test_storage_is_untouched_until_commit(self):
+        project = self.upload('report.pdf', b'bytes')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.delete(reverse('project-detail', args=[project.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertEqual(list(FileDeletion.objects.values_list('name', flat=True)), self.blobs())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.blobs(), [])
+        self.assertFalse(FileDeletion.objects.exists())
+
+    def test_blob_referenced_again_is_kept(self):
+        project = self.upload('report.pdf', b'bytes')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            project.delete()
+        self.upload('again.pdf', b'bytes')
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertFalse(FileDeletion.objects.exists())
+
+    def test_reference_check_and_new_attachments_take_the_write_lock(self):
+        def position(queries, fragment):
+            return next(index for index, query in enumerate(queries) if fragment in query['sql'])
+
+        lock = 'UPDATE "api_filedeletion"'
+        project = self.upload('report.pdf', b'bytes')
+        with self.captureOnCommitCallbacks(execute=False):
+            project.delete()
+
+        # A duplicate upload locks before the storage finds the blob and its row goes in
+        with CaptureQueriesContext(connection) as queries:
+            ProjectFile.objects.create(file=ContentFile(b'bytes', name='again.pdf'))
+        self.assertLess(position(queries, lock), position(queries, 'INSERT INTO "api_projectfile"'))
+
+        # The worker locks before it looks for references, so it sees the new row and keeps the blob
+        with CaptureQueriesContext(connection) as queries, mock.patch('api.deletions._delete_files') as delete_files:
+            process_file_deletions()
+        self.assertLess(position(queries, lock), position(queries, 'FROM "api_projectfile"'))
+        delete_files.assert_not_called()
+
+    def test_query_count_does_not_grow_with_deleted_attachments(self):
+        counts = []
+        for size in (1, 10):
+            project = Project.objects.create(name=f'{size} files')
+            project.attached_files.set([
+                ProjectFile.objects.create(file=f'projects/{size}-{index}.txt', name=f'{index}.txt')
+                for index in range(size)
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.delete(reverse('project-detail', args=[project.id]))
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+            counts.append(len(queries))
+            self.assertEqual(FileDeletion.objects.filter(name__startswith=f'projects/{size}-').count(), size)
+        self.assertFalse(ProjectFile.objects.exists())
+        self.assertEqual(counts[0], counts[1])
+
+    def test_failed_deletions_are_retried_later(self):
+        project = self.upload('report.pdf', b'bytes')
+        with mock.patch('api.deletions._delete_files', side_effect=OSError('disk busy')):
+            with self.captureOnCommitCallbacks(execute=True):
+                project.delete()
+        deletion = FileDeletion.objects.get()
+        self.assertEqual((deletion.attempts, deletion.last_error), (1, 'disk busy'))
+        self.assertGreater(deletion.retry_at, deletion.created_at)
+
+        self.assertEqual(process_file_deletions(), 0)
+        FileDeletion.objects.update(retry_at=deletion.created_at)
+        self.assertEqual(process_file_deletions(), 1)
+        self.assertEqual(self.blobs(), [])
+
+    def test_sweeper_deletes_old_unreferenced_files(self):
+        kept = self.upload('kept.pdf', b'kept').attached_files.get().file.name
+        for name in ('projects/lost.pdf', 'projects/variants/lost.pdf/320w.webp', 'projects/fresh.pdf'):
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(b'orphan')
+        day_ago = time.time() - 2 * 24 * 3600
+        for name in (kept, 'projects/lost.pdf', 'projects/variants/lost.pdf/320w.webp'):
+            os.utime(os.path.join(self.media_root, name), (day_ago, day_ago))
+
+        call_command('sweep_orphan_files', stdout=StringIO())
+        self.assertEqual(self.blobs(), sorted([kept, 'projects/fresh.pdf']))
+
+
+class ChunkedUploadTests(StoredFilesTestCase):
+    content = b'0123456789' * 10
+
+    def start(self, **data):
+        data.setdefault('sha256', hashlib.sha256(self.content).hexdigest())
+        response = self.client.post(reverse('upload-list'),
+                                    {'name': 'dump.bin', 'size': len(self.content), **data}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def send(self, upload_id, offset, chunk, **headers):
+        return self.client.generic('PATCH', reverse('upload-detail', args=[upload_id]), chunk,
+                                   content_type='application/octet-stream',
+                                   HTTP_UPLOAD_OFFSET=str(offset), **headers)
+
+    def test_upload_resumes_and_attaches_a_blob(self):
+        project = Project.objects.create(name='Archive')
+        upload_id = self.start()
+        self.assertEqual(self.send(upload_id, 0, self.content[:40]).data['offset'], 40)
+
+        # A retried chunk tells the client where to carry on
+        response = self.send(upload_id, 0, self.content[:40])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], 40)
+        self.assertEqual(self.client.get(reverse('upload-detail', args=[upload_id])).data['offset'], 40)
+
+        chunk = self.content[40:]
+        response = self.send(upload_id, 40, chunk, HTTP_UPLOAD_CHECKSUM=f'sha256 {hashlib.sha256(chunk).hexdigest()}')
+        self.assertEqual(response.data['offset'], len(self.content))
+
+        response = self.client.post(reverse('upload-complete', args=[upload_id]), {'project': project.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        digest = hashlib.sha256(self.content).hexdigest()
+        attached = project.attached_files.get()
+        self.assertEqual((attached.file.name, attached.name), (f'projects/{digest[:2]}/{digest}.bin', 'dump.bin'))
+        self.assertEqual(self.blobs(), [attached.file.name])
+        with attached.file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+
+    def test_corrupt_chunk_is_discarded(self):
+        upload_id = self.start()
+        response = self.send(upload_id, 0, self.content[:40], HTTP_UPLOAD_CHECKSUM='sha256 ' + '0' * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('upload-detail', args=[upload_id])).data['offset'], 0)
+
+    def test_file_checksum_is_checked_on_completion(self):
+        project = Project.objects.create(name='Archive')
+        upload_id = self.start(sha256='f' * 64)
+        self.send(upload_id, 0, self.content)
+
+        response = self.client.post(reverse('upload-complete', args=[upload_id]), {'project': project.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(project.attached_files.exists())
+
+    def test_incomplete_upload_cannot_be_attached(self):
+        project = Project.objects.create(name='Archive')
+        upload_id = self.start()
+        self.send(upload_id, 0, self.content[:10])
+
+        response = self.client.post(reverse('upload-complete', args=[upload_id]), {'project': project.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_abort_removes_staged_bytes(self):
+        upload_id = self.start()
+        self.send(upload_id, 0, self.content[:40])
+        self.assertEqual(len(self.blobs()), 1)
+
+        response = self.client.delete(reverse('upload-detail', args=[upload_id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.blobs(), [])
+
+    def test_uploads_require_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(reverse('upload-list'), {'name': 'dump.bin', 'size': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BulkTransferTests(StoredFilesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+
+    def export(self, **params):
+        response = self.client.get(reverse('project-bulk'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_round_trip(self):
+        self.upload('report.pdf', b'bytes')
+        Project.objects.create(name='Site', tags=['web'], technologies=['Django'], is_starred=True,
+                               created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        exported = self.export()
+        self.assertEqual(len(exported.splitlines()), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('project-bulk'), exported, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'projects': 2, 'files': 1})
+        # Batched writes, not a save per project
+        self.assertLess(len(queries), 40)
+
+        copy = Project.objects.filter(name='Site').order_by('-id').first()
+        self.assertEqual((copy.tags, copy.is_starred, copy.created_at.year), (['web'], True, 2024))
+        self.assertEqual(Tag.objects.get(name='web').project_count, 2)
+        self.assertEqual(Tag.objects.get(name='web').starred_count, 2)
+        self.assertEqual(ProjectFile.objects.values('file').distinct().count(), 1)
+        self.assertEqual(len(self.client.get(reverse('project-search'), {'q': 'site'}).data), 2)
+
+    def test_bundle_carries_media(self):
+        self.upload('report.pdf', b'bundled bytes')
+        bundle = self.export(bundle='true')
+        self.assertEqual(len(zipfile.ZipFile(BytesIO(bundle)).namelist()), 2)
+
+        Project.objects.all().delete()
+        shutil.rmtree(self.media_root + '/projects')
+        upload = BytesIO(bundle)
+        upload.name = 'projects.zip'
+        response = self.client.post(reverse('project-bulk'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with Project.objects.get().attached_files.get().file.open('rb') as file:
+            self.assertEqual(file.read(), b'bundled bytes')
+
+    def test_bad_line_rolls_back_the_import(self):
+        body = b'{"name": "First"}\n{"name": "Second", "created_at": "yesterday"}\n'
+        response = self.client.post(reverse('project-bulk'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Line 2', response.data['error'])
+        self.assertFalse(Project.objects.exists())
+
+    def post_ndjson(self, *records):
+        body = ''.join(json.dumps(record) + '\n' for record in records)
+        return self.client.post(reverse('project-bulk'), body, content_type='application/x-ndjson')
+
+    def test_field_types_are_checked(self):
+        for record, field in [
+            ({'name': ['Site']}, 'name'),
+            ({'tags': 'web'}, 'tags'),
+            ({'technologies': ['Django', 3]}, 'technologies'),
+            ({'created_at': 1700000000}, 'created_at'),
+            ({'is_starred': 'yes'}, 'is_starred'),
+            ({'attached_files': [{'file': 7}]}, 'attached_files'),
+        ]:
+            response = self.post_ndjson({'name': 'First'}, record)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertTrue(response.data['error'].startswith(f'Line 2: {field}'), response.data['error'])
+        self.assertFalse(Project.objects.exists())
+
+    def test_only_stored_blobs_can_be_referenced(self):
+        blob = self.upload('report.pdf', b'bytes').attached_files.get().file.name
+        staged = self.media_root + '/projects/uploads/part.part'
+        os.makedirs(os.path.dirname(staged))
+        open(staged, 'wb').close()
+        missing = f"projects/00/{'0' * 64}.pdf"
+
+        for name in ['../../etc/passwd', '/etc/passwd', 'projects/uploads/part.part', missing]:
+            response = self.post_ndjson({'name': 'Copy', 'attached_files': [{'name': 'x', 'file': name}]})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(f'Line 1: file {name}', response.data['error'])
+
+        response = self.post_ndjson({'name': 'Copy', 'attached_files': [{'name': 'x', 'file': blob}]})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_requires_admin(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('project-bulk')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_management_commands(self):
+        Project.objects.create(name='Site', tags=['web'])
+        path = os.path.join(self.media_root, 'export.zip')
+        call_command('export_projects', path, stderr=StringIO())
+        call_command('import_projects', path, stdout=StringIO())
+        self.assertEqual(Project.objects.filter(name='Site').count(), 2)
+
+
+class AttachmentUpdateTests(StoredFilesTestCase):
+    def put(self, project, retained, *uploads):
+        data = {'projectData': json.dumps({'name': project.name}), 'retained_files': json.dumps(retained)}
+        if uploads:
+            data['attached_files'] = [SimpleUploadedFile(name, content) for name, content in uploads]
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put(reverse('project-detail', args=[project.id]), data, format='multipart')
+
+    def test_files_are_kept_removed_and_added_by_id(self):
+        project = self.upload('report.pdf', b'report')
+        kept = project.attached_files.get()
+        self.put(project, [kept.id], ('old.txt', b'old'))
+        removed = project.attached_files.get(name='old.txt')
+
+        response = self.put(project, [kept.id], ('new.txt', b'new'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(file['name'] for file in response.data['attached_files']), ['new.txt', 'report.pdf'])
+        self.assertFalse(ProjectFile.objects.filter(id=removed.id).exists())
+        self.assertEqual(len(self.blobs()), 2)
+
+    def test_query_count_does_not_grow_with_changed_files(self):
+        project = self.upload('report.pdf', b'report')
+        counts = []
+        for size in (1, 5):
+            project.attached_files.set([
+                ProjectFile.objects.create(file=f'projects/{size}-{index}.txt', name=f'{index}.txt')
+                for index in range(size)
+            ])
+            uploads = [(f'{size}-{index}.txt', f'{size}-{index}'.encode()) for index in range(size)]
+            # Variants are generated by the worker pool in production, not by the request
+            with mock.patch('api.views.schedule_variants'), CaptureQueriesContext(connection) as queries:
+                self.put(project, [], *uploads)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_shared_file_is_only_unlinked(self):
+        project = self.upload('report.pdf', b'report')
+        shared = project.attached_files.get()
+        other = Project.objects.create(name='Other')
+        other.attached_files.add(shared)
+
+        self.put(project, [])
+        self.assertFalse(project.attached_files.exists())
+        self.assertTrue(other.attached_files.filter(id=shared.id).exists())
+        self.assertFalse(FileDeletion.objects.exists())
+
+    def test_failed_update_changes_nothing(self):
+        project = self.upload('report.pdf', b'report')
+        with mock.patch('api.views.schedule_variants', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.put(project, [], ('new.txt', b'new'))
+        self.assertEqual(list(project.attached_files.values_list('name', flat=True)), ['report.pdf'])
+        self.assertFalse(FileDeletion.objects.exists())
+
+
+@override_settings(API_ASYNC_VIEWS=True)
+class AsyncReadViewTests(CatalogAPITestCase):
+    """
+    The read views in async mode, through Django's ASGI request path. The URLconf's views
+    were built in sync mode at import, so each request gets a view built under the override.
+    """
+
+    async def request(self, method, name, args=(), data=None, headers=None):
+        path = reverse(name, args=args)
+        match = resolve(path)
+        view = match.func.view_class.as_view()
+        self.assertTrue(iscoroutinefunction(view))
+        request = getattr(AsyncRequestFactory(), method)(path, data, headers=headers)
+        response = await view(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    async def test_list_and_detail(self):
+        project = await Project.objects.acreate(name='Async', tags=['web'])
+
+        response = await self.request('get', 'project-list')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in json.loads(response.content)], ['Async'])
+
+        response = await self.request('get', 'project-detail', args=[project.id])
+        self.assertEqual(json.loads(response.content)['related_projects'], [])
+        etag = response['ETag']
+        response = await self.request('get', 'project-detail', args=[project.id], headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = await self.request('get', 'project-detail', args=[project.id + 1])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_stream_and_technologies(self):
+        await Project.objects.acreate(name='First', technologies=['Django'])
+        await Project.objects.acreate(name='Second', technologies=['React'])
+
+        response = await self.request('get', 'project-list', data={'stream': 'true'})
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+
+        response = await self.request('get', 'technologies-list')
+        self.assertEqual(json.loads(response.content), ['Django', 'React'])
+
+    async def test_writes_still_require_authentication(self):
+        response = await self.request('delete', 'project-detail', args=[1])
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_health_check_runs_on_the_event_loop(self):
+        self.assertTrue(iscoroutinefunction(ahealth_check))
+        response = await ahealth_check(AsyncRequestFactory().get(reverse('health-check')))
+        self.assertEqual(json.loads(response.content)['status'], 'healthy')
+        response = await ahealth_check(AsyncRequestFactory().post(reverse('health-check')))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @override_settings(API_ASYNC_VIEWS=False)
+    async def test_sync_handlers_by_default(self):
+        self.assertFalse(iscoroutinefunction(ProjectListView.as_view()))
+        await Project.objects.acreate(name='Sync')
+
+        # The ASGI handler runs a sync view in a worker thread
+        response = await self.async_client.get(reverse('project-list'))
+        self.assertEqual([item['name'] for item in response.json()], ['Sync'])
+
+
+class ApiSnapshotTests(CatalogAPITestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(API_SNAPSHOT_ROOT=self.root, API_SNAPSHOT_WORKER=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def snapshot(self, name):
+        path = os.path.join(self.root, 'current', name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def test_snapshots_match_the_api(self):
+        starred = Project.objects.create(name='Starred', technologies=['Django'], is_starred=True)
+        Project.objects.create(name='Plain', technologies=['React'])
+        self.assertEqual(write_snapshots(), 5)
+
+        for name, url in [
+            ('api/projects/index.json', reverse('project-list')),
+            ('api/projects/starred.json', reverse('project-list') + '?is_starred=true'),
+            ('api/technologies/index.json', reverse('technologies-list')),
+            (f'api/projects/{starred.id}/index.json', reverse('project-detail', args=[starred.id])),
+        ]:
+            self.assertEqual(self.snapshot(name), self.client.get(url).content, name)
+        self.assertEqual(gzip.decompress(self.snapshot('api/projects/index.json.gz')),
+                         self.snapshot('api/projects/index.json'))
+
+    def test_changes_republish_the_snapshots(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            project = Project.objects.create(name='First')
+        self.assertEqual(json.loads(self.snapshot('api/projects/index.json'))[0]['name'], 'First')
+        self.assertIsNotNone(self.snapshot(f'api/projects/{project.id}/index.json'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.delete()
+        self.assertEqual(json.loads(self.snapshot('api/projects/index.json')), [])
+        self.assertIsNone(self.snapshot(f'api/projects/{project.id}/index.json'))
+        # Only the published build is left
+        self.assertEqual(len([name for name in os.listdir(self.root) if name.startswith('build-')]), 1)
+
+    def test_build_overtaken_by_a_change_is_rendered_again(self):
+        project = Project.objects.create(name='Before')
+        builds = []
+
+        def render_build(root):
+            build = real_render_build(root)
+            if not builds:
+                # Another worker commits a change while this build renders
+                Project.objects.filter(id=project.id).update(name='After')
+                bump_catalog_version()
+            builds.append(build)
+            return build
+
+        real_render_build = snapshots.render_build
+        with mock.patch('api.snapshots.render_build', side_effect=render_build):
+            write_snapshots()
+        self.assertEqual(len(builds), 2)
+        self.assertEqual(json.loads(self.snapshot('api/projects/index.json'))[0]['name'], 'After')
+        self.assertEqual([name for name in os.listdir(self.root) if name.startswith('build-')],
+                         [os.path.basename(builds[1][0])])
+
+    def test_builds_of_other_processes_wait_for_the_lock(self):
+        build = tempfile.mkdtemp(prefix='build-', dir=self.root)
+        with open(os.path.join(self.root, '.lock'), 'a') as lock, \
+                mock.patch('api.snapshots.render_build', return_value=(build, 0)) as render_build:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            writer = threading.Thread(target=write_snapshots)
+            writer.start()
+            writer.join(0.2)
+            self.assertTrue(writer.is_alive())
+            render_build.assert_not_called()
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            writer.join()
+        render_build.assert_called_once()
+        self.assertEqual(os.readlink(os.path.join(self.root, 'current')), os.path.basename(build))
+
+    def test_pending_change_takes_snapshots_offline(self):
+        write_snapshots()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Project.objects.create(name='New')
+        self.assertTrue(os.path.lexists(os.path.join(self.root, 'current')))
+
+        with override_settings(API_SNAPSHOT_WORKER=True), mock.patch('api.snapshots._queued', False), \
+                mock.patch('api.snapshots._executor') as executor:
+            for callback in callbacks:
+                callback()
+        self.assertFalse(os.path.lexists(os.path.join(self.root, 'current')))
+        # A burst of changes queues a single rewrite
+        executor.submit.assert_called_once()
+
+
+class RequestMetricsTests(CatalogAPITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(METRICS_DIRECTORY=self.directory, METRICS_TOKEN='scrape-me')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        registry = mock.patch('api.metrics.registry', Histograms())
+        registry.start()
+        self.addCleanup(registry.stop)
+
+        self.user = User.objects.create_user(username='staff', password='pass', is_staff=True)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_records_each_route(self):
+        project = Project.objects.create(name='Measured', technologies=['Django'])
+        self.client.get(reverse('project-list'))
+        self.client.get(reverse('project-list'))
+        self.client.get(reverse('project-detail', args=[project.id]))
+
+        text = self.scrape()
+        labels = 'route="api/projects/",method="GET"'
+        self.assertIn(f'api_request_seconds_count{{{labels}}} 2', text)
+        self.assertIn(f'api_request_seconds{{{labels},quantile="0.99"}}', text)
+        self.assertIn(f'api_serializer_seconds_count{{{labels}}} 2', text)
+        self.assertIn('api_queries_count{route="api/projects/<int:id>/",method="GET"} 1', text)
+        queries = next(line for line in text.splitlines() if line.startswith(f'api_queries_sum{{{labels}}}'))
+        self.assertGreater(float(queries.split()[-1]), 0)
+
+    def test_merges_other_workers(self):
+        minute = int(time.time() // 60)
+        row = [0] * (len(METRICS['request_seconds'][0]) + 2)
+        row[3], row[-1] = 4, 0.03
+        with open(os.path.join(self.directory, '999999.json'), 'w') as file:
+            json.dump([['request_seconds', 'api/facets/', 'GET', {str(minute): row}]], file)
+
+        text = self.scrape()
+        self.assertIn('api_request_seconds_count{route="api/facets/",method="GET"} 4', text)
+        self.assertIn('api_request_seconds{route="api/facets/",method="GET",quantile="0.5"} 0.0075', text)
+
+    def test_requires_staff_or_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        User.objects.create_user(username='visitor', password='pass')
+        self.client.force_authenticate(User.objects.get(username='visitor'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+    def test_profiles_slow_requests(self):
+        profiles = tempfile.mkdtemp(dir=self.directory)
+        with override_settings(METRICS_PROFILE_DIRECTORY=profiles, METRICS_PROFILE_SAMPLE_RATE=1,
+                               METRICS_PROFILE_THRESHOLD_MS=0):
+            self.client.get(reverse('project-list'))
+        dumps = os.listdir(profiles)
+        self.assertEqual(len(dumps), 1)
+        self.assertIn('api-projects', dumps[0])
+        self.assertTrue(pstats.Stats(os.path.join(profiles, dumps[0])).total_calls)
+
+        with override_settings(METRICS_PROFILE_DIRECTORY=profiles, METRICS_PROFILE_SAMPLE_RATE=1,
+                               METRICS_PROFILE_THRESHOLD_MS=60_000):
+            self.client.get(reverse('project-list'))
+        self.assertEqual(len(os.listdir(profiles)), 1)
+
+
+class BenchmarkTests(CatalogAPITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(MEDIA_ROOT=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_generated_catalog_follows_zipf(self):
+        self.assertEqual(generate_catalog(200, tags=50, technologies=20, attachments=1), (200, 200))
+        counts = Counter(tag.name for project in Project.objects.all() for tag in project.tag_set.all())
+        self.assertEqual(counts.most_common(1)[0][0], 'tag-0')
+        self.assertGreater(counts['tag-0'], counts.get('tag-49', 0))
+        self.assertEqual(sum(counts.values()), sum(Tag.objects.values_list('project_count', flat=True)))
+        # Attachments share a small pool of blobs
+        self.assertLessEqual(ProjectFile.objects.values('file').distinct().count(), 50)
+
+    def test_results_are_gated_by_the_baseline(self):
+        output = os.path.join(self.directory, 'results.json')
+        call_command('benchmark_api', '--current-database', '--sizes', '10', '30', '--repeat', '2',
+                     '--output', output, stdout=StringIO())
+        with open(output) as file:
+            results = json.load(file)['results']
+        self.assertEqual({(row['endpoint'], row['projects']) for row in results},
+                         {(endpoint, size) for endpoint in ['list', 'list-page', 'detail', 'technologies']
+                          for size in [10, 30]})
+        self.assertEqual(Project.objects.count(), 30)
+
+        baseline = os.path.join(self.directory, 'baseline.json')
+        for row in results:
+            row['p95_ms'] *= 100
+            row['peak_kib'] *= 100
+        with open(baseline, 'w') as file:
+            json.dump({'results': results}, file)
+        call_command('benchmark_api', '--current-database', '--sizes', '30', '--repeat', '2',
+                     '--baseline', baseline, stdout=StringIO())
+
+        next(row for row in results if row['projects'] == 30)['queries'] = 0
+        with open(baseline, 'w') as file:
+            json.dump({'results': results}, file)
+        with self.assertRaisesMessage(CommandError, 'queries, baseline 0'):
+            call_command('benchmark_api', '--current-database', '--sizes', '30', '--repeat', '2',
+                         '--baseline', baseline, stdout=StringIO())
+
+
+class SQLiteProfileTests(CatalogAPITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def allow_database(self, alias):
+        """Scratch aliases are registered after the test case chose the databases it may query"""
+        patcher = mock.patch.object(type(self), 'databases', type(self).databases | {alias})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_profile_database(self, alias, profile, timeout=None):
+        self.allow_database(alias)
+        add_database(alias, os.path.join(self.directory, f'{profile}.sqlite3'), profile)
+        self.addCleanup(remove_database, alias)
+        if timeout is not None:
+            connections.settings[alias]['OPTIONS']['timeout'] = timeout
+
+    def test_readers_are_not_locked_out_by_a_writer(self):
+        for profile, blocked in [('baseline', True), ('production', False)]:
+            writer, reader = f'{profile}_writer', f'{profile}_reader'
+            self.add_profile_database(writer, profile)
+            self.add_profile_database(reader, profile, timeout=0.1)
+            create_catalog(writer, 10)
+            first = Project.objects.using(writer).order_by('id').first()
+
+            # What a writer holds while it commits
+            with connections[writer].cursor() as cursor:
+                cursor.execute('BEGIN EXCLUSIVE')
+            try:
+                Project.objects.using(writer).update(name='edited')
+                if blocked:
+                    with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                        list(Project.objects.using(reader).values_list('name', flat=True))
+                else:
+                    # The last committed version, while the write is still open
+                    self.assertEqual(Project.objects.using(reader).get(id=first.id).name, first.name)
+            finally:
+                with connections[writer].cursor() as cursor:
+                    cursor.execute('ROLLBACK')
+
+    def test_profiles_apply_the_settings_of_the_alias(self):
+        for profile, journal_mode, begin, kept in [('baseline', 'delete', 'BEGIN', False),
+                                                   ('production', 'wal', 'BEGIN IMMEDIATE', True)]:
+            alias = f'{profile}_settings'
+            self.add_profile_database(alias, profile)
+            create_catalog(alias, 1)
+            connections[alias].close()
+
+            def edit():
+                with transaction.atomic(using=alias):
+                    Project.objects.using(alias).update(name='edited')
+
+            with CaptureQueriesContext(connections[alias]) as queries:
+                serve(alias, edit)
+            # Kept for the next request, or closed at the end of this one
+            self.assertEqual(connections[alias].connection is not None, kept)
+            self.assertIn(begin, [query['sql'] for query in queries])
+            with connections[alias].cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], journal_mode)
+
+    def test_parallel_readers_and_writer(self):
+        self.allow_database('sqlite_concurrency_production')
+        output = StringIO()
+        call_command('sqlite_concurrency', '--profiles', 'production', '--duration', '0.5', '--readers', '3',
+                     '--projects', '200', '--strict', stdout=output)
+        reads_per_second = float(output.getvalue().splitlines()[1].split()[1])
+        self.assertGreater(reads_per_second, 0)
+
+
+class ReadReplicaRoutingTests(APITransactionTestCase):
+    """The read-only alias pointed at a replica file, with the test database as the primary"""
+    databases = {'default', 'readonly'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.directory, 'replica.sqlite3')
+        # Under test the alias mirrors default; connections opened from here on, in this
+        # thread or the async views' ones, get the replica instead
+        cls.readonly_settings = connections.settings['readonly']
+        cls.readonly_name = cls.readonly_settings['NAME']
+        cls.readonly_settings['NAME'] = f'file:{cls.replica_path}?mode=ro'
+        cls.mirror_settings = connections['readonly'].settings_dict
+        connections['readonly'].close()
+        connections['readonly'].settings_dict = cls.readonly_settings
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['readonly'].close()
+        connections['readonly'].settings_dict = cls.mirror_settings
+        cls.readonly_settings['NAME'] = cls.readonly_name
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='admin', password='pass1234')
+        self.project = Project.objects.create(name='Replicated', technologies=['Django'])
+        self.replicate()
+
+    def replicate(self):
+        """Copy the primary's committed state to the replica file"""
+        connections['default'].ensure_connection()
+        replica = sqlite3.connect(self.replica_path)
+        connections['default'].connection.backup(replica)
+        replica.close()
+
+    def test_read_views_query_the_replica(self):
+        unreplicated = Project.objects.create(name='Primary only', technologies=['React'])
+        cache.clear()
+
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual([project['name'] for project in response.json()], ['Replicated'])
+        self.assertEqual(self.client.get(reverse('technologies-list')).json(), ['Django'])
+        response = self.client.get(reverse('project-detail', args=[unreplicated.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.replicate()
+        cache.clear()
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual({project['name'] for project in response.json()}, {'Replicated', 'Primary only'})
+
+    def test_writes_and_their_reads_stay_on_the_primary(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.put(reverse('project-detail', args=[self.project.id]), {
+            'projectData': json.dumps({'name': 'Renamed'}),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Renamed')
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.json()[0]['name'], 'Replicated')
+
+        @read_from_replica
+        def view(self, request):
+            before = Project.objects.count()
+            Project.objects.create(name='Written in a read view')
+            return before, Project.objects.count()
+        self.assertEqual(view(None, None), (1, 2))
+
+        with self.assertRaisesMessage(Exception, 'readonly database'):
+            Project.objects.using('readonly').create(name='Rejected')
+
+    def test_lagging_replica_reads_are_neither_cached_nor_tagged(self):
+        Project.objects.create(name='Primary only', technologies=['React'])
+
+        for name in ['project-list', 'facets']:
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(response.has_header('ETag'))
+        response = self.client.get(reverse('project-search'), {'q': 'primary'})
+        self.assertEqual(response.json(), [])
+
+        # Nothing was cached under the current catalog version, so the caught-up replica shows
+        self.replicate()
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual({project['name'] for project in response.json()}, {'Replicated', 'Primary only'})
+        response = self.client.get(reverse('project-search'), {'q': 'primary'})
+        self.assertEqual([project['name'] for project in response.json()], ['Primary only'])
+
+    def test_read_only_handle_on_the_primary_is_current(self):
+        lagging = read_from_replica(lambda self, request: reads_may_lag())
+        self.assertTrue(lagging(None, None))
+        self.assertFalse(reads_may_lag())
+        with override_settings(DATABASE_READ_ALIAS=''):
+            self.assertFalse(lagging(None, None))
+        # As under test, where the alias mirrors the primary
+        connections['readonly'].settings_dict = connections['default'].settings_dict
+        try:
+            self.assertEqual(read_alias(), 'default')
+            self.assertFalse(lagging(None, None))
+        finally:
+            connections['readonly'].settings_dict = self.readonly_settings
@@ -0,0 +1,108 @@
+import fcntl
+import hashlib
+import os
+from django.conf import settings
+from django.db import transaction
+from .models import ChunkedUpload, FileDeletion, ProjectFile
+from .storage import select_project_file_storage
+
+# Bytes moved per read/write; the only buffer an upload ever holds
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    status_code = 400
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the upload stands, the client should resume from ``offset``"""
+    status_code = 409
+
+    def __init__(self, offset):
+        super().__init__(f'Upload is at offset {offset}')
+        self.offset = offset
+
+
+def create_upload(name, size, sha256=''):
+    """Register an upload and create its empty staging file"""
+    upload = ChunkedUpload.objects.create(name=name, size=size, sha256=sha256.lower())
+    path = select_project_file_storage().path(upload.part_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length, checksum=None):
+    """
+    Write ``length`` bytes of ``stream`` at ``offset`` of the staging file, straight from
+    the request body, and move the upload's offset past them.
+    ``checksum`` is the expected hex SHA-256 of the chunk; a mismatch discards the chunk.
+    """
+    if offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        raise UploadError(f'Chunks are limited to {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes')
+    if offset + length > upload.size:
+        raise UploadError('Chunk goes past the declared upload size')
+
+    path = select_project_file_storage().path(upload.part_name)
+    hasher = hashlib.sha256()
+    with open(path, 'r+b') as part:
+        try:
+            # A second request for the same upload would interleave its writes
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise OffsetMismatch(upload.offset)
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            block = stream.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            part.write(block)
+            remaining -= len(block)
+        part.truncate()
+
+        if remaining:
+            raise UploadError('Request body is shorter than Content-Length')
+        if checksum and hasher.hexdigest() != checksum.lower():
+            part.truncate(offset)
+            raise UploadError('Chunk checksum mismatch')
+
+        # Only one request can move the offset from the value it started at
+        if not ChunkedUpload.objects.filter(pk=upload.pk, offset=offset).update(offset=offset + length):
+            raise OffsetMismatch(ChunkedUpload.objects.get(pk=upload.pk).offset)
+    upload.offset = offset + length
+    return upload
+
+
+def complete_upload(upload, project):
+    """
+    Turn a fully received upload into an attachment of ``project``.
+    The staging file is hashed once, block by block, and renamed into its content-addressed blob.
+    """
+    if upload.offset != upload.size:
+        raise UploadError(f'Upload has {upload.offset} of {upload.size} bytes')
+
+    storage = select_project_file_storage()
+    hasher = hashlib.sha256()
+    with storage.open(upload.part_name, 'rb') as part:
+        for block in iter(lambda: part.read(BLOCK_SIZE), b''):
+            hasher.update(block)
+    digest = hasher.hexdigest()
+    if upload.sha256 and digest != upload.sha256:
+        raise UploadError('File checksum mismatch')
+
+    with transaction.atomic():
+        FileDeletion.lock_blobs()
+        blob = storage.adopt(upload.part_name, f'projects/{upload.name}', digest)
+        project_file = ProjectFile.objects.create(file=blob, name=upload.name)
+        project.attached_files.add(project_file)
+        upload.delete()
+    return project_file
+
+
+def abort_upload(upload):
+    select_project_file_storage().delete(upload.part_name)
+    upload.delete()
@@ -1,10 +1,23 @@
+from django.conf import settings
 from django.urls import path
-from .views import ProjectListView, ProjectDetailView, TechnologiesListView, RelationSettingsView, health_check
+from .views import (
+    ProjectListView, ProjectSearchView, ProjectBulkView, ProjectDetailView, TechnologiesListView, FacetsView,
+    RelationSettingsView, MetricsView, UploadListView, UploadDetailView, UploadCompleteView,
+    health_check, ahealth_check
+)
 
 urlpatterns = [
-    path('health/', health_check, name='health-check'),
+    # Like the read views, the liveness probe runs on the event loop under API_ASYNC_VIEWS
+    path('health/', ahealth_check if settings.API_ASYNC_VIEWS else health_check, name='health-check'),
     path('projects/', ProjectListView.as_view(), name='project-list'),
+    path('projects/search/', ProjectSearchView.as_view(), name='project-search'),
+    path('projects/bulk/', ProjectBulkView.as_view(), name='project-bulk'),
     path('projects/<int:id>/', ProjectDetailView.as_view(), name='project-detail'),
     path('technologies/', TechnologiesListView.as_view(), name='technologies-list'),
+    path('facets/', FacetsView.as_view(), name='facets'),
+    path('uploads/', UploadListView.as_view(), name='upload-list'),
+    path('uploads/<uuid:id>/', UploadDetailView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:id>/complete/', UploadCompleteView.as_view(), name='upload-complete'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('relation-settings/', RelationSettingsView.as_view(), name='relation-settings'),
 ]
\ No newline at end of file
@@ -1,28 +1,167 @@
 import json
-from urllib.parse import unquote
+from itertools import islice
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Project, ProjectFile, RelationSettings
-from .serializers import ProjectSerializer
-from django.db.models.signals import post_delete
-from django.dispatch import receiver
-from rest_framework.decorators import api_view
-from django.http import JsonResponse
+from .models import ChunkedUpload, Project, ProjectFile, RelationSettings, Tag, Technology
+from .serializers import (
+    ChunkedUploadSerializer, ProjectFileSerializer, ProjectSerializer, RelatedProjectSerializer, project_columns,
+    project_rows
+)
+from .bulk import BulkImportError, export_bundle, export_ndjson, import_bundle, import_ndjson
+from .cache import cache_catalog_response, conditional_catalog_response
+from .deletions import batched_file_deletions
+from .images import schedule_variants
+from .metrics import MetricsTokenAuthentication, collect, render_prometheus
+from .pagination import ProjectCursorPagination
+from .related import RELATED_INDEX_SIZE, aget_related_projects, get_related_projects
+from .routers import read_from_replica
+from .search import search_project_ids
+from .terms import term_facets, used_technologies
+from .uploads import OffsetMismatch, UploadError, abort_upload, append_chunk, complete_upload, create_upload
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.functional import classproperty
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.utils.encoders import JSONEncoder
 
 
-class ProjectListView(APIView):
-    def get(self, request):
+class AsyncAPIView(APIView):
+    """
+    APIView with a sync ``get`` for WSGI workers and an ``async def aget`` for the ASGI
+    worker. ``settings.API_ASYNC_VIEWS`` picks one when the URLconf builds the view; in
+    async mode the other handlers (the writes) still work and run in a worker thread.
+    """
+
+    @classproperty
+    def view_is_async(cls):
+        return settings.API_ASYNC_VIEWS
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication may look the user up in the database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            if method in self.http_method_names:
+                handler = getattr(self, f'a{method}', None) or getattr(self, method, self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+async def serialize(serializer):
+    """
+    Serializer data, built in a worker thread: serializing is CPU work, and file
+    sources may still have to query for image variants that were never generated.
+    """
+    return await sync_to_async(lambda: serializer.data)()
+
+
+class ProjectListView(AsyncAPIView):
+    pagination_class = ProjectCursorPagination
+    stream_chunk_size = 500
+
+    def get_requested_fields(self, request):
+        """Parse the ``fields=name,tags`` sparse fieldset parameter"""
+        fields = request.query_params.get('fields')
+        if not fields:
+            return None
+        return {'id'} | {field.strip() for field in fields.split(',') if field.strip()}
+
+    def stream_projects(self, projects, fields):
+        """Write one JSON object per line as rows come out of the database"""
+        encoder = JSONEncoder(ensure_ascii=False)
+        rows = projects.iterator(chunk_size=self.stream_chunk_size)
+        while batch := list(islice(rows, self.stream_chunk_size)):
+            for data in project_rows(batch, fields):
+                yield encoder.encode(data) + '\n'
+
+    async def astream_projects(self, projects, fields):
+        encoder = JSONEncoder(ensure_ascii=False)
+        batch = []
+        async for row in projects.aiterator(chunk_size=self.stream_chunk_size):
+            batch.append(row)
+            if len(batch) == self.stream_chunk_size:
+                for data in await sync_to_async(project_rows)(batch, fields):
+                    yield encoder.encode(data) + '\n'
+                batch = []
+        for data in await sync_to_async(project_rows)(batch, fields):
+            yield encoder.encode(data) + '\n'
+
+    def get_projects(self, request, fields):
         is_starred = request.query_params.get('is_starred')
         if is_starred is not None:
             projects = Project.objects.filter(is_starred=is_starred.lower() == 'true')
         else:
             projects = Project.objects.all()
-        serializer = ProjectSerializer(projects, many=True)
-        for project in serializer.data:
-            project_instance = Project.objects.get(id=project['id'])
-            project['attached_files'] = [{"id": file.id, "file": file.file.url} for file in project_instance.attached_files.all()]
-        return Response(serializer.data)
+
+        # Plain rows straight into dicts, see api.serializers.project_rows; the attached
+        # files of each batch of rows are read with one extra query
+        return projects.values(*project_columns(fields))
+
+    def is_stream_requested(self, request):
+        return request.query_params.get('stream', '').lower() == 'true'
+
+    @read_from_replica
+    @conditional_catalog_response
+    @cache_catalog_response
+    def get(self, request):
+        fields = self.get_requested_fields(request)
+        projects = self.get_projects(request, fields)
+
+        if self.is_stream_requested(request):
+            return StreamingHttpResponse(self.stream_projects(projects, fields), content_type='application/x-ndjson')
+
+        paginator = self.pagination_class()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(projects, request, view=self)
+            return paginator.get_paginated_response(project_rows(page, fields))
+
+        return Response(project_rows(projects, fields))
+
+    @read_from_replica
+    @conditional_catalog_response
+    @cache_catalog_response
+    async def aget(self, request):
+        fields = self.get_requested_fields(request)
+        projects = self.get_projects(request, fields)
+
+        if self.is_stream_requested(request):
+            # Each server gets the iterator it can stream; the other kind would be buffered whole
+            if isinstance(request._request, ASGIRequest):
+                lines = self.astream_projects(projects, fields)
+            else:
+                lines = self.stream_projects(projects, fields)
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+        paginator = self.pagination_class()
+        if paginator.is_requested(request):
+            page = await paginator.apaginate_queryset(projects, request, view=self)
+            return paginator.get_paginated_response(await sync_to_async(project_rows)(page, fields))
+
+        return Response(await sync_to_async(project_rows)(projects, fields))
     
     def post(self, request):
         # Check authentication
@@ -42,60 +181,153 @@ class ProjectListView(APIView):
 
         # Handle attached files
         for file in attached_files_data:
-            project_file = ProjectFile.objects.create(file=file)
+            project_file = ProjectFile.objects.create(file=file, name=file.name)
             project.attached_files.add(project_file)
 
         return Response(ProjectSerializer(project).data, status=status.HTTP_201_CREATED)
 
 
-class ProjectDetailView(APIView):
-    def get_related_projects(self, project):
-        # Get current relation settings
-        relation_settings = RelationSettings.get_current_settings()
-        excluded_tags = set(relation_settings.excluded_tags or [])
-        excluded_technologies = set(relation_settings.excluded_technologies or [])
-        
-        related_projects = Project.objects.exclude(id=project.id)
-        
-        # Calculate the match score for each project
-        def match_score(p):
-            score = 0
-            
-            # Filter out excluded tags when calculating similarity
-            if project.tags and p.tags:
-                project_tags = set(project.tags) - excluded_tags
-                p_tags = set(p.tags) - excluded_tags
-                score += len(project_tags & p_tags)
-            
-            # Filter out excluded technologies when calculating similarity
-            if project.technologies and p.technologies:
-                project_techs = set(project.technologies) - excluded_technologies
-                p_techs = set(p.technologies) - excluded_technologies
-                score += len(project_techs & p_techs)
-            
-            return score
-        
-        # Annotate projects with their match score and filter out those with no matches
-        related_projects = [p for p in related_projects if match_score(p) > 0]
-        
-        # Sort projects by their match score in descending order
-        related_projects = sorted(related_projects, key=match_score, reverse=True)
-        
-        return related_projects
+class ProjectSearchView(APIView):
+    search_limit = 20
+    max_search_limit = 100
+
+    def get_terms(self, request, name):
+        """Parse a comma-separated ``tags=`` / ``technologies=`` filter"""
+        values = request.query_params.get(name, '')
+        return [value.strip() for value in values.split(',') if value.strip()]
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.search_limit))
+        except ValueError:
+            return self.search_limit
+        return max(1, min(limit, self.max_search_limit))
+
+    @read_from_replica
+    @conditional_catalog_response
+    @cache_catalog_response
+    def get(self, request):
+        """Projects matching every word of ``q`` as a prefix, best match first"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'Search query is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        project_ids = search_project_ids(
+            query,
+            tags=self.get_terms(request, 'tags'),
+            technologies=self.get_terms(request, 'technologies'),
+            limit=self.get_limit(request)
+        )
+        projects = Project.objects.prefetch_related('attached_files').order_by().in_bulk(project_ids)
+        serializer = ProjectSerializer([projects[id] for id in project_ids if id in projects], many=True)
+        return Response(serializer.data)
+
+
+class ProjectBulkView(APIView):
+    def check_admin(self, request):
+        # Check authentication
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        if not request.user.is_staff:
+            return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+        return None
+
+    def get(self, request):
+        """Stream every project as NDJSON, or as a zip bundle with media given ?bundle=true"""
+        denied = self.check_admin(request)
+        if denied is not None:
+            return denied
+
+        if request.query_params.get('bundle', '').lower() == 'true':
+            response = StreamingHttpResponse(export_bundle(), content_type='application/zip')
+            response['Content-Disposition'] = 'attachment; filename="projects.zip"'
+        else:
+            response = StreamingHttpResponse(export_ndjson(), content_type='application/x-ndjson')
+            response['Content-Disposition'] = 'attachment; filename="projects.ndjson"'
+        return response
+
+    def post(self, request):
+        """
+        Import projects from an NDJSON request body, or from a multipart ``file``
+        holding NDJSON or a zip bundle made by the export.
+        """
+        denied = self.check_admin(request)
+        if denied is not None:
+            return denied
+
+        try:
+            if request.content_type.startswith('application/x-ndjson'):
+                # Read line by line from the socket, never parsed into request.data
+                projects, files = import_ndjson(request.stream or [])
+            else:
+                upload = request.FILES.get('file')
+                if upload is None:
+                    return Response(
+                        {'error': 'Send NDJSON as the body or a file upload'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                if upload.name.lower().endswith('.zip'):
+                    projects, files = import_bundle(upload)
+                else:
+                    projects, files = import_ndjson(upload)
+        except BulkImportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'projects': projects, 'files': files}, status=status.HTTP_201_CREATED)
 
+
+class ProjectDetailView(AsyncAPIView):
+    related_limit = 6
+    max_related_limit = RELATED_INDEX_SIZE
+
+    def get_related_limit(self, request):
+        """Parse the ``related_limit`` parameter, clamped to ``max_related_limit``"""
+        try:
+            limit = int(request.query_params.get('related_limit', self.related_limit))
+        except ValueError:
+            return self.related_limit
+        return max(0, min(limit, self.max_related_limit))
+
+    def get_related_projects(self, project, limit):
+        # Neighbours are precomputed on write, see api.related and api.signals
+        return get_related_projects(project, limit)
+
+    async def aget_related_projects(self, project, limit):
+        return await aget_related_projects(project, limit)
+
+    @read_from_replica
+    @conditional_catalog_response
+    @cache_catalog_response
     def get(self, request, id):
         try:
-            project = Project.objects.get(id=id)
+            project = Project.objects.prefetch_related('attached_files').get(id=id)
         except Project.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        serializer = ProjectSerializer(project)
-        project_data = serializer.data
-        project_data['attached_files'] = [{"id": file.id, "file": file.file.url} for file in project.attached_files.all()]
+        project_data = ProjectSerializer(project).data
 
-        # Fetch related projects
-        related_projects = self.get_related_projects(project)
-        related_projects_serializer = ProjectSerializer(related_projects, many=True)
-        project_data['related_projects'] = related_projects_serializer.data
+        # Fetch the best related projects as compact cards
+        related_projects = self.get_related_projects(project, self.get_related_limit(request))
+        project_data['related_projects'] = RelatedProjectSerializer(related_projects, many=True).data
+
+        return Response(project_data)
+
+    @read_from_replica
+    @conditional_catalog_response
+    @cache_catalog_response
+    async def aget(self, request, id):
+        try:
+            project = await Project.objects.prefetch_related('attached_files').aget(id=id)
+        except Project.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        project_data = await serialize(ProjectSerializer(project))
+
+        related_projects = await self.aget_related_projects(project, self.get_related_limit(request))
+        project_data['related_projects'] = await serialize(RelatedProjectSerializer(related_projects, many=True))
 
         return Response(project_data)
 
@@ -114,35 +346,51 @@ class ProjectDetailView(APIView):
                 
         data = json.loads(request.data.dict()['projectData'])        
         
+        # Ids of the attachments to keep; every other attachment of the project is removed
         retained_files = json.loads(request.data.dict().get('retained_files', '[]'))
         retained_files: list = retained_files if isinstance(retained_files, list) else [retained_files]
-        for i in range(len(retained_files)):
-            retained_files[i] = unquote(retained_files[i].split('/media/')[-1])
+        try:
+            retained_ids = {int(file_id) for file_id in retained_files}
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'retained_files must be a list of file ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         serializer = ProjectSerializer(project, data=data)
         if serializer.is_valid():
-            project = serializer.save()
-
-            # Handle attached files
-            existing_files = {file.file.name: file for file in project.attached_files.all()}
-            new_files = {file.name: file for file in request.FILES.getlist("attached_files")}
-
-            # Add new files
-            for file_name, file in new_files.items():
-                if file_name not in existing_files:
-                    project_file = ProjectFile.objects.create(file=file)
-                    project.attached_files.add(project_file)
-
-            # Remove old files that are not in the retained files list
-            removed_files = set(existing_files.keys()) - set(retained_files)
-            for file_name in removed_files:
-                project.attached_files.remove(existing_files[file_name])
-                existing_files[file_name].file.delete()  # Deletes the file from storage
-                existing_files[file_name].delete()  # Deletes the ProjectFile instance
-            
+            # A handful of queries however many files change, and all or nothing
+            with transaction.atomic(), batched_file_deletions():
+                project = serializer.save()
+                self.update_attached_files(project, retained_ids, request.FILES.getlist("attached_files"))
+
             return Response(ProjectSerializer(project).data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def update_attached_files(self, project, retained_ids, uploads):
+        """
+        Keep the attachments in ``retained_ids``, unlink the rest and attach every upload,
+        writing the through-table in bulk. Unlinked files no other project uses are deleted.
+        Bulk writes send no m2m_changed, saving the project already bumped the catalog version.
+        """
+        links = Project.attached_files.through.objects.filter(project_id=project.id)
+        current_ids = set(links.values_list('projectfile_id', flat=True))
+        removed_ids = current_ids - retained_ids
+
+        if removed_ids:
+            links.filter(projectfile_id__in=removed_ids).delete()
+            ProjectFile.objects.filter(id__in=removed_ids, project__isnull=True).delete()
+
+        if uploads:
+            # The FileField stores each upload as its row is inserted
+            added = ProjectFile.objects.bulk_create([ProjectFile(file=file, name=file.name) for file in uploads])
+            Project.attached_files.through.objects.bulk_create([
+                Project.attached_files.through(project_id=project.id, projectfile_id=project_file.id)
+                for project_file in added
+            ])
+            for project_file in added:
+                schedule_variants(project_file)
+
     def delete(self, request, id):
         # Check authentication
         if not request.user.is_authenticated:
@@ -159,14 +407,150 @@ class ProjectDetailView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TechnologiesListView(APIView):
+class UploadListView(APIView):
+    def post(self, request):
+        """Start a resumable upload: {name, size, sha256?}"""
+        # Check authentication
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        serializer = ChunkedUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        upload = create_upload(**serializer.validated_data)
+        return Response(ChunkedUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+def upload_error_response(error):
+    data = {'error': str(error)}
+    if isinstance(error, OffsetMismatch):
+        # Where the client has to resume from
+        data['offset'] = error.offset
+    return Response(data, status=error.status_code)
+
+
+class UploadDetailView(APIView):
+    def get(self, request, id):
+        """How far the upload got, to resume it"""
+        # Check authentication
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        upload = ChunkedUpload.objects.filter(id=id).first()
+        if upload is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def patch(self, request, id):
+        """
+        Append the raw request body at the ``Upload-Offset`` header, optionally
+        checked against ``Upload-Checksum: sha256 <hex digest of the chunk>``.
+        """
+        # Check authentication
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        upload = ChunkedUpload.objects.filter(id=id).first()
+        if upload is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Upload-Offset and Content-Length headers are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        algorithm, _, checksum = request.headers.get('Upload-Checksum', 'sha256 ').partition(' ')
+        if algorithm.lower() != 'sha256':
+            return Response(
+                {'error': 'Only sha256 chunk checksums are supported'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if length <= 0:
+            return Response({'error': 'Empty chunk'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # The body goes straight from the socket to the staging file, never through a parser
+            append_chunk(upload, offset, request.stream, length, checksum or None)
+        except UploadError as e:
+            return upload_error_response(e)
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def delete(self, request, id):
+        """Abandon the upload and its staged bytes"""
+        # Check authentication
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        upload = ChunkedUpload.objects.filter(id=id).first()
+        if upload is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        abort_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadCompleteView(APIView):
+    def post(self, request, id):
+        """Attach the finished upload to the project given as {project: id}"""
+        # Check authentication
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        upload = ChunkedUpload.objects.filter(id=id).first()
+        if upload is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        project = Project.objects.filter(id=request.data.get('project')).first()
+        if project is None:
+            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            project_file = complete_upload(upload, project)
+        except UploadError as e:
+            return upload_error_response(e)
+        return Response(ProjectFileSerializer(project_file).data, status=status.HTTP_201_CREATED)
+
+
+class TechnologiesListView(AsyncAPIView):
+    @read_from_replica
+    @conditional_catalog_response
+    @cache_catalog_response
     def get(self, request):
-        projects = Project.objects.all()
-        technologies = set()
-        for project in projects:
-            if project.technologies:
-                technologies.update(project.technologies)
-        return Response(list(technologies))
+        return Response(list(used_technologies()))
+
+    @read_from_replica
+    @conditional_catalog_response
+    @cache_catalog_response
+    async def aget(self, request):
+        return Response([name async for name in used_technologies()])
+
+
+class FacetsView(APIView):
+    @read_from_replica
+    @conditional_catalog_response
+    @cache_catalog_response
+    def get(self, request):
+        """Tags and technologies with their overall and starred project counts"""
+        return Response({
+            'tags': term_facets(Tag),
+            'technologies': term_facets(Technology),
+        })
 
 
 class RelationSettingsView(APIView):
@@ -183,6 +567,9 @@ class RelationSettingsView(APIView):
         return Response({
             'excluded_tags': settings.excluded_tags or [],
             'excluded_technologies': settings.excluded_technologies or [],
+            'tag_weight': settings.tag_weight,
+            'technology_weight': settings.technology_weight,
+            'score_normalization': settings.score_normalization,
             'updated_at': settings.updated_at
         })
     
@@ -205,11 +592,20 @@ class RelationSettingsView(APIView):
             
             settings.excluded_tags = excluded_tags
             settings.excluded_technologies = excluded_technologies
+            
+            # Similarity weights and normalization are optional, keep the stored ones if omitted
+            settings.tag_weight = float(request.data.get('tag_weight', settings.tag_weight))
+            settings.technology_weight = float(request.data.get('technology_weight', settings.technology_weight))
+            settings.score_normalization = request.data.get('score_normalization', settings.score_normalization)
+            settings.full_clean()
             settings.save()
             
             return Response({
                 'excluded_tags': settings.excluded_tags or [],
                 'excluded_technologies': settings.excluded_technologies or [],
+                'tag_weight': settings.tag_weight,
+                'technology_weight': settings.technology_weight,
+                'score_normalization': settings.score_normalization,
                 'updated_at': settings.updated_at,
                 'message': 'Settings updated successfully'
             })
@@ -221,21 +617,37 @@ class RelationSettingsView(APIView):
             )
 
 
-@receiver(post_delete, sender=Project)
-def delete_attached_files(sender, instance, **kwargs):
-    """
-    Delete attached files when a Project instance is deleted.
-    """
-    if instance.attached_files:
-        for file in instance.attached_files.all():
-            file.file.delete()  # Deletes the file from storage
-        instance.attached_files.clear()
+class MetricsView(APIView):
+    authentication_classes = [MetricsTokenAuthentication, *APIView.authentication_classes]
+
+    def get(self, request):
+        """Per-route latency, SQL and serializer quantiles of all workers, in the Prometheus text format"""
+        scraper = bool(settings.METRICS_TOKEN) and request.auth == settings.METRICS_TOKEN
+        if not scraper:
+            if not request.user.is_authenticated:
+                return Response(
+                    {'error': 'Authentication required'},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+            if not request.user.is_staff:
+                return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
 
+        return HttpResponse(render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
 
-@api_view(['GET'])
+
+@require_GET
 def health_check(request):
     """Simple health check endpoint"""
     return JsonResponse({
         'status': 'healthy',
         'message': 'API is running'
     })
+
+
+@require_GET
+async def ahealth_check(request):
+    """health_check for the ASGI worker, answered on the event loop rather than in a worker thread"""
+    return JsonResponse({
+        'status': 'healthy',
+        'message': 'API is running'
+    })
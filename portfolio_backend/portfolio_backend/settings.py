@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 from decouple import config
 
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'api.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -84,9 +87,120 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': config('SQLITE_BUSY_TIMEOUT', cast=int, default=20),
+        },
+    }
+}
+
+# Production profile for several workers sharing db.sqlite3, on unless DEBUG. WAL lets
+# readers go on while a writer commits, and with synchronous=NORMAL a commit no longer
+# waits for fsync (the last ones may be lost on power failure, never corrupted).
+# Connections are kept for CONN_MAX_AGE seconds instead of opened per request, so the
+# pragmas and the page cache carry over; set it to 0 under ASGI, see DEPLOYMENT.md.
+SQLITE_PRODUCTION_PROFILE = config('SQLITE_PRODUCTION_PROFILE', cast=bool, default=not DEBUG)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 ** 2,
+    # Negative: KiB rather than pages
+    'cache_size': -64 * 1024,
+}
+SQLITE_INIT_COMMAND = ';'.join(f'PRAGMA {name} = {value}' for name, value in SQLITE_PRAGMAS.items())
+
+# What the profile sets on the alias; sqlite_concurrency measures the same settings
+SQLITE_PROFILE = {
+    'OPTIONS': {
+        'init_command': SQLITE_INIT_COMMAND,
+        # Background workers (api.images, api.deletions) write next to requests. A deferred
+        # transaction that reads first cannot upgrade to a write while another connection
+        # writes and fails with "database is locked"; immediate ones take the write lock up
+        # front and wait up to ``timeout`` seconds for it.
+        'transaction_mode': 'IMMEDIATE',
+    },
+    'CONN_MAX_AGE': config('DJANGO_CONN_MAX_AGE', cast=int, default=600),
+    'CONN_HEALTH_CHECKS': True,
+}
+
+if SQLITE_PRODUCTION_PROFILE:
+    DATABASES['default']['OPTIONS'].update(SQLITE_PROFILE['OPTIONS'])
+    DATABASES['default']['CONN_MAX_AGE'] = SQLITE_PROFILE['CONN_MAX_AGE']
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = SQLITE_PROFILE['CONN_HEALTH_CHECKS']
+
+# The public read views query DATABASE_READ_ALIAS, writes and everything else the
+# primary, see api.routers. By default that is a second, read-only handle on the same
+# file, so a reader can never take a write lock; point it at a replica alias instead,
+# or leave it empty to read from the primary too.
+DATABASES['readonly'] = {
+    **DATABASES['default'],
+    'NAME': f"file:{DATABASES['default']['NAME']}?mode=ro",
+    'OPTIONS': {
+        'timeout': DATABASES['default']['OPTIONS']['timeout'],
+        # journal_mode is a property of the file, which a read-only handle cannot change
+        'init_command': ';'.join(
+            statement for statement in DATABASES['default']['OPTIONS'].get('init_command', '').split(';')
+            if statement and 'journal_mode' not in statement
+        ),
+    },
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_READ_ALIAS = config('DATABASE_READ_ALIAS', default='readonly')
+DATABASE_ROUTERS = ['api.routers.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory is per process; production points all gunicorn workers
+# at one shared file-based cache so they agree on the catalog version.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('DJANGO_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('DJANGO_CACHE_LOCATION', default='portfolio'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
     }
 }
 
+# Seconds a rendered API response stays cached; writes invalidate it earlier
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', cast=int, default=60 * 60 * 24)
+
+# Serve the public reads with their async handlers, for the ASGI worker only; under WSGI
+# they would pay an event loop and thread hops per request. Read when the URLconf loads.
+API_ASYNC_VIEWS = config('API_ASYNC_VIEWS', cast=bool, default=False)
+
+# Resized AVIF/WebP derivatives of uploaded images, see api.images.
+# IMAGE_VARIANT_WORKERS = 0 generates them inline instead of in a thread pool.
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_VARIANT_FORMATS = ('avif', 'webp')
+IMAGE_VARIANT_QUALITY = 75
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', cast=int, default=2)
+
+# Stored files are deleted from a queue after commit, see api.deletions.
+# FILE_DELETION_WORKER = False works the queue off inline instead of in a background thread.
+FILE_DELETION_WORKER = config('FILE_DELETION_WORKER', cast=bool, default=True)
+FILE_DELETION_BATCH_SIZE = 100
+FILE_DELETION_MAX_ATTEMPTS = 5
+
+# Pre-rendered public API responses that nginx serves without reaching Django, see
+# api.snapshots; left empty, none are written. API_SNAPSHOT_WORKER = False rewrites
+# them inline instead of in a background thread.
+API_SNAPSHOT_ROOT = config('API_SNAPSHOT_ROOT', default='')
+API_SNAPSHOT_WORKER = config('API_SNAPSHOT_WORKER', cast=bool, default=True)
+
+# Per-route request latency, SQL and serializer histograms, see api.metrics. Every worker
+# writes its own to METRICS_DIRECTORY (best on a tmpfs) and /api/metrics/ merges them; staff
+# users may read it, as may a scraper sending METRICS_TOKEN as its bearer token.
+METRICS_DIRECTORY = config('METRICS_DIRECTORY', default=str(Path(tempfile.gettempdir()) / 'portfolio-metrics'))
+METRICS_WINDOW_MINUTES = 5
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Opt-in sampling profiler: this share of requests runs under cProfile, and those slower than
+# the threshold leave a .prof dump in METRICS_PROFILE_DIRECTORY; left empty, nothing is profiled.
+METRICS_PROFILE_DIRECTORY = config('METRICS_PROFILE_DIRECTORY', default='')
+METRICS_PROFILE_SAMPLE_RATE = config('METRICS_PROFILE_SAMPLE_RATE', cast=float, default=0.01)
+METRICS_PROFILE_THRESHOLD_MS = config('METRICS_PROFILE_THRESHOLD_MS', cast=int, default=500)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -135,8 +249,17 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # JSON through orjson, see api.renderers
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# 'orjson' (pinned in requirements.txt) or 'stdlib'. The system checks fail while
+# orjson is selected but missing; choose 'stdlib' explicitly to run without it.
+API_JSON_ENCODER = config('API_JSON_ENCODER', default='orjson')
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "https://dant4ick.ru",
@@ -155,6 +278,32 @@ if DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded project files are stored once per distinct content, see api.storage
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'project_files': {
+        'BACKEND': 'api.storage.ContentAddressedStorage',
+    },
+}
+
+# Resumable uploads, see api.uploads: the largest file and the largest single chunk
+# accepted; nginx must let request bodies of CHUNKED_UPLOAD_CHUNK_SIZE through
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', cast=int, default=4 * 1024 ** 3)
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 ** 2
+# Days an unfinished upload is kept before sweep_orphan_files discards it
+CHUNKED_UPLOAD_EXPIRY_DAYS = 7
+
+# Hash uploads while they stream in, so duplicates are recognized without re-reading them
+FILE_UPLOAD_HANDLERS = [
+    'api.storage.HashingMemoryFileUploadHandler',
+    'api.storage.HashingTemporaryFileUploadHandler',
+]
+
 # Security settings for production
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
@@ -31,7 +31,7 @@ export function EditProjectDialog({
             const retainedFiles = attached_files.filter((file) => file.url);
             formData.append(
                 "retained_files",
-                JSON.stringify(retainedFiles.map((file) => file.url))
+                JSON.stringify(retainedFiles.map((file) => file.id))
             );
         }
 
@@ -48,6 +48,7 @@ function ProjectDialog({
             setFileList(
                 (initialData.attached_files || []).map((file, index) => ({
                     uid: `${file.name}-${index}`,
+                    id: file.id,
                     name: file.name,
                     status: "done",
                     url: file.url, // Ensure file object has URL property
@@ -275,6 +276,7 @@ ProjectDialog.propTypes = {
         attached_files: PropTypes.arrayOf(
             PropTypes.shape({
                 name: PropTypes.string,
+                id: PropTypes.number,
                 url: PropTypes.string,
             })
         ),
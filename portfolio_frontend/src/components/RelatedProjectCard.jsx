@@ -0,0 +1,51 @@
+import PropTypes from "prop-types";
+import { Card, Flex, Typography, Tooltip, Image } from "antd";
+import { Link } from "react-router-dom";
+import { RightOutlined } from "@ant-design/icons";
+
+const { Text } = Typography;
+
+// Compact card of the detail response's related_projects: {id, name, score, image}
+export default function RelatedProjectCard({ project }) {
+    const cardTitle = (
+        <Tooltip title="Нажмите, чтобы перейти на страницу проекта">
+            <Link to={`/projects/${project.id}`} style={{ display: 'flex', alignItems: 'center' }}>
+                <RightOutlined style={{ marginRight: 8 }} />
+                <Text strong>
+                    {project.name || "Без названия"}
+                </Text>
+            </Link>
+        </Tooltip>
+    );
+
+    return (
+        <Card title={cardTitle} size="small" hoverable>
+            <Flex gap="small" vertical>
+                {project.image && (
+                    <Link to={`/projects/${project.id}`}>
+                        <Image
+                            src={project.image}
+                            alt={project.name || ""}
+                            preview={false}
+                            style={{ width: "100%", height: 160, objectFit: "cover" }}
+                        />
+                    </Link>
+                )}
+                <Tooltip title="Общие теги и технологии с учётом весов">
+                    <Text type="secondary">
+                        Сходство: {Number.isInteger(project.score) ? project.score : project.score.toFixed(2)}
+                    </Text>
+                </Tooltip>
+            </Flex>
+        </Card>
+    );
+}
+
+RelatedProjectCard.propTypes = {
+    project: PropTypes.shape({
+        id: PropTypes.number.isRequired,
+        name: PropTypes.string,
+        score: PropTypes.number.isRequired,
+        image: PropTypes.string,
+    }).isRequired,
+};
@@ -67,9 +67,10 @@ const AdminDashboard = () => {
         setSelectedProject({
             ...project,
             attached_files: project.attached_files.map(
-                ({file: fileUrl}, index) => ({
+                ({id, file: fileUrl, name}, index) => ({
                     uid: index,
-                    name: decodeURIComponent(fileUrl.split("/").pop()),
+                    id,
+                    name: name || decodeURIComponent(fileUrl.split("/").pop()),
                     status: "done",
                     url: fileUrl,
                 })
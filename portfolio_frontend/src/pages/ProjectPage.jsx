@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import { Flex, Row, Col, Typography, Tag, Image, Carousel } from "antd";
-import ProjectCard from "../components/ProjectCard";
+import RelatedProjectCard from "../components/RelatedProjectCard";
 import HeaderWithBackButton from "../components/HeaderBack";
 import LinkButton from "../components/LinkButton";
 import FileButton from "../components/FileButton";
@@ -126,8 +126,9 @@ export default function ProjectDetailsPage() {
                         Прикрепленные файлы
                     </Typography.Title>
                     <Row gutter={[16, 16]}>
-                        {otherFiles.map(({ file: fileUrl }, index) => {
-                            const fileName = decodeURIComponent(
+                        {otherFiles.map(({ file: fileUrl, name }, index) => {
+                            // Stored files are named by content hash, show the uploaded name
+                            const fileName = name || decodeURIComponent(
                                 fileUrl.split("/").pop()
                             );
                             return (
@@ -149,7 +150,7 @@ export default function ProjectDetailsPage() {
                     <Row gutter={[16, 16]}>
                         {project.related_projects.map((relatedProject) => (
                             <Col key={relatedProject.id} xs={24} md={8}>
-                                <ProjectCard project={relatedProject} />
+                                <RelatedProjectCard project={relatedProject} />
                             </Col>
                         ))}
                     </Row>